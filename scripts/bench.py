@@ -0,0 +1,150 @@
+"""
+Offline benchmark of the whole lambda_handler pipeline.
+
+The LLM is the simulated local provider (LLM_PROVIDER=local) and Backlog is an
+in-process fake with a fixed per-call latency, so nothing leaves the machine.
+Tune the simulated model with the LLM_LOCAL_* environment variables.
+
+    python scripts/bench.py --requests 200 --concurrency 20 --command /summary
+
+With --fast-ack the webhook only enqueues onto the in-process job queue
+(JOB_QUEUE=local); the latencies are then the webhook's acknowledgements and
+`drain_s` is how long the workers took to finish the backlog of jobs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from backlog_bot import handler, jobqueue  # noqa: E402
+
+
+class BenchBacklog:
+    """Backlog API stand-in that sleeps `latency` seconds per call."""
+
+    latency = 0.05
+    comments = 50
+
+    def __init__(self, *_a: Any, **_k: Any) -> None:
+        pass
+
+    def _wait(self) -> None:
+        time.sleep(self.latency)
+
+    def get_issue(self, issue_id_or_key: str) -> dict[str, Any]:
+        self._wait()
+        return {"summary": f"{issue_id_or_key} の件", "description": "説明 " * 200}
+
+    def get_issues_bulk(self, keys: list[str]) -> dict[str, Any]:
+        self._wait()
+        return {k: self.get_issue(k) for k in keys}
+
+    def list_comments(self, issue_id_or_key: str, count: int = 30, **_k: Any) -> list[Any]:
+        self._wait()
+        n = min(count, self.comments)
+        return [
+            {"id": i, "content": f"コメント{i}: 進捗を共有します。" * 5, "createdUser": {"id": 1}}
+            for i in range(n, 0, -1)
+        ]
+
+    def post_comment(self, issue_id_or_key: str, content: str) -> dict[str, Any]:
+        self._wait()
+        return {"id": 1}
+
+    def update_comment(self, issue_id_or_key: str, comment_id: int, content: str) -> Any:
+        self._wait()
+        return {"id": comment_id}
+
+
+def _event(i: int, command: str) -> dict[str, Any]:
+    body = {
+        "type": 3,
+        "project": {"projectKey": "BENCH"},
+        "content": {
+            "comment": {
+                "id": 10_000 + i,
+                "content": f"@bot {command}",
+                "notifications": [{"user": {"id": 1}}],
+            },
+            "key_id": i % 50 + 1,
+        },
+    }
+    return {"body": json.dumps(body, ensure_ascii=False)}
+
+
+def _pct(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    ap.add_argument("--requests", type=int, default=100)
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--command", default="/summary")
+    ap.add_argument("--backlog-latency-ms", type=float, default=50)
+    ap.add_argument("--comments", type=int, default=50)
+    ap.add_argument("--fast-ack", action="store_true", help="enqueue, process on local workers")
+    ap.add_argument("--workers", type=int, default=10, help="local queue workers (--fast-ack)")
+    args = ap.parse_args()
+
+    if args.fast_ack:
+        os.environ["JOB_QUEUE"] = "local"
+        os.environ["JOB_LOCAL_WORKERS"] = str(args.workers)
+    os.environ.setdefault("LLM_PROVIDER", "local")
+    os.environ.setdefault("BACKLOG_SPACE", "bench")
+    os.environ.setdefault("BACKLOG_API_KEY", "bench")
+    os.environ.setdefault("BOT_USER_ID", "1")
+    # Measure the pipeline, not the caches.
+    os.environ.setdefault("LLM_CACHE_TTL_SECONDS", "0")
+    os.environ.setdefault("COMMENT_CACHE_TTL_SECONDS", "0")
+    logging.disable(logging.INFO)
+
+    BenchBacklog.latency = args.backlog_latency_ms / 1000
+    BenchBacklog.comments = args.comments
+    handler.BacklogClient = BenchBacklog  # type: ignore[misc,assignment]
+
+    def one(i: int) -> tuple[float, int]:
+        t0 = time.perf_counter()
+        res = handler.lambda_handler(_event(i, args.command), None)
+        return time.perf_counter() - t0, res["statusCode"]
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - t0
+    drain = None
+    if args.fast_ack and jobqueue._LOCAL:
+        jobqueue._LOCAL["default"].drain()
+        drain = round(time.perf_counter() - t0, 2)
+
+    latencies = [r[0] for r in results]
+    errors = sum(1 for r in results if r[1] != 200)
+    print(
+        json.dumps(
+            {
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+                "errors": errors,
+                "throughput_rps": round(args.requests / wall, 2),
+                "p50_ms": round(statistics.median(latencies) * 1000),
+                "p95_ms": round(_pct(latencies, 95) * 1000),
+                "max_ms": round(max(latencies) * 1000),
+                "drain_s": drain,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,22 @@ __all__ = [
     "config",
     "handler",
     "backlog",
+    "backlog_async",
+    "cache",
+    "comment_cache",
     "commands",
     "context_fetch",
+    "deadline",
+    "ratelimit",
+    "aws",
     "idempotency",
+    "incremental",
+    "jobqueue",
     "llm",
+    "llm_cache",
+    "llm_local",
+    "map_reduce",
+    "prompt_pack",
+    "router",
+    "hedge",
 ]
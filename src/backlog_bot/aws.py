@@ -0,0 +1,108 @@
+"""
+Process-wide boto3 clients.
+
+Creating a client resolves credentials and endpoints and loads the botocore
+service model, which costs ~100 ms on every call. Clients are instead created
+lazily once per (boto3 module, service, region, options) and reused by every thread and
+warm invocation. boto3 clients are thread-safe; creating them through the
+default session is not, so creation is serialized.
+
+boto3 has no per-call timeout: the botocore read timeout of the client is what
+bounds a call. Callers with a tighter deadline ask for a client with a shorter
+read timeout, rounded down to whole seconds so that only a few extra clients
+per service are ever created.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+from dataclasses import dataclass, replace
+from typing import Any
+
+
+@dataclass(frozen=True)
+class ClientOptions:
+    """botocore client settings (see `Settings.aws_*`)."""
+
+    connect_timeout: float = 2.0
+    read_timeout: float = 5.0
+    # Bedrock responses take much longer than S3 calls.
+    bedrock_read_timeout: float = 10.0
+    max_pool_connections: int = 10
+    retry_mode: str = "standard"
+    max_attempts: int = 3
+
+
+# Bedrock calls are retried by the caller (LLM_MAX_RETRIES, hedging) within the
+# invocation deadline; botocore retries would run on top of those, unbounded by it.
+_BEDROCK_MAX_ATTEMPTS = 1
+
+
+_OPTIONS = ClientOptions()
+_CLIENTS: dict[tuple[Any, str, str | None, ClientOptions], Any] = {}
+_LOCK = threading.Lock()
+
+
+def configure(options: ClientOptions) -> None:
+    """Set the options used for clients created from now on (existing ones are kept)."""
+    global _OPTIONS
+    _OPTIONS = options
+
+
+def _config(service: str, options: ClientOptions) -> Any | None:
+    # botocore ships with boto3; without it (tests with a fake boto3) use defaults.
+    if importlib.util.find_spec("botocore") is None:
+        return None
+    config_cls = importlib.import_module("botocore.config").Config
+    bedrock = service == "bedrock-runtime"
+    return config_cls(
+        connect_timeout=options.connect_timeout,
+        read_timeout=options.bedrock_read_timeout if bedrock else options.read_timeout,
+        max_pool_connections=options.max_pool_connections,
+        retries={
+            "mode": options.retry_mode,
+            "max_attempts": _BEDROCK_MAX_ATTEMPTS if bedrock else options.max_attempts,
+        },
+    )
+
+
+def client(
+    boto3: Any, service: str, region: str | None = None, read_timeout: float | None = None
+) -> Any:
+    """Shared client for `service` (in `region`, default: the function's), created on first use.
+
+    `read_timeout` overrides the configured read timeout (whole seconds, at least 1).
+    """
+    options = _OPTIONS
+    if read_timeout is not None:
+        seconds = float(max(1, int(read_timeout)))
+        if service == "bedrock-runtime":
+            options = replace(options, bedrock_read_timeout=seconds)
+        else:
+            options = replace(options, read_timeout=seconds)
+    # Keyed by the module object itself so a monkeypatched boto3 gets its own client.
+    key = (boto3, service, region, options)
+    c = _CLIENTS.get(key)
+    if c is not None:
+        return c
+    with _LOCK:
+        c = _CLIENTS.get(key)
+        if c is None:
+            kwargs: dict[str, Any] = {}
+            if region:
+                kwargs["region_name"] = region
+            config = _config(service, options)
+            if config is not None:
+                kwargs["config"] = config
+            c = boto3.client(service, **kwargs)
+            _CLIENTS[key] = c
+        return c
+
+
+def prewarm(*services: str) -> None:
+    """Create clients ahead of the first request (e.g. during the Lambda init phase)."""
+    boto3 = importlib.import_module("boto3")
+    for service in services:
+        client(boto3, service)
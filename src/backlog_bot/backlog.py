@@ -1,75 +1,584 @@
 """
-Minimal Backlog API client (v2) using stdlib urllib.
+Minimal Backlog API client (v2) using stdlib http.client.
+
+Connections are pooled per host at module scope so that warm Lambda containers
+reuse TCP/TLS sessions across invocations instead of handshaking on every call.
 """
 
 from __future__ import annotations
 
+import hashlib
+import http.client
 import json
+import select
+import ssl
+import threading
+import time
 import urllib.parse
-import urllib.request
+import zlib
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import dataclass
 from typing import Any
 
+from . import ratelimit
+from .cache import LRUCache
+from .deadline import MIN_TIMEOUT_SECONDS, Deadline
+
+_USER_AGENT = "BacklogBot/1.0"
+# Idle keep-alive connections older than this are dropped before reuse; servers
+# typically close idle sockets after ~60s.
+_POOL_IDLE_SECONDS = 50.0
+_POOL_MAX_IDLE_PER_HOST = 8
+_READ_CHUNK = 64 * 1024
+# Backlog caps `count` on list endpoints at 100.
+_MAX_PAGE = 100
+# zlib window bits accepting both gzip and zlib-wrapped deflate streams.
+_AUTO_WBITS = 32 + zlib.MAX_WBITS
+
+# Errors that mean a reused keep-alive socket was closed by the peer.
+_STALE_ERRORS: tuple[type[BaseException], ...] = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+
+class BacklogAPIError(Exception):
+    """Non-2xx response from the Backlog API."""
+
+    def __init__(self, status: int, reason: str, body: bytes = b"") -> None:
+        super().__init__(f"HTTP {status} {reason}")
+        self.status = status
+        self.reason = reason
+        self.body = body
+
+
+class RateLimitedError(BacklogAPIError):
+    """Backlog API quota exhausted (HTTP 429, or the local limiter predicts it)."""
+
+
+class ResponseTooLargeError(BacklogAPIError):
+    """Response body exceeded the client's byte cap; the read was aborted."""
+
+
+@dataclass
+class _Response:
+    status: int
+    reason: str
+    headers: http.client.HTTPMessage
+    body: bytes
+
+
+class _ConnectionPool:
+    """Per-(scheme, host, port) pool of idle keep-alive connections."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._idle: dict[tuple[str, str, int], list[tuple[http.client.HTTPConnection, float]]] = {}
+        self._ssl_context: ssl.SSLContext | None = None
+
+    def _new_connection(
+        self, scheme: str, host: str, port: int, timeout: float
+    ) -> http.client.HTTPConnection:
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            return http.client.HTTPSConnection(
+                host, port, timeout=timeout, context=self._ssl_context
+            )
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    @staticmethod
+    def _is_stale(conn: http.client.HTTPConnection, idle_since: float) -> bool:
+        if time.monotonic() - idle_since > _POOL_IDLE_SECONDS:
+            return True
+        sock = conn.sock
+        if sock is None:
+            return True
+        try:
+            # An idle keep-alive socket must not be readable: readability means
+            # the peer closed it (EOF) or sent unexpected bytes.
+            readable, _, _ = select.select([sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def acquire(
+        self, scheme: str, host: str, port: int, timeout: float
+    ) -> tuple[http.client.HTTPConnection, bool]:
+        """Return (connection, reused)."""
+        key = (scheme, host, port)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                item = idle.pop() if idle else None
+            if item is None:
+                return self._new_connection(scheme, host, port, timeout), False
+            conn, idle_since = item
+            if self._is_stale(conn, idle_since):
+                conn.close()
+                continue
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            conn.timeout = timeout
+            return conn, True
+
+    def release(self, scheme: str, host: str, port: int, conn: http.client.HTTPConnection) -> None:
+        key = (scheme, host, port)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < _POOL_MAX_IDLE_PER_HOST:
+                idle.append((conn, time.monotonic()))
+                return
+        conn.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            items = [c for conns in self._idle.values() for c, _ in conns]
+            self._idle.clear()
+        for conn in items:
+            conn.close()
+
+
+@dataclass
+class _CachedResponse:
+    etag: str | None
+    digest: str
+    data: Any
+
+
+class _BodyDecoder:
+    """Incrementally inflate (gzip/deflate) and size-check a response body."""
+
+    def __init__(self, status: int, headers: ratelimit.Headers, limit: int) -> None:
+        self.status = status
+        self.limit = limit
+        encoding = (headers.get("Content-Encoding") or "").strip().lower()
+        self._decomp = (
+            zlib.decompressobj(_AUTO_WBITS) if encoding in ("gzip", "x-gzip", "deflate") else None
+        )
+        length = headers.get("Content-Length")
+        if self._decomp is None and length and length.isdigit() and int(length) > limit:
+            self._too_large()
+        self._buf = bytearray()
+
+    def _too_large(self) -> None:
+        raise ResponseTooLargeError(self.status, f"body exceeds {self.limit} bytes")
+
+    def feed(self, chunk: bytes) -> None:
+        if self._decomp is not None:
+            # Bound the inflated output too, so a small gzip bomb cannot blow memory.
+            chunk = self._decomp.decompress(chunk, self.limit + 1 - len(self._buf))
+        self._buf += chunk
+        if len(self._buf) > self.limit:
+            self._too_large()
+
+    def finish(self) -> bytes:
+        if self._decomp is not None:
+            self._buf += self._decomp.flush()
+            if len(self._buf) > self.limit:
+                self._too_large()
+        return bytes(self._buf)
+
+
+def _read_body(resp: http.client.HTTPResponse, limit: int) -> bytes:
+    """Read and (if needed) decompress the body chunk by chunk, up to `limit` bytes."""
+    decoder = _BodyDecoder(resp.status, resp.headers, limit)
+    while chunk := resp.read(_READ_CHUNK):
+        decoder.feed(chunk)
+    return decoder.finish()
+
+
+# Module scope: survives across warm invocations of the same container.
+_POOL = _ConnectionPool()
+# GET responses of single resources (issues, wikis) keyed by URL without apiKey.
+_RESPONSES: LRUCache[str, _CachedResponse] = LRUCache(8 * 1024 * 1024)
+# Issue key -> numeric id (ids never change), keyed by API base + key; sized by count.
+_ISSUE_IDS: LRUCache[str, int] = LRUCache(10_000)
+
+
+def _comment_id(c: dict[str, Any]) -> int:
+    try:
+        return int(c.get("id") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def comment_budget(max_chars: int) -> Callable[[dict[str, Any]], bool]:
+    """`stop_when` predicate for `iter_comments`: stop once comment text exceeds `max_chars`."""
+    used = 0
 
-class BacklogClient:
-    def __init__(self, base_url: str, api_key: str) -> None:
+    def exhausted(c: dict[str, Any]) -> bool:
+        nonlocal used
+        used += len(c.get("content") or "")
+        return used > max_chars
+
+    return exhausted
+
+
+class _ClientBase:
+    """Configuration, URL building, caching and quota logic shared by sync/async clients."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        *,
+        timeout: float = 8.0,
+        cache_max_bytes: int | None = None,
+        max_response_bytes: int = 5 * 1024 * 1024,
+        rate_limit_max_wait: float = 5.0,
+        rate_limit_retries: int = 2,
+        deadline: Deadline | None = None,
+    ) -> None:
         self.base_api = base_url.rstrip("/") + "/api/v2"
         self.api_key = api_key
+        self.timeout = timeout
+        self.max_response_bytes = max_response_bytes
+        self.rate_limit_max_wait = rate_limit_max_wait
+        self.rate_limit_retries = rate_limit_retries
+        self.deadline = deadline
+        self._limiter = ratelimit.for_key(api_key)
+        if cache_max_bytes is not None:
+            _RESPONSES.max_bytes = cache_max_bytes
+        u = urllib.parse.urlsplit(self.base_api)
+        self._scheme = u.scheme or "https"
+        self._host = u.hostname or ""
+        self._port = u.port or (443 if self._scheme == "https" else 80)
 
     # ----- Helpers -----
     def _url(self, path: str, params: dict[str, Any] | None = None) -> str:
         p = {"apiKey": self.api_key}
         if params:
             p.update(params)
-        return self.base_api + path + "?" + urllib.parse.urlencode(p)
+        return self.base_api + path + "?" + urllib.parse.urlencode(p, doseq=True)
+
+    @staticmethod
+    def _headers(extra: dict[str, str] | None) -> dict[str, str]:
+        hdrs = {
+            "User-Agent": _USER_AGENT,
+            "Connection": "keep-alive",
+            "Accept-Encoding": "gzip, deflate",
+        }
+        if extra:
+            hdrs.update(extra)
+        return hdrs
+
+    def _call_timeout(self) -> float:
+        """Socket timeout for the next call, capped by the invocation deadline."""
+        if self.deadline is None:
+            return self.timeout
+        return self.deadline.timeout(self.timeout)
+
+    def _affordable(self, wait: float) -> bool:
+        """True if waiting `wait` seconds still leaves time for the call itself."""
+        return self.deadline is None or self.deadline.can_afford(wait + MIN_TIMEOUT_SECONDS)
+
+    def _reserve(self) -> float:
+        """Seconds to wait before the next call; raises if the quota will not recover in time."""
+        wait = self._limiter.reserve()
+        if wait > self.rate_limit_max_wait or not self._affordable(wait):
+            # Nothing is sent, so the token must not count against later calls.
+            self._limiter.cancel()
+            raise RateLimitedError(429, f"quota exhausted; resets in {wait:.1f}s")
+        return wait
+
+    def _retry_delay(self, resp: _Response, attempt: int) -> float | None:
+        """Record quota headers; return the wait before retrying a 429, or None to stop."""
+        self._limiter.observe(resp.headers)
+        if resp.status != 429 or attempt >= self.rate_limit_retries:
+            return None
+        delay = self._limiter.retry_delay(resp.headers, attempt)
+        if delay > self.rate_limit_max_wait or not self._affordable(delay):
+            return None
+        return delay
+
+    @staticmethod
+    def _raise_for_status(resp: _Response) -> None:
+        if 200 <= resp.status < 300:
+            return
+        if resp.status == 429:
+            raise RateLimitedError(resp.status, resp.reason, resp.body)
+        raise BacklogAPIError(resp.status, resp.reason, resp.body)
+
+    @classmethod
+    def _json(cls, resp: _Response) -> Any:
+        cls._raise_for_status(resp)
+        return json.loads(resp.body)
+
+    @staticmethod
+    def _list(data: Any) -> list[dict[str, Any]]:
+        return list(data) if isinstance(data, list) else []
+
+    def _cache_lookup(self, path: str) -> tuple[_CachedResponse | None, dict[str, str] | None]:
+        cached = _RESPONSES.get(self.base_api + path)
+        headers = {"If-None-Match": cached.etag} if cached and cached.etag else None
+        return cached, headers
+
+    def _cache_resolve(self, path: str, cached: _CachedResponse | None, resp: _Response) -> Any:
+        """Return the cached body when unchanged (304 or same digest), else parse and store."""
+        if resp.status == 304 and cached is not None:
+            return cached.data
+        self._raise_for_status(resp)
+        digest = hashlib.sha256(resp.body).hexdigest()
+        if cached is not None and cached.digest == digest:
+            return cached.data
+        data = json.loads(resp.body)
+        _RESPONSES.put(
+            self.base_api + path,
+            _CachedResponse(resp.headers.get("ETag"), digest, data),
+            len(resp.body),
+        )
+        return data
+
+    def _remember_issue_id(self, issue: Any) -> None:
+        if isinstance(issue, dict) and issue.get("issueKey") and issue.get("id"):
+            _ISSUE_IDS.put(f"{self.base_api}#{issue['issueKey']}", int(issue["id"]), 1)
+
+    def known_issue_keys(self, keys: Sequence[str]) -> list[str]:
+        """The keys (deduplicated, in order) whose issue id this process has already seen."""
+        return [k for k in dict.fromkeys(keys) if _ISSUE_IDS.get(f"{self.base_api}#{k}")]
+
+    def _bulk_plan(self, keys: Sequence[str]) -> tuple[list[list[int]], list[str]]:
+        """Split keys into id batches (for GET /issues) and keys with no known id."""
+        ids: list[int] = []
+        unknown: list[str] = []
+        for key in dict.fromkeys(keys):
+            issue_id = _ISSUE_IDS.get(f"{self.base_api}#{key}")
+            if issue_id is None:
+                unknown.append(key)
+            else:
+                ids.append(issue_id)
+        return [ids[i : i + _MAX_PAGE] for i in range(0, len(ids), _MAX_PAGE)], unknown
+
+    def _collect_bulk(
+        self, page: Any, keys: Sequence[str], found: dict[str, dict[str, Any]]
+    ) -> None:
+        # Only the requested issues: anything else means the filter was not applied.
+        wanted = set(keys)
+        for issue in self._list(page):
+            key = str(issue.get("issueKey"))
+            if key in wanted:
+                self._remember_issue_id(issue)
+                found[key] = issue
+
+    def _bulk_url(self, ids: list[int]) -> str:
+        return self._url("/issues", {"id[]": ids, "count": _MAX_PAGE})
+
+    @staticmethod
+    def _comment_page(
+        page: list[dict[str, Any]], order: str, cursor: int | None
+    ) -> tuple[list[dict[str, Any]], int | None]:
+        """Drop comments at or beyond the paging cursor; return them and the next cursor.
+
+        Whether Backlog treats minId/maxId as inclusive is not documented, so the
+        cursor is passed as-is and the overlapping comment filtered out here.
+        """
+        ids = [(_comment_id(c), c) for c in page]
+        if cursor is not None:
+            if order == "asc":
+                ids = [(i, c) for i, c in ids if i > cursor]
+            else:
+                ids = [(i, c) for i, c in ids if i < cursor]
+        if not ids:
+            return [], cursor
+        edge = max(i for i, _ in ids) if order == "asc" else min(i for i, _ in ids)
+        return [c for _, c in ids], edge
+
+    @staticmethod
+    def _comments_params(
+        count: int, order: str, min_id: int | None, max_id: int | None
+    ) -> dict[str, Any]:
+        params: dict[str, Any] = {"count": count, "order": order}
+        if min_id is not None:
+            params["minId"] = min_id
+        if max_id is not None:
+            params["maxId"] = max_id
+        return params
+
+
+class BacklogClient(_ClientBase):
+    def _request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> _Response:
+        """Send one API call, pacing it against the shared per-key quota.
+
+        429 responses are retried after the quota resets (with jitter) as long as
+        the wait stays within `rate_limit_max_wait` and the invocation deadline;
+        otherwise the 429 is returned.
+        """
+        attempt = 0
+        while True:
+            wait = self._reserve()
+            if wait > 0:
+                time.sleep(wait)
+            resp = self._roundtrip(method, url, body, headers)
+            delay = self._retry_delay(resp, attempt)
+            if delay is None:
+                return resp
+            time.sleep(delay)
+            attempt += 1
+
+    def _roundtrip(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> _Response:
+        u = urllib.parse.urlsplit(url)
+        target = u.path + ("?" + u.query if u.query else "")
+        hdrs = self._headers(headers)
+        while True:
+            timeout = self._call_timeout()
+            conn, reused = _POOL.acquire(self._scheme, self._host, self._port, timeout)
+            sent = False
+            try:
+                conn.request(method, target, body=body, headers=hdrs)
+                sent = True
+                resp = conn.getresponse()
+                data = _read_body(resp, self.max_response_bytes)
+            except _STALE_ERRORS:
+                conn.close()
+                # A reused socket closed by the peer: reconnect once. Non-GET
+                # requests are only replayed when the failure happened on send.
+                if reused and (method == "GET" or not sent):
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if resp.will_close:
+                conn.close()
+            else:
+                _POOL.release(self._scheme, self._host, self._port, conn)
+            return _Response(resp.status, resp.reason, resp.headers, data)
 
     def _get_json(self, url: str) -> Any:
-        req = urllib.request.Request(url, headers={"User-Agent": "BacklogBot/1.0"})
-        with urllib.request.urlopen(req, timeout=8) as resp:  # nosec B310
-            data = resp.read()
-        return json.loads(data.decode("utf-8"))
+        return self._json(self._request("GET", url))
 
-    def _post_json(self, url: str, form: dict[str, Any]) -> Any:
+    def _get_json_cached(self, path: str) -> Any:
+        """GET a single resource, reusing the parsed body when it has not changed.
+
+        Sends `If-None-Match` when an ETag is known (304 -> cached body). Without
+        ETag support the body digest is compared so unchanged payloads are not
+        re-parsed. Returned objects are shared; callers must not mutate them.
+        """
+        cached, headers = self._cache_lookup(path)
+        resp = self._request("GET", self._url(path), headers=headers)
+        return self._cache_resolve(path, cached, resp)
+
+    def _post_json(self, url: str, form: dict[str, Any], method: str = "POST") -> Any:
         body = urllib.parse.urlencode(form).encode("utf-8")
-        req = urllib.request.Request(
-            url,
-            data=body,
-            headers={
-                "User-Agent": "BacklogBot/1.0",
-                "Content-Type": "application/x-www-form-urlencoded",
-            },
+        resp = self._request(
+            method, url, body, {"Content-Type": "application/x-www-form-urlencoded"}
         )
-        with urllib.request.urlopen(req, timeout=8) as resp:  # nosec B310
-            data = resp.read()
+        self._raise_for_status(resp)
         try:
-            return json.loads(data.decode("utf-8"))
+            return json.loads(resp.body)
         except Exception:
             return {}
 
     # ----- Public APIs -----
     def get_issue(self, issue_id_or_key: str) -> dict[str, Any]:
-        url = self._url(f"/issues/{urllib.parse.quote(issue_id_or_key)}")
-        return self._get_json(url)
+        issue = self._get_json_cached(f"/issues/{urllib.parse.quote(issue_id_or_key)}")
+        self._remember_issue_id(issue)
+        return issue
+
+    def get_issues_bulk(self, keys: Sequence[str]) -> dict[str, dict[str, Any]]:
+        """Fetch several issues by key, one request per 100 issues whose id is known.
+
+        `GET /issues` filters by issue id only (there is no key filter), so only
+        keys in `known_issue_keys` go through `GET /issues?id[]=...`. The
+        ids are learned from every issue this process loads; on a cold container
+        each key costs its own `get_issue`. Those, and keys the search did not
+        return (e.g. moved issues), are fetched one after another on the calling
+        thread; callers that want them in parallel should split the keys with
+        `known_issue_keys` and fetch the rest on their own bounded pool. Keys
+        that fail to load are omitted from the result.
+        """
+        batches, _ = self._bulk_plan(keys)
+        found: dict[str, dict[str, Any]] = {}
+        for batch in batches:
+            try:
+                self._collect_bulk(self._get_json(self._bulk_url(batch)), keys, found)
+            except Exception:
+                # The keys of a failed batch are fetched one by one below.
+                pass
+        for key in dict.fromkeys(keys):
+            if key not in found:
+                try:
+                    found[key] = self.get_issue(key)
+                except Exception:
+                    continue
+        return {k: found[k] for k in keys if k in found}
 
     def list_comments(
-        self, issue_id_or_key: str, count: int = 30, order: str = "desc"
+        self,
+        issue_id_or_key: str,
+        count: int = 30,
+        order: str = "desc",
+        min_id: int | None = None,
+        max_id: int | None = None,
     ) -> list[dict[str, Any]]:
         url = self._url(
             f"/issues/{urllib.parse.quote(issue_id_or_key)}/comments",
-            {"count": count, "order": order},
+            self._comments_params(count, order, min_id, max_id),
         )
-        data = self._get_json(url)
-        return list(data) if isinstance(data, list) else []
+        return self._list(self._get_json(url))
+
+    def iter_comments(
+        self,
+        issue_id_or_key: str,
+        order: str = "desc",
+        page_size: int = _MAX_PAGE,
+        stop_when: Callable[[dict[str, Any]], bool] | None = None,
+        *,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Yield comments page by page beyond the 100-per-request limit.
+
+        Pages are requested lazily with minId/maxId as the cursor. Iteration
+        ends when the history is exhausted or `stop_when(comment)` returns True
+        (that comment is not yielded), e.g. with `comment_budget()`.
+        """
+        page_size = max(1, min(page_size, _MAX_PAGE))
+        cursor: int | None = None
+        while True:
+            if cursor is not None:
+                if order == "asc":
+                    min_id = cursor
+                else:
+                    max_id = cursor
+            page = self.list_comments(issue_id_or_key, page_size, order, min_id, max_id)
+            fresh, cursor = self._comment_page(page, order, cursor)
+            for c in fresh:
+                if stop_when is not None and stop_when(c):
+                    return
+                yield c
+            if not fresh or len(page) < page_size:
+                return
 
     def post_comment(self, issue_id_or_key: str, content: str) -> dict[str, Any]:
         url = self._url(f"/issues/{urllib.parse.quote(issue_id_or_key)}/comments")
         return self._post_json(url, {"content": content})
 
+    def update_comment(self, issue_id_or_key: str, comment_id: int, content: str) -> dict[str, Any]:
+        """Edit an existing comment in place (PATCH /issues/:key/comments/:id)."""
+        url = self._url(f"/issues/{urllib.parse.quote(issue_id_or_key)}/comments/{int(comment_id)}")
+        return self._post_json(url, {"content": content}, method="PATCH")
+
     # ----- Wiki APIs -----
     def get_wiki(self, wiki_id: int) -> dict[str, Any]:
-        url = self._url(f"/wikis/{int(wiki_id)}")
-        return self._get_json(url)
+        return self._get_json_cached(f"/wikis/{int(wiki_id)}")
 
     def list_wiki_attachments(self, wiki_id: int) -> list[dict[str, Any]]:
         url = self._url(f"/wikis/{int(wiki_id)}/attachments")
-        data = self._get_json(url)
-        return list(data) if isinstance(data, list) else []
+        return self._list(self._get_json(url))
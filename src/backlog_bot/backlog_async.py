@@ -0,0 +1,337 @@
+"""
+asyncio variant of the Backlog API client on a stdlib streams transport.
+
+Same public API as `BacklogClient`, so high-fanout fetches (comments, context
+issues, wikis, attachments) can run concurrently on one thread. Keep-alive
+connections are pooled per event loop; use `run()` to execute coroutines on a
+module-scope loop so warm containers keep those connections across invocations.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import email.parser
+import http.client
+import json
+import ssl
+import time
+import urllib.parse
+import weakref
+from collections.abc import AsyncIterator, Callable, Coroutine, Sequence
+from typing import Any, TypeVar
+
+from .backlog import (
+    _MAX_PAGE,
+    _POOL_IDLE_SECONDS,
+    _POOL_MAX_IDLE_PER_HOST,
+    _BodyDecoder,
+    _ClientBase,
+    _Response,
+)
+
+T = TypeVar("T")
+
+_MAX_HEADER_BYTES = 64 * 1024
+
+
+class _AsyncConnection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return (
+            time.monotonic() - self.idle_since > _POOL_IDLE_SECONDS
+            or self.reader.at_eof()
+            or self.writer.is_closing()
+        )
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class _AsyncPool:
+    """Idle keep-alive connections of one event loop, per (scheme, host, port)."""
+
+    def __init__(self) -> None:
+        self._idle: dict[tuple[str, str, int], list[_AsyncConnection]] = {}
+        self._ssl_context: ssl.SSLContext | None = None
+
+    async def acquire(self, scheme: str, host: str, port: int) -> tuple[_AsyncConnection, bool]:
+        idle = self._idle.get((scheme, host, port))
+        while idle:
+            conn = idle.pop()
+            if not conn.is_stale():
+                return conn, True
+            conn.close()
+        if scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            reader, writer = await asyncio.open_connection(
+                host, port, ssl=self._ssl_context, server_hostname=host
+            )
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return _AsyncConnection(reader, writer), False
+
+    def release(self, scheme: str, host: str, port: int, conn: _AsyncConnection) -> None:
+        idle = self._idle.setdefault((scheme, host, port), [])
+        if len(idle) < _POOL_MAX_IDLE_PER_HOST:
+            conn.idle_since = time.monotonic()
+            idle.append(conn)
+        else:
+            conn.close()
+
+    def clear(self) -> None:
+        for conns in self._idle.values():
+            for conn in conns:
+                conn.close()
+        self._idle.clear()
+
+
+_POOLS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _AsyncPool] = (
+    weakref.WeakKeyDictionary()
+)
+_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+def _pool() -> _AsyncPool:
+    loop = asyncio.get_running_loop()
+    pool = _POOLS.get(loop)
+    if pool is None:
+        pool = _POOLS[loop] = _AsyncPool()
+    return pool
+
+
+def run(coro: Coroutine[Any, Any, T]) -> T:
+    """Run `coro` on the module-scope event loop (reused across warm invocations)."""
+    global _LOOP
+    if _LOOP is None or _LOOP.is_closed():
+        _LOOP = asyncio.new_event_loop()
+    return _LOOP.run_until_complete(coro)
+
+
+async def _read_head(reader: asyncio.StreamReader) -> tuple[int, str, http.client.HTTPMessage]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError as e:
+        raise http.client.LineTooLong("response headers") from e
+    except asyncio.IncompleteReadError as e:
+        if not e.partial:
+            raise http.client.RemoteDisconnected("connection closed without response") from e
+        raise
+    if len(head) > _MAX_HEADER_BYTES:
+        raise http.client.LineTooLong("response headers")
+    status_line, _, header_text = head.decode("iso-8859-1").partition("\r\n")
+    parts = status_line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("HTTP/") or not parts[1].isdigit():
+        raise http.client.BadStatusLine(status_line)
+    headers = email.parser.Parser(_class=http.client.HTTPMessage).parsestr(header_text)
+    return int(parts[1]), (parts[2] if len(parts) > 2 else ""), headers
+
+
+async def _read_body(
+    reader: asyncio.StreamReader,
+    method: str,
+    status: int,
+    headers: http.client.HTTPMessage,
+    limit: int,
+) -> tuple[bytes, bool]:
+    """Return (body, reusable). The connection is reusable unless read-until-EOF."""
+    decoder = _BodyDecoder(status, headers, limit)
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return decoder.finish(), True
+    if (headers.get("Transfer-Encoding") or "").lower() == "chunked":
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b";", 1)[0].strip() or b"0", 16)
+            if size == 0:
+                # Skip trailers up to the terminating blank line.
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return decoder.finish(), True
+            decoder.feed(await reader.readexactly(size))
+            await reader.readexactly(2)
+    length = headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        remaining = int(length)
+        while remaining:
+            chunk = await reader.read(min(remaining, 64 * 1024))
+            if not chunk:
+                raise asyncio.IncompleteReadError(b"", remaining)
+            decoder.feed(chunk)
+            remaining -= len(chunk)
+        return decoder.finish(), True
+    while chunk := await reader.read(64 * 1024):
+        decoder.feed(chunk)
+    return decoder.finish(), False
+
+
+class AsyncBacklogClient(_ClientBase):
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> _Response:
+        """Async counterpart of `BacklogClient._request` (quota pacing + 429 retry)."""
+        attempt = 0
+        while True:
+            wait = self._reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            resp = await asyncio.wait_for(
+                self._roundtrip(method, url, body, headers), self._call_timeout()
+            )
+            delay = self._retry_delay(resp, attempt)
+            if delay is None:
+                return resp
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _roundtrip(
+        self,
+        method: str,
+        url: str,
+        body: bytes | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> _Response:
+        u = urllib.parse.urlsplit(url)
+        target = u.path + ("?" + u.query if u.query else "")
+        hdrs = {"Host": u.netloc, **self._headers(headers)}
+        if body is not None:
+            hdrs["Content-Length"] = str(len(body))
+        head = f"{method} {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in hdrs.items())
+        raw = head.encode("latin-1") + b"\r\n" + (body or b"")
+        pool = _pool()
+        while True:
+            conn, reused = await pool.acquire(self._scheme, self._host, self._port)
+            sent = False
+            try:
+                conn.writer.write(raw)
+                await conn.writer.drain()
+                sent = True
+                status, reason, resp_headers = await _read_head(conn.reader)
+                data, reusable = await _read_body(
+                    conn.reader, method, status, resp_headers, self.max_response_bytes
+                )
+            except (ConnectionError, http.client.RemoteDisconnected):
+                conn.close()
+                # Same replay rule as the sync client: GETs, or anything not yet sent.
+                if reused and (method == "GET" or not sent):
+                    continue
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            if reusable and (resp_headers.get("Connection") or "").lower() != "close":
+                pool.release(self._scheme, self._host, self._port, conn)
+            else:
+                conn.close()
+            return _Response(status, reason, resp_headers, data)
+
+    async def _get_json(self, url: str) -> Any:
+        return self._json(await self._request("GET", url))
+
+    async def _get_json_cached(self, path: str) -> Any:
+        cached, headers = self._cache_lookup(path)
+        resp = await self._request("GET", self._url(path), headers=headers)
+        return self._cache_resolve(path, cached, resp)
+
+    async def _post_json(self, url: str, form: dict[str, Any], method: str = "POST") -> Any:
+        body = urllib.parse.urlencode(form).encode("utf-8")
+        resp = await self._request(
+            method, url, body, {"Content-Type": "application/x-www-form-urlencoded"}
+        )
+        self._raise_for_status(resp)
+        try:
+            return json.loads(resp.body)
+        except Exception:
+            return {}
+
+    # ----- Public APIs -----
+    async def get_issue(self, issue_id_or_key: str) -> dict[str, Any]:
+        issue = await self._get_json_cached(f"/issues/{urllib.parse.quote(issue_id_or_key)}")
+        self._remember_issue_id(issue)
+        return issue
+
+    async def get_issues_bulk(self, keys: Sequence[str]) -> dict[str, dict[str, Any]]:
+        """See `BacklogClient.get_issues_bulk`."""
+        batches, _ = self._bulk_plan(keys)
+        found: dict[str, dict[str, Any]] = {}
+        for batch in batches:
+            try:
+                page = await self._get_json(self._bulk_url(batch))
+                self._collect_bulk(page, keys, found)
+            except Exception:
+                # The keys of a failed batch are fetched one by one below.
+                pass
+        for key in dict.fromkeys(keys):
+            if key not in found:
+                try:
+                    found[key] = await self.get_issue(key)
+                except Exception:
+                    continue
+        return {k: found[k] for k in keys if k in found}
+
+    async def list_comments(
+        self,
+        issue_id_or_key: str,
+        count: int = 30,
+        order: str = "desc",
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> list[dict[str, Any]]:
+        url = self._url(
+            f"/issues/{urllib.parse.quote(issue_id_or_key)}/comments",
+            self._comments_params(count, order, min_id, max_id),
+        )
+        return self._list(await self._get_json(url))
+
+    async def iter_comments(
+        self,
+        issue_id_or_key: str,
+        order: str = "desc",
+        page_size: int = _MAX_PAGE,
+        stop_when: Callable[[dict[str, Any]], bool] | None = None,
+        *,
+        min_id: int | None = None,
+        max_id: int | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """See `BacklogClient.iter_comments`."""
+        page_size = max(1, min(page_size, _MAX_PAGE))
+        cursor: int | None = None
+        while True:
+            if cursor is not None:
+                if order == "asc":
+                    min_id = cursor
+                else:
+                    max_id = cursor
+            page = await self.list_comments(issue_id_or_key, page_size, order, min_id, max_id)
+            fresh, cursor = self._comment_page(page, order, cursor)
+            for c in fresh:
+                if stop_when is not None and stop_when(c):
+                    return
+                yield c
+            if not fresh or len(page) < page_size:
+                return
+
+    async def post_comment(self, issue_id_or_key: str, content: str) -> dict[str, Any]:
+        url = self._url(f"/issues/{urllib.parse.quote(issue_id_or_key)}/comments")
+        return await self._post_json(url, {"content": content})
+
+    async def update_comment(
+        self, issue_id_or_key: str, comment_id: int, content: str
+    ) -> dict[str, Any]:
+        url = self._url(f"/issues/{urllib.parse.quote(issue_id_or_key)}/comments/{int(comment_id)}")
+        return await self._post_json(url, {"content": content}, method="PATCH")
+
+    # ----- Wiki APIs -----
+    async def get_wiki(self, wiki_id: int) -> dict[str, Any]:
+        return await self._get_json_cached(f"/wikis/{int(wiki_id)}")
+
+    async def list_wiki_attachments(self, wiki_id: int) -> list[dict[str, Any]]:
+        url = self._url(f"/wikis/{int(wiki_id)}/attachments")
+        return self._list(await self._get_json(url))
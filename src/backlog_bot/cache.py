@@ -0,0 +1,72 @@
+"""
+Small in-process caches shared by warm Lambda invocations.
+
+Entries are evicted least-recently-used first once the configured byte budget
+is exceeded, and optionally expire after a TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Generic, TypeVar
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """Thread-safe LRU bounded by the sum of caller-supplied entry sizes."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: float | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: OrderedDict[K, tuple[V, int, float]] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, size, expires = item
+            if expires and expires < time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: K, value: V, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl_seconds if self.ttl_seconds else 0.0
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size, expires)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._data:
+                _, (_, evicted, _) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def pop(self, key: K) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._data)
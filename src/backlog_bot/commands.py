@@ -8,6 +8,8 @@ import re
 from typing import Any
 
 CMD_RE = re.compile(r"/(summary|ask|update)\b(?P<args>.*)", re.IGNORECASE | re.DOTALL)
+# An invocation: mention(s), then a bot command, e.g. "@bot /summary 続き".
+INVOCATION_RE = re.compile(r"(?:@\S+\s+)+/(?:summary|ask|update)\b", re.I)
 
 
 def is_bot_mentioned(comment: dict[str, Any], bot_user_id: int) -> bool:
@@ -36,6 +38,17 @@ def parse_command(text: str | None) -> dict[str, Any] | None:
     return {"cmd": cmd}
 
 
+def is_command_comment(text: str | None) -> bool:
+    """True for comments that invoke the bot (as opposed to discussing the issue).
+
+    Only the comment's first non-empty line counts, and it must open with a
+    mention followed by the command: a discussion that merely names a command
+    further down ("/update は来週やります") is not an invocation.
+    """
+    first = next((line for line in (text or "").splitlines() if line.strip()), "")
+    return bool(INVOCATION_RE.match(first.strip()))
+
+
 def extract_issue_key(issue: dict[str, Any]) -> str:
     # Backlog payloads typically include both id and issueKey in webhook
     key = issue.get("issueKey") or issue.get("key")
@@ -0,0 +1,206 @@
+"""
+Per-issue cache of the recent comment window.
+
+Warm containers keep windows in memory; an optional S3 tier shares them across
+containers. On a hit only comments newer than the cached max id are fetched
+(Backlog `minId`), and the window is fully refreshed once it is older than the
+TTL so that edited/deleted comments are eventually picked up.
+
+Windows larger than one API page (100 comments), or bounded by a character
+budget, are read lazily through `iter_comments`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+import json
+import logging
+import time
+from itertools import islice
+from typing import Any
+
+from . import aws
+from .backlog import _MAX_PAGE, _comment_id, comment_budget
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+S3_PREFIX = "comment-cache/"
+
+_MEMORY: LRUCache[str, dict[str, Any]] = LRUCache(16 * 1024 * 1024)
+
+
+def _boto3() -> Any:
+    # Allow tests to monkeypatch module-level `boto3` symbol.
+    return globals().get("boto3") or importlib.import_module("boto3")
+
+
+def normalize_comment(c: dict[str, Any]) -> dict[str, Any]:
+    """Keep only the comment fields the bot reads."""
+    user = c.get("createdUser") or {}
+    out: dict[str, Any] = {
+        "id": c.get("id"),
+        "content": c.get("content"),
+        "created": c.get("created"),
+        "createdUser": {k: user.get(k) for k in ("id", "userId", "name") if k in user},
+    }
+    if c.get("changeLog"):
+        out["changeLog"] = [
+            {k: log.get(k) for k in ("field", "originalValue", "newValue")}
+            for log in c["changeLog"]
+            if isinstance(log, dict)
+        ]
+    return out
+
+
+def _merge(newer: list[dict[str, Any]], cached: list[dict[str, Any]], count: int) -> list[Any]:
+    by_id = {_comment_id(c): c for c in cached}
+    by_id.update({_comment_id(c): c for c in newer})
+    return [by_id[k] for k in sorted(by_id, reverse=True)][:count]
+
+
+def _s3_key(issue_key: str) -> str:
+    return f"{S3_PREFIX}{issue_key}.json"
+
+
+def _s3_load(bucket: str, issue_key: str) -> dict[str, Any] | None:
+    try:
+        obj = aws.client(_boto3(), "s3").get_object(Bucket=bucket, Key=_s3_key(issue_key))
+        window = json.loads(obj["Body"].read())
+        return window if isinstance(window, dict) else None
+    except Exception as e:
+        logger.debug("comment cache S3 miss for %s: %s", issue_key, e)
+        return None
+
+
+def _s3_store(bucket: str, issue_key: str, body: bytes) -> None:
+    try:
+        aws.client(_boto3(), "s3").put_object(
+            Bucket=bucket, Key=_s3_key(issue_key), Body=body, ContentType="application/json"
+        )
+    except Exception as e:
+        logger.warning("comment cache S3 store failed for %s: %s", issue_key, e)
+
+
+def _cached_window(
+    issue_key: str, count: int, ttl_seconds: int, bucket: str | None
+) -> dict[str, Any] | None:
+    """Return the cached window if it covers `count` and is within the TTL."""
+    window = _MEMORY.get(issue_key)
+    if window is None and bucket:
+        window = _s3_load(bucket, issue_key)
+    if (
+        window is None
+        or int(window.get("count") or 0) < count
+        or time.time() - float(window.get("fetched") or 0) > ttl_seconds
+    ):
+        return None
+    return window
+
+
+def _update(
+    issue_key: str,
+    count: int,
+    bucket: str | None,
+    window: dict[str, Any] | None,
+    fetched: list[dict[str, Any]],
+) -> list[dict[str, Any]]:
+    """Merge fetched comments into the window, store it, and return the comments."""
+    fetched = [normalize_comment(c) for c in fetched]
+    keep = count
+    if window is not None and len(fetched) >= count and int(window.get("count") or 0) > count:
+        # A full page of new comments may not reach the cached ones: start over.
+        window = None
+    if window is not None:
+        # A smaller request must not shrink the window a larger one still needs.
+        keep = max(count, int(window.get("count") or 0))
+        max_id = int(window.get("maxId") or 0)
+        comments = _merge(fetched, list(window.get("comments") or []), keep)
+        changed = any(_comment_id(c) > max_id for c in fetched)
+        fetched_at = float(window.get("fetched") or time.time())
+    else:
+        comments, changed, fetched_at = fetched, True, time.time()
+
+    window = {
+        "count": keep,
+        "maxId": max((_comment_id(c) for c in comments), default=0),
+        "fetched": fetched_at,
+        "comments": comments,
+    }
+    body = json.dumps(window, ensure_ascii=False).encode("utf-8")
+    _MEMORY.put(issue_key, window, len(body))
+    if bucket and changed:
+        _s3_store(bucket, issue_key, body)
+    return list(comments[:count])
+
+
+def _paged(count: int, max_chars: int | None) -> bool:
+    return count > _MAX_PAGE or bool(max_chars)
+
+
+def _fetch(
+    bl: Any, issue_key: str, count: int, min_id: int | None, max_chars: int | None
+) -> list[dict[str, Any]]:
+    if not _paged(count, max_chars):
+        if min_id is None:
+            return bl.list_comments(issue_key, count=count)
+        return bl.list_comments(issue_key, count=count, min_id=min_id)
+    stop = comment_budget(max_chars) if max_chars else None
+    it = bl.iter_comments(issue_key, page_size=count, stop_when=stop, min_id=min_id)
+    return list(islice(it, count))
+
+
+async def _fetch_async(
+    bl: Any, issue_key: str, count: int, min_id: int | None, max_chars: int | None
+) -> list[dict[str, Any]]:
+    if not _paged(count, max_chars):
+        if min_id is None:
+            return await bl.list_comments(issue_key, count=count)
+        return await bl.list_comments(issue_key, count=count, min_id=min_id)
+    stop = comment_budget(max_chars) if max_chars else None
+    out: list[dict[str, Any]] = []
+    async for c in bl.iter_comments(issue_key, page_size=count, stop_when=stop, min_id=min_id):
+        out.append(c)
+        if len(out) >= count:
+            break
+    return out
+
+
+def recent_comments(
+    bl: Any,
+    issue_key: str,
+    count: int,
+    *,
+    ttl_seconds: int,
+    bucket: str | None = None,
+    max_chars: int | None = None,
+) -> list[dict[str, Any]]:
+    """Return the newest `count` comments (newest first), using the cache when fresh.
+
+    `max_chars` stops paging once the comment text exceeds that many characters.
+    """
+    if ttl_seconds <= 0:
+        return _fetch(bl, issue_key, count, None, max_chars)
+    window = _cached_window(issue_key, count, ttl_seconds, bucket)
+    min_id = None if window is None else int(window.get("maxId") or 0)
+    fetched = _fetch(bl, issue_key, count, min_id, max_chars)
+    return _update(issue_key, count, bucket, window, fetched)
+
+
+async def recent_comments_async(
+    bl: Any,
+    issue_key: str,
+    count: int,
+    *,
+    ttl_seconds: int,
+    bucket: str | None = None,
+    max_chars: int | None = None,
+) -> list[dict[str, Any]]:
+    """`recent_comments` for `AsyncBacklogClient`; S3 tier I/O runs in a worker thread."""
+    if ttl_seconds <= 0:
+        return await _fetch_async(bl, issue_key, count, None, max_chars)
+    window = await asyncio.to_thread(_cached_window, issue_key, count, ttl_seconds, bucket)
+    min_id = None if window is None else int(window.get("maxId") or 0)
+    fetched = await _fetch_async(bl, issue_key, count, min_id, max_chars)
+    return await asyncio.to_thread(_update, issue_key, count, bucket, window, fetched)
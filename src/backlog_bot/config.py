@@ -22,17 +22,65 @@ class Settings:
     bot_user_id: int
     webhook_shared_secret: str | None
     secrets_llm_name: str | None
+    idempotency_backend: str
     idempotency_bucket: str | None
+    idempotency_table: str | None
+    idempotency_sqlite_path: str
+    idempotency_ttl_seconds: int
+    idempotency_memory_ttl_seconds: float
+    idempotency_lease_seconds: float
+    idempotency_memory_max_entries: int
     recent_comment_count: int
+    recent_comment_max_chars: int
+    backlog_fetch_concurrency: int
+    backlog_timeout_seconds: float
+    comment_cache_bucket: str | None
+    comment_cache_ttl_seconds: int
+    backlog_cache_max_bytes: int
+    backlog_max_response_bytes: int
+    backlog_rate_limit_max_wait_seconds: float
+    backlog_rate_limit_retries: int
     context_url_max_bytes: int
     context_total_max_bytes: int
     context_allowed_hosts: tuple[str, ...]
     llm_provider: str
+    llm_local_latency_p50_seconds: float
+    llm_local_latency_p95_seconds: float
+    llm_local_tokens_per_second: float
+    llm_local_output_tokens: int
+    llm_local_error_rate: float
     llm_model: str
+    llm_fast_model: str
+    llm_strong_model: str
+    llm_routes: str
+    llm_hedge_model: str | None
+    llm_hedge_region: str | None
+    llm_hedge_delay_seconds: float
     llm_timeout_seconds: int
     llm_max_retries: int
+    llm_streaming: bool
+    llm_prompt_caching: bool
+    llm_prompt_max_tokens: int
+    summary_history_comments: int
+    summary_incremental_max_tokens: int
+    summary_chunk_tokens: int
+    summary_map_concurrency: int
+    summary_chunk_cache_ttl_seconds: int
+    llm_cache_ttl_seconds: int
+    llm_cache_bucket: str | None
+    llm_stream_update_interval_seconds: float
+    aws_connect_timeout_seconds: float
+    aws_read_timeout_seconds: float
+    aws_max_pool_connections: int
+    aws_retry_mode: str
+    aws_max_attempts: int
+    deadline_reserve_seconds: float
     require_mention: bool
     allowed_trigger_user_ids: tuple[int, ...]
+    job_queue: str
+    job_queue_url: str | None
+    job_worker_function: str | None
+    job_local_workers: int
 
 
 def load_settings() -> Settings:
@@ -49,22 +97,79 @@ def load_settings() -> Settings:
         h.strip() for h in ((_env("CONTEXT_ALLOWED_HOSTS", "") or "").split(",")) if h.strip()
     )
 
+    llm_model = (
+        _env("LLM_MODEL", "anthropic.claude-3-haiku-20240307-v1:0")
+        or "anthropic.claude-3-haiku-20240307-v1:0"
+    )
+
     return Settings(
         backlog_base_url=base_url,
         backlog_space=space,
         bot_user_id=bot_user_id,
         webhook_shared_secret=_env("WEBHOOK_SHARED_SECRET"),
         secrets_llm_name=_env("LLM_SECRET_NAME"),
+        idempotency_backend=(
+            _env("IDEMPOTENCY_BACKEND") or ("s3" if _env("IDEMPOTENCY_BUCKET") else "")
+        ).lower(),
         idempotency_bucket=_env("IDEMPOTENCY_BUCKET"),
+        idempotency_table=_env("IDEMPOTENCY_TABLE"),
+        idempotency_sqlite_path=_env("IDEMPOTENCY_SQLITE_PATH", ":memory:") or ":memory:",
+        idempotency_ttl_seconds=int(_env("IDEMPOTENCY_TTL_SECONDS", "604800") or 604800),
+        idempotency_memory_ttl_seconds=float(_env("IDEMPOTENCY_MEMORY_TTL_SECONDS", "600") or 0),
+        idempotency_lease_seconds=float(_env("IDEMPOTENCY_LEASE_SECONDS", "120") or 120),
+        idempotency_memory_max_entries=int(_env("IDEMPOTENCY_MEMORY_MAX_ENTRIES", "10000") or 0),
         recent_comment_count=int(_env("RECENT_COMMENT_COUNT", "50") or 50),
+        recent_comment_max_chars=int(_env("RECENT_COMMENT_MAX_CHARS", "0") or 0),
+        backlog_fetch_concurrency=int(_env("BACKLOG_FETCH_CONCURRENCY", "8") or 8),
+        backlog_timeout_seconds=float(_env("BACKLOG_TIMEOUT_SECONDS", "8") or 8),
+        comment_cache_bucket=_env("COMMENT_CACHE_BUCKET"),
+        comment_cache_ttl_seconds=int(_env("COMMENT_CACHE_TTL_SECONDS", "600") or 0),
+        backlog_cache_max_bytes=int(_env("BACKLOG_CACHE_MAX_BYTES", "8388608") or 0),
+        backlog_max_response_bytes=int(_env("BACKLOG_MAX_RESPONSE_BYTES", "5242880") or 5242880),
+        backlog_rate_limit_max_wait_seconds=float(
+            _env("BACKLOG_RATE_LIMIT_MAX_WAIT_SECONDS", "5") or 5
+        ),
+        backlog_rate_limit_retries=int(_env("BACKLOG_RATE_LIMIT_RETRIES", "2") or 0),
         context_url_max_bytes=int(_env("CONTEXT_URL_MAX_BYTES", "100000") or 100000),
         context_total_max_bytes=int(_env("CONTEXT_TOTAL_MAX_BYTES", "200000") or 200000),
         context_allowed_hosts=allowed_hosts,
         llm_provider=_env("LLM_PROVIDER", "bedrock") or "bedrock",
-        llm_model=_env("LLM_MODEL", "anthropic.claude-3-haiku-20240307-v1:0")
-        or "anthropic.claude-3-haiku-20240307-v1:0",
+        llm_local_latency_p50_seconds=float(_env("LLM_LOCAL_LATENCY_P50_SECONDS", "0.8") or 0),
+        llm_local_latency_p95_seconds=float(_env("LLM_LOCAL_LATENCY_P95_SECONDS", "2") or 0),
+        llm_local_tokens_per_second=float(_env("LLM_LOCAL_TOKENS_PER_SECOND", "80") or 0),
+        llm_local_output_tokens=int(_env("LLM_LOCAL_OUTPUT_TOKENS", "300") or 300),
+        llm_local_error_rate=float(_env("LLM_LOCAL_ERROR_RATE", "0") or 0),
+        llm_model=llm_model,
+        llm_fast_model=_env("LLM_FAST_MODEL") or llm_model,
+        llm_strong_model=_env("LLM_STRONG_MODEL") or llm_model,
+        llm_routes=_env("LLM_ROUTES", "summary>4000=strong,update=strong") or "",
+        llm_hedge_model=_env("LLM_HEDGE_MODEL"),
+        llm_hedge_region=_env("LLM_HEDGE_REGION"),
+        llm_hedge_delay_seconds=float(_env("LLM_HEDGE_DELAY_SECONDS", "4") or 4),
         llm_timeout_seconds=int(_env("LLM_TIMEOUT_SECONDS", "10") or 10),
         llm_max_retries=int(_env("LLM_MAX_RETRIES", "2") or 2),
+        llm_streaming=(_env("LLM_STREAMING", "false") or "false").lower() in ("1", "true", "yes"),
+        llm_prompt_caching=(_env("LLM_PROMPT_CACHING", "false") or "false").lower()
+        in ("1", "true", "yes"),
+        llm_prompt_max_tokens=int(_env("LLM_PROMPT_MAX_TOKENS", "32000") or 32000),
+        summary_history_comments=int(_env("SUMMARY_HISTORY_COMMENTS", "0") or 0),
+        summary_incremental_max_tokens=int(_env("SUMMARY_INCREMENTAL_MAX_TOKENS", "4000") or 0),
+        summary_chunk_tokens=int(_env("SUMMARY_CHUNK_TOKENS", "6000") or 0),
+        summary_map_concurrency=int(_env("SUMMARY_MAP_CONCURRENCY", "4") or 4),
+        summary_chunk_cache_ttl_seconds=int(
+            _env("SUMMARY_CHUNK_CACHE_TTL_SECONDS", "2592000") or 0
+        ),
+        llm_cache_ttl_seconds=int(_env("LLM_CACHE_TTL_SECONDS", "0") or 0),
+        llm_cache_bucket=_env("LLM_CACHE_BUCKET"),
+        llm_stream_update_interval_seconds=float(
+            _env("LLM_STREAM_UPDATE_INTERVAL_SECONDS", "2") or 2
+        ),
+        aws_connect_timeout_seconds=float(_env("AWS_CONNECT_TIMEOUT_SECONDS", "2") or 2),
+        aws_read_timeout_seconds=float(_env("AWS_READ_TIMEOUT_SECONDS", "5") or 5),
+        aws_max_pool_connections=int(_env("AWS_MAX_POOL_CONNECTIONS", "10") or 10),
+        aws_retry_mode=_env("AWS_RETRY_MODE", "standard") or "standard",
+        aws_max_attempts=int(_env("AWS_MAX_ATTEMPTS", "3") or 3),
+        deadline_reserve_seconds=float(_env("DEADLINE_RESERVE_SECONDS", "3") or 0),
         require_mention=(
             (_env("REQUIRE_MENTION", "true") or "true").lower() in ("1", "true", "yes")
         ),
@@ -76,4 +181,8 @@ def load_settings() -> Settings:
                 if s.strip()
             ]
         ),
+        job_queue=(_env("JOB_QUEUE", "") or "").lower(),
+        job_queue_url=_env("JOB_QUEUE_URL"),
+        job_worker_function=_env("JOB_WORKER_FUNCTION") or _env("AWS_LAMBDA_FUNCTION_NAME"),
+        job_local_workers=int(_env("JOB_LOCAL_WORKERS", "4") or 4),
     )
@@ -8,9 +8,14 @@ from __future__ import annotations
 
 import urllib.parse
 import urllib.request
-from collections.abc import Iterable
+from collections.abc import Callable, Hashable, Iterable
 from typing import Any
 
+from .cache import LRUCache
+
+# Flattened context texts keyed by resource identity + `updated` timestamp.
+_TEXT_CACHE: LRUCache[Hashable, str] = LRUCache(8 * 1024 * 1024)
+
 
 def extract_context_urls(text: str | None) -> list[str]:
     if not text:
@@ -173,3 +178,43 @@ def backlog_wiki_to_text(
     if len(text) > max_chars:
         return text[: max_chars - 1] + "…"
     return text
+
+
+def cached_text(key: Hashable | None, build: Callable[[], str]) -> str:
+    """Return the flattened text for `key`, building it only on a miss.
+
+    Pass key=None to bypass the cache (e.g. when the resource has no `updated`).
+    """
+    if key is None:
+        return build()
+    text = _TEXT_CACHE.get(key)
+    if text is None:
+        text = build()
+        _TEXT_CACHE.put(key, text, len(text.encode("utf-8")))
+    return text
+
+
+def issue_text_key(
+    issue: dict[str, Any],
+    comments: list[dict[str, Any]],
+    max_chars: int,
+    only_comment_id: int | None = None,
+) -> Hashable | None:
+    updated = issue.get("updated")
+    if not updated:
+        return None
+    comment_ids = tuple(c.get("id") for c in comments)
+    if None in comment_ids:
+        return None
+    ident = issue.get("id") or issue.get("issueKey")
+    return ("issue", ident, updated, comment_ids, max_chars, only_comment_id)
+
+
+def wiki_text_key(
+    wiki: dict[str, Any], attachments: list[dict[str, Any]], max_chars: int
+) -> Hashable | None:
+    updated = wiki.get("updated")
+    if not updated:
+        return None
+    attachment_ids = tuple(a.get("id") for a in attachments)
+    return ("wiki", wiki.get("id"), updated, attachment_ids, max_chars)
@@ -0,0 +1,61 @@
+"""
+Per-invocation time budget derived from the Lambda context.
+
+`lambda_handler` creates one `Deadline` from `context.get_remaining_time_in_millis()`
+and hands it to every Backlog and Bedrock call. Each call sizes its timeout to
+what is left, and retries are only attempted while they still fit. A reserve is
+held back until the final comment is posted, so that an error reply can still
+be sent after a slow LLM call instead of the function hitting its hard timeout.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+# Never hand out a socket timeout shorter than this; below it a call is pointless.
+MIN_TIMEOUT_SECONDS = 0.5
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the remaining budget cannot fit another call."""
+
+
+class Deadline:
+    """Monotonic wall-clock budget with a reserve for the final Backlog post."""
+
+    def __init__(self, remaining_seconds: float | None, reserve_seconds: float = 0.0) -> None:
+        self._expires = None if remaining_seconds is None else time.monotonic() + remaining_seconds
+        self.reserve_seconds = max(0.0, reserve_seconds)
+
+    @classmethod
+    def from_context(cls, context: Any, reserve_seconds: float = 0.0) -> Deadline:
+        """Build from a Lambda context; unbounded when the context has no clock (tests, CLI)."""
+        get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+        if not callable(get_remaining):
+            return cls(None, reserve_seconds)
+        try:
+            return cls(float(get_remaining()) / 1000.0, reserve_seconds)
+        except (TypeError, ValueError):
+            return cls(None, reserve_seconds)
+
+    def remaining(self) -> float:
+        """Seconds left for regular work (the reserve excluded); may be negative."""
+        if self._expires is None:
+            return float("inf")
+        return self._expires - time.monotonic() - self.reserve_seconds
+
+    def can_afford(self, seconds: float) -> bool:
+        """True if a step expected to take `seconds` still fits in the budget."""
+        return self.remaining() >= seconds
+
+    def timeout(self, default: float) -> float:
+        """Timeout for the next call: `default` capped at the remaining budget."""
+        left = self.remaining()
+        if left < MIN_TIMEOUT_SECONDS:
+            raise DeadlineExceeded(f"deadline exceeded ({left:.2f}s left)")
+        return min(default, left)
+
+    def release_reserve(self) -> None:
+        """Make the reserve available; call right before posting the final comment."""
+        self.reserve_seconds = 0.0
@@ -4,29 +4,56 @@ AWS Lambda handler for Backlog Webhook (comment added) -> Bot reply.
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import json
 import logging
 import os
+import threading
 import time
-from typing import Any
+from collections.abc import Awaitable, Callable, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from typing import Any, NamedTuple
 
-from . import commands
+from . import (
+    aws,
+    backlog_async,
+    commands,
+    comment_cache,
+    hedge,
+    idempotency,
+    incremental,
+    jobqueue,
+    llm,
+    llm_cache,
+    llm_local,
+    map_reduce,
+    prompt_pack,
+    router,
+)
 from .backlog import BacklogClient
+from .backlog_async import AsyncBacklogClient
 from .config import Settings, load_settings
 from .context_fetch import (
     allowlisted,
     backlog_issue_to_text,
     backlog_wiki_to_text,
+    cached_text,
     extract_context_urls,
+    issue_text_key,
     parse_backlog_issue_url,
     parse_backlog_wiki_url,
+    wiki_text_key,
 )
-from .idempotency import s3_record_if_new
-from .llm import answer, review_update, summarize
+from .deadline import Deadline
+from .llm import SYSTEM_PROMPTS, Completion, answer, review_update, summarize
 
 logger = logging.getLogger(__name__)
 
+# A retry shorter than this is unlikely to produce an answer; post the error instead.
+_MIN_LLM_ATTEMPT_SECONDS = 2.0
+
 
 def _configure_logging() -> None:
     level_name = (os.getenv("LOG_LEVEL") or "INFO").upper()
@@ -149,11 +176,176 @@ def _extract_comment_and_issue(payload: dict[str, Any]) -> tuple[dict[str, Any],
     return comment_obj, issue_obj
 
 
-def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
-    _configure_logging()
-    settings = load_settings()
-    start_ts = time.time()
+class _Job(NamedTuple):
+    cmd: dict[str, Any]
+    comment: dict[str, Any]
+    issue_key: str
+    comment_id: str
+    # Idempotency lease held for this comment (None without a backend, or not claimed yet).
+    claim: idempotency.Claim | None = None
+
+
+class _Fetched(NamedTuple):
+    issue: dict[str, Any]
+    comments: list[dict[str, Any]]
+    used_context_urls: list[str]
+    context_texts: list[str]
+
+
+class _ContextSource(NamedTuple):
+    url: str
+    issue_key: str | None
+    comment_ref: int | None
+    wiki_id: int | None
+
+
+def _context_sources(text: str | None, settings: Settings) -> list[_ContextSource]:
+    """Backlog issue/wiki URLs from the `context:` line, in their original order."""
+    sources: list[_ContextSource] = []
+    for url in extract_context_urls(text):
+        if not allowlisted(url, settings.context_allowed_hosts):
+            continue
+        ctx_issue_key, comment_ref = parse_backlog_issue_url(url, settings.backlog_base_url)
+        wiki_id = parse_backlog_wiki_url(url, settings.backlog_base_url)
+        if ctx_issue_key or wiki_id:
+            sources.append(_ContextSource(url, ctx_issue_key, comment_ref, wiki_id))
+        # 非Backlog URLは無視
+    return sources
+
+
+def _history_count(settings: Settings, job: _Job) -> int:
+    """Comments to load for the triggering issue; /summary reads the longer history."""
+    if job.cmd.get("cmd") == "summary":
+        return max(settings.recent_comment_count, settings.summary_history_comments)
+    return settings.recent_comment_count
+
+
+def _recent_comments(
+    bl: BacklogClient, issue_key: str, settings: Settings, count: int | None = None
+) -> list[Any]:
+    return comment_cache.recent_comments(
+        bl,
+        issue_key,
+        count or settings.recent_comment_count,
+        ttl_seconds=settings.comment_cache_ttl_seconds,
+        bucket=settings.comment_cache_bucket,
+        max_chars=settings.recent_comment_max_chars,
+    )
+
 
+async def _recent_comments_async(
+    abl: AsyncBacklogClient, issue_key: str, settings: Settings, count: int | None = None
+) -> list[Any]:
+    return await comment_cache.recent_comments_async(
+        abl,
+        issue_key,
+        count or settings.recent_comment_count,
+        ttl_seconds=settings.comment_cache_ttl_seconds,
+        bucket=settings.comment_cache_bucket,
+        max_chars=settings.recent_comment_max_chars,
+    )
+
+
+def _submit_context_fetch(
+    executor: ThreadPoolExecutor,
+    bl: BacklogClient,
+    src: _ContextSource,
+    settings: Settings,
+    f_issues: dict[str, Future[dict[str, Any]]],
+) -> Callable[[], tuple[Any, Any]]:
+    if src.issue_key and src.issue_key in f_issues:
+        f_comments = executor.submit(_recent_comments, bl, src.issue_key, settings)
+        return partial(_bulk_pair, f_issues[src.issue_key], src.issue_key, f_comments)
+    wiki_id = int(src.wiki_id or 0)
+    f_wiki = executor.submit(bl.get_wiki, wiki_id)
+    f_attachments = executor.submit(bl.list_wiki_attachments, wiki_id)
+    return partial(_future_pair, f_wiki, f_attachments)
+
+
+def _future_pair(f_main: Future[Any], f_sub: Future[Any]) -> tuple[Any, Any]:
+    return f_main.result(), f_sub.result()
+
+
+def _pick_issue(issues: dict[str, Any], key: str) -> Any:
+    if key not in issues:
+        raise KeyError(f"issue {key} not returned")
+    return issues[key]
+
+
+def _bulk_pair(f_bulk: Future[dict[str, Any]], key: str, f_sub: Future[Any]) -> tuple[Any, Any]:
+    return _pick_issue(f_bulk.result(), key), f_sub.result()
+
+
+def _single_issue(bl: BacklogClient, key: str) -> dict[str, Any]:
+    # Same shape as get_issues_bulk, for keys fetched on their own.
+    return {key: bl.get_issue(key)}
+
+
+def _resolved(result: Any) -> Any:
+    if isinstance(result, BaseException):
+        raise result
+    return result
+
+
+def _collect_context(
+    sources: list[_ContextSource],
+    fetchers: Sequence[Callable[[], tuple[Any, Any]]],
+    settings: Settings,
+    context: Any,
+) -> tuple[list[str], list[str]]:
+    """Flatten fetched context in URL order until the total byte budget is used.
+
+    Each fetcher returns (issue, comments) or (wiki, attachments) for its source,
+    blocking until that source's requests have completed.
+    """
+    used_context_urls: list[str] = []
+    context_texts: list[str] = []
+    for src, fetch in zip(sources, fetchers, strict=True):
+        if sum(len(t) for t in context_texts) >= settings.context_total_max_bytes:
+            break
+        try:
+            if src.issue_key:
+                issue, comments = fetch()
+                max_chars = settings.context_url_max_bytes
+                txt = cached_text(
+                    issue_text_key(issue, comments, max_chars, src.comment_ref),
+                    partial(backlog_issue_to_text, issue, comments, max_chars, src.comment_ref),
+                )
+                _log(
+                    "context_added_issue",
+                    rid=_rid(context),
+                    source=src.url,
+                    issueKey=src.issue_key,
+                )
+            else:
+                wiki, attachments = fetch()
+                max_chars = settings.context_url_max_bytes
+                txt = cached_text(
+                    wiki_text_key(wiki, attachments, max_chars),
+                    partial(backlog_wiki_to_text, wiki, attachments, max_chars),
+                )
+                _log(
+                    "context_added_wiki",
+                    rid=_rid(context),
+                    source=src.url,
+                    wikiId=int(src.wiki_id or 0),
+                )
+        except Exception:
+            _log("context_fetch_error", rid=_rid(context), source=src.url)
+            continue
+        if txt:
+            context_texts.append(txt)
+            used_context_urls.append(src.url)
+    return used_context_urls, context_texts
+
+
+def _accept(
+    event: dict[str, Any], context: Any, settings: Settings, *, claim: bool = True
+) -> _Job | dict[str, Any]:
+    """Steps 1-4: authenticate, parse, filter and dedupe. Returns a job or an early response.
+
+    With `claim=False` (fast-ack mode) step 4 is left to the worker.
+    """
     # 1) Verify webhook secret quickly
     #    Accept either header `X-Webhook-Secret` or query `?token=` (Function URL)
     if settings.webhook_shared_secret:
@@ -216,48 +408,280 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
 
     issue_key = commands.extract_issue_key(issue)
     comment_id = str(comment.get("id") or "")
+    job = _Job(cmd, comment, issue_key, comment_id)
+    return _claim(settings, job, context) if claim else job
+
 
-    # 4) Idempotency
-    if settings.idempotency_bucket:
-        marker = f"{issue_key}/{comment_id}"
-        if not s3_record_if_new(settings.idempotency_bucket, marker):
+def _claim(settings: Settings, job: _Job, context: Any) -> _Job | dict[str, Any]:
+    """Step 4: take the idempotency lease for the job, or answer a duplicate."""
+    issue_key, comment_id = job.issue_key, job.comment_id
+    claimed = None
+    try:
+        # Opening the store can fail too (e.g. an unreadable SQLite file).
+        store = _idempotency_backend(settings)
+    except idempotency.IdempotencyError as e:
+        _log("idempotency_error", rid=_rid(context), issueKey=issue_key, error=str(e))
+        return _response(500, {"error": "idempotency_error"})
+    if store is not None:
+        try:
+            claimed = idempotency.claim(
+                store,
+                _marker(issue_key, comment_id),
+                lease_seconds=settings.idempotency_lease_seconds,
+                memory_ttl_seconds=settings.idempotency_memory_ttl_seconds,
+                memory_max_entries=settings.idempotency_memory_max_entries,
+            )
+        except idempotency.IdempotencyError as e:
+            # Unknown state: fail so the delivery is retried, rather than risk a double reply.
+            _log("idempotency_error", rid=_rid(context), issueKey=issue_key, error=str(e))
+            return _response(500, {"error": "idempotency_error"})
+        if claimed.state != idempotency.CLAIMED:
+            dedupe = idempotency.stats()
             _log(
                 "duplicate_ignored",
                 rid=_rid(context),
                 issueKey=issue_key,
                 commentId=comment_id,
+                state=claimed.state,
+                replyCommentId=claimed.record.get("reply_comment_id"),
+                dedupe_memory_hits=dedupe["memory_hits"],
+                dedupe_backend_calls=dedupe["backend_calls"],
+            )
+            return _response(200, {"result": "duplicate_ignored", "state": claimed.state})
+        if claimed.resumed:
+            _log(
+                "idempotency_resumed",
+                rid=_rid(context),
+                issueKey=issue_key,
+                commentId=comment_id,
+                attempt=claimed.record.get("attempt"),
             )
-            return _response(200, {"result": "duplicate_ignored"})
 
-    # 5) Backlog API client
-    secrets = _load_secrets(settings)
-    api_key = secrets.get("BACKLOG_API_KEY")
-    if not api_key:
-        _log("config_error_missing_api_key", rid=_rid(context))
-        return _response(500, {"error": "BACKLOG_API_KEY not found"})
-    bl = BacklogClient(settings.backlog_base_url, api_key)
+    return job._replace(claim=claimed)
+
 
-    # 6) Fetch issue + recent comments
+def _fetch(bl: BacklogClient, settings: Settings, job: _Job, context: Any) -> _Fetched:
+    """Steps 6-7 on a bounded thread pool. Raises if the issue or its comments fail."""
+    issue_key = job.issue_key
+    # 6) Fetch issue + recent comments, and 7) optional link context, concurrently.
+    #    All independent Backlog GETs are issued at once on a bounded pool.
+    sources = _context_sources(job.comment.get("content"), settings)
+    executor = ThreadPoolExecutor(max_workers=max(1, settings.backlog_fetch_concurrency))
     try:
         t0 = time.time()
-        issue_obj = bl.get_issue(issue_key)
-        recent = bl.list_comments(issue_key, count=settings.recent_comment_count)
+        f_issue = executor.submit(bl.get_issue, issue_key)
+        count = _history_count(settings, job)
+        f_recent = executor.submit(_recent_comments, bl, issue_key, settings, count)
+        # Context issues with a known id are loaded together through the bulk search
+        # endpoint; the others (cold container) each get their own GET on this pool.
+        ctx_keys = [src.issue_key for src in sources if src.issue_key]
+        known = bl.known_issue_keys(ctx_keys) if ctx_keys else []
+        f_issues: dict[str, Future[dict[str, Any]]] = {}
+        if known:
+            f_issues.update(dict.fromkeys(known, executor.submit(bl.get_issues_bulk, known)))
+        for key in dict.fromkeys(ctx_keys):
+            if key not in f_issues:
+                f_issues[key] = executor.submit(_single_issue, bl, key)
+        fetchers = [_submit_context_fetch(executor, bl, src, settings, f_issues) for src in sources]
+        issue_obj = f_issue.result()
+        recent = f_recent.result()
         _log(
             "backlog_fetch_ok",
             rid=_rid(context),
             issueKey=issue_key,
             comments=len(recent),
+            ctxBulkIssues=len(known),
+            ctxSingleIssues=len(f_issues) - len(known),
             ms=int((time.time() - t0) * 1000),
         )
-    except Exception as e:
-        logger.exception("Backlog fetch failed")
-        _log(
-            "backlog_fetch_error",
-            rid=_rid(context),
-            issueKey=issue_key,
-            error=str(e),
+        used_context_urls, context_texts = _collect_context(sources, fetchers, settings, context)
+    finally:
+        # Sources skipped by the total byte budget are cancelled, not awaited.
+        executor.shutdown(wait=False, cancel_futures=True)
+    return _Fetched(issue_obj, recent, used_context_urls, context_texts)
+
+
+async def _fetch_async(
+    abl: AsyncBacklogClient, settings: Settings, job: _Job, context: Any
+) -> _Fetched:
+    """Steps 6-7 on the event loop: every GET in flight at once, bounded by a semaphore."""
+    issue_key = job.issue_key
+    sources = _context_sources(job.comment.get("content"), settings)
+    sem = asyncio.Semaphore(max(1, settings.backlog_fetch_concurrency))
+
+    async def bounded(coro: Awaitable[Any]) -> Any:
+        async with sem:
+            return await coro
+
+    # Known ids: one bulk search; the other keys each take a slot of the semaphore.
+    ctx_keys = [src.issue_key for src in sources if src.issue_key]
+    known = abl.known_issue_keys(ctx_keys) if ctx_keys else []
+    bulk = asyncio.ensure_future(bounded(abl.get_issues_bulk(known))) if known else None
+    singles = {
+        k: asyncio.ensure_future(bounded(abl.get_issue(k)))
+        for k in dict.fromkeys(ctx_keys)
+        if k not in known
+    }
+
+    async def bulk_issue(key: str) -> Any:
+        if key in singles:
+            return await singles[key]
+        assert bulk is not None
+        return _pick_issue(await bulk, key)
+
+    def pair(src: _ContextSource) -> Awaitable[tuple[Any, Any]]:
+        if src.issue_key:
+            return asyncio.gather(
+                bulk_issue(src.issue_key),
+                bounded(_recent_comments_async(abl, src.issue_key, settings)),
+            )
+        wiki_id = int(src.wiki_id or 0)
+        return asyncio.gather(
+            bounded(abl.get_wiki(wiki_id)), bounded(abl.list_wiki_attachments(wiki_id))
         )
-        return _response(500, {"error": f"backlog fetch failed: {e}"})
+
+    t0 = time.time()
+    main = asyncio.gather(
+        bounded(abl.get_issue(issue_key)),
+        bounded(_recent_comments_async(abl, issue_key, settings, _history_count(settings, job))),
+    )
+    ctx = asyncio.gather(*(pair(src) for src in sources), return_exceptions=True)
+    try:
+        issue_obj, recent = await main
+    except BaseException:
+        ctx.cancel()
+        for task in [bulk, *singles.values()]:
+            if task is not None:
+                task.cancel()
+        raise
+    _log(
+        "backlog_fetch_ok",
+        rid=_rid(context),
+        issueKey=issue_key,
+        comments=len(recent),
+        ctxBulkIssues=len(known),
+        ctxSingleIssues=len(singles),
+        ms=int((time.time() - t0) * 1000),
+    )
+    fetchers = [partial(_resolved, r) for r in await ctx]
+    used_context_urls, context_texts = _collect_context(sources, fetchers, settings, context)
+    return _Fetched(issue_obj, recent, used_context_urls, context_texts)
+
+
+class _ProgressComment:
+    """Placeholder reply edited in place while the LLM response streams in."""
+
+    PLACEHOLDER = incremental.PROGRESS_PLACEHOLDER
+
+    def __init__(
+        self,
+        issue_key: str,
+        comment_id: int,
+        update_comment: Callable[[str, int, str], Any],
+        interval: float,
+        context: Any,
+    ) -> None:
+        self.issue_key = issue_key
+        self.comment_id = comment_id
+        self.update_comment = update_comment
+        self.interval = interval
+        self.context = context
+        # Held while an edit is in flight, so the final text is never overwritten.
+        self._lock = threading.Lock()
+        self._last = time.monotonic()
+        self._closed = False
+
+    @classmethod
+    def start(
+        cls,
+        settings: Settings,
+        issue_key: str,
+        post_comment: Callable[[str, str], Any],
+        update_comment: Callable[[str, int, str], Any] | None,
+        context: Any,
+        resume_id: int | None = None,
+    ) -> _ProgressComment | None:
+        """Post the placeholder; None (post normally at the end) if streaming is off or fails.
+
+        `resume_id` is the placeholder of an earlier attempt at the same job: it is
+        reset and reused (streaming or not), so no dead placeholder is left behind.
+        """
+        interval = settings.llm_stream_update_interval_seconds
+        if update_comment is None:
+            return None
+        if resume_id:
+            try:
+                update_comment(issue_key, resume_id, cls.PLACEHOLDER)
+                return cls(issue_key, resume_id, update_comment, interval, context)
+            except Exception as e:
+                _log("stream_placeholder_error", rid=_rid(context), error=str(e))
+        if not settings.llm_streaming:
+            return None
+        try:
+            posted = post_comment(issue_key, cls.PLACEHOLDER)
+            comment_id = int((posted or {}).get("id") or 0)
+        except Exception as e:
+            _log("stream_placeholder_error", rid=_rid(context), error=str(e))
+            return None
+        if not comment_id:
+            return None
+        return cls(issue_key, comment_id, update_comment, interval, context)
+
+    def on_text(self, text: str) -> None:
+        """Stream callback: edit the comment with the partial text at most every `interval`."""
+        if time.monotonic() - self._last < self.interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if self._closed:
+                return
+            self.update_comment(self.issue_key, self.comment_id, f"{text}\n\n{self.PLACEHOLDER}")
+        except Exception as e:
+            _log("stream_update_error", rid=_rid(self.context), error=str(e))
+        finally:
+            self._last = time.monotonic()
+            self._lock.release()
+
+    def finish(self, text: str) -> None:
+        with self._lock:
+            self._closed = True
+            self.update_comment(self.issue_key, self.comment_id, text)
+
+
+def _overflow(items: list[str], kept: list[str]) -> list[str]:
+    """What of `items` the prompt packer left out of `kept`.
+
+    Dropped items are returned whole; of the item it truncated only the cut-off
+    rest, since its beginning is already in the prompt.
+    """
+    n = 0
+    while n < min(len(items), len(kept)) and items[n] == kept[n]:
+        n += 1
+    if n == len(kept):
+        return items[n:]
+    cut = len(os.path.commonprefix([items[n], kept[n]]))
+    rest = items[n][cut:].strip()
+    return ([f"…{rest}"] if rest else []) + items[n + 1 :]
+
+
+def _respond(
+    settings: Settings,
+    job: _Job,
+    fetched: _Fetched,
+    post_comment: Callable[[str, str], Any],
+    context: Any,
+    start_ts: float,
+    deadline: Deadline,
+    update_comment: Callable[[str, int, str], Any] | None = None,
+) -> dict[str, Any]:
+    """Steps 8-9: build the prompt, call the LLM and post the reply.
+
+    With LLM_STREAMING a placeholder is posted first and edited as text arrives.
+    """
+    cmd, issue_key, comment_id = job.cmd, job.issue_key, job.comment_id
+    issue_obj, recent = fetched.issue, fetched.comments
+    used_context_urls, context_texts = fetched.used_context_urls, fetched.context_texts
 
     title = issue_obj.get("summary") or issue_obj.get("title") or ""
     description = issue_obj.get("description") or ""
@@ -265,15 +689,35 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     def _user_name(u: dict[str, Any] | None) -> str:
         return (u or {}).get("name") or (u or {}).get("userId") or ""
 
-    # Build recent comments with author and timestamp
-    latest_lines: list[str] = []
-    for c in recent[: settings.recent_comment_count]:
-        content_txt = (c.get("content") or "").strip()
-        if not content_txt:
-            continue
-        created = c.get("created") or ""
-        author = _user_name(c.get("createdUser") or {})
-        latest_lines.append(f"[{created}] {author}: {content_txt}")
+    # Build recent comments with author and timestamp. Bot invocations are left
+    # out: they are not issue discussion. With the reply cache on, so are the
+    # bot's own replies, which would make every prompt unique (defeating the
+    # cache); without it they stay, so follow-up questions see earlier answers.
+    skip_bot_replies = settings.llm_cache_ttl_seconds > 0
+
+    def _comment_lines(comments: list[dict[str, Any]], changes: bool = False) -> list[str]:
+        lines: list[str] = []
+        for c in comments:
+            content_txt = (c.get("content") or "").strip()
+            if commands.is_command_comment(content_txt):
+                continue
+            is_bot = str((c.get("createdUser") or {}).get("id")) == str(settings.bot_user_id)
+            if skip_bot_replies and is_bot:
+                continue
+            created = c.get("created") or ""
+            author = _user_name(c.get("createdUser") or {})
+            # Field changes come in the same order (newest first) as the comments.
+            if changes:
+                lines.extend(
+                    f"[{created}] {author}: （変更）{x}" for x in incremental.change_lines(c)
+                )
+            if content_txt:
+                lines.append(f"[{created}] {author}: {content_txt}")
+        return lines
+
+    latest_lines = _comment_lines(recent[: settings.recent_comment_count])
+    # Older history, loaded for /summary only; folded in through map-reduce.
+    older_lines = _comment_lines(recent[settings.recent_comment_count :])
 
     # Build major issue fields (including custom fields)
     def _names(items: list[dict[str, Any]] | None) -> str:
@@ -326,144 +770,257 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             if value not in (None, ""):
                 fields_lines.append(f"{name}: {value}")
 
-    # 7) Optional link context
-    used_context_urls: list[str] = []
-    context_texts: list[str] = []
-    for url in extract_context_urls(comment.get("content")):
-        if not allowlisted(url, settings.context_allowed_hosts):
-            continue
-        if sum(len(t) for t in context_texts) >= settings.context_total_max_bytes:
-            break
-        try:
-            ctx_issue_key, comment_ref = parse_backlog_issue_url(url, settings.backlog_base_url)
-            wiki_id = parse_backlog_wiki_url(url, settings.backlog_base_url)
-            if ctx_issue_key:
-                issue_obj2 = bl.get_issue(ctx_issue_key)
-                comments2 = bl.list_comments(issue_key, count=settings.recent_comment_count)
-                txt = backlog_issue_to_text(
-                    issue_obj2, comments2, settings.context_url_max_bytes, comment_ref
-                )
-                _log(
-                    "context_added_issue",
-                    rid=_rid(context),
-                    source=url,
-                    issueKey=ctx_issue_key,
-                )
-            elif wiki_id:
-                wiki = bl.get_wiki(int(wiki_id))
-                w_attachments = bl.list_wiki_attachments(int(wiki_id))
-                txt = backlog_wiki_to_text(wiki, w_attachments, settings.context_url_max_bytes)
-                _log(
-                    "context_added_wiki",
-                    rid=_rid(context),
-                    source=url,
-                    wikiId=int(wiki_id),
-                )
-            else:
-                # 非Backlog URLは無視
-                continue
-        except Exception:
-            _log("context_fetch_error", rid=_rid(context), source=url)
-            continue
-        if txt:
-            context_texts.append(txt)
-            used_context_urls.append(url)
-
     # 8) Build prompts per command + retry LLM, no rule-based fallback
-    model_id = settings.llm_model
     reply_text = ""
 
-    def _build_summary_prompt() -> str:
-        p = (
-            f"チケットの題名と説明、直近コメントからPM観点の要約を作ってください。\n"
-            f"題名: {title}\n説明: {description[:1500]}\n"
-            + ("\n主要フィールド:\n- " + "\n- ".join(fields_lines) if fields_lines else "")
-            + (
-                "\n直近コメント(新しい順):\n- " + "\n- ".join(latest_lines[:50])
-                if latest_lines
-                else ""
-            )
+    # Fit the sections into the prompt token budget: fields and description are
+    # guaranteed a share, comments are kept newest-first, context gets the rest.
+    packed = prompt_pack.pack(
+        [
+            prompt_pack.Section("fields", fields_lines, share=0.05, priority=0),
+            prompt_pack.Section("description", [description], share=0.2, priority=1),
+            prompt_pack.Section("comments", latest_lines, share=0.35, priority=2),
+            prompt_pack.Section("context", context_texts, share=0.3, priority=3),
+        ],
+        max(0, settings.llm_prompt_max_tokens - prompt_pack.estimate_tokens(title)),
+    )
+    fields_text = "\n- ".join(packed["fields"])
+    comments_text = "\n- ".join(packed["comments"])
+
+    # Prompt parts, most stable first: the issue block is identical for every
+    # command on the issue, so it can be served from the Bedrock prompt cache.
+    issue_block = (
+        f"題名: {title}\n説明: {''.join(packed['description'])}\n"
+        + (f"\n主要フィールド:\n- {fields_text}" if fields_text else "")
+        + (f"\n直近コメント(新しい順):\n- {comments_text}" if comments_text else "")
+    )
+    extra_block = "追加コンテキスト:\n" + "\n".join(packed["context"]) if packed["context"] else ""
+
+    # History the packer had to drop (oldest first), to be summarized by map-reduce.
+    overflow_comments = list(reversed(_overflow(latest_lines, packed["comments"]) + older_lines))
+    overflow_context = _overflow(context_texts, packed["context"])
+    map_reduce_on = settings.summary_chunk_tokens > 0 and bool(
+        overflow_comments or overflow_context
+    )
+
+    # Incremental /summary: start from the bot's previous summary and feed only
+    # what happened since, unless that delta is too large to be worth it.
+    incremental_prompt: list[str] | None = None
+    prev_idx = None
+    if cmd.get("cmd") == "summary" and settings.summary_incremental_max_tokens > 0:
+        prev_idx = incremental.find_previous_summary(recent, settings.bot_user_id)
+    if prev_idx is not None and not context_texts:
+        prev = recent[prev_idx]
+        delta = list(reversed(_comment_lines(recent[:prev_idx], changes=True)))
+        delta_tokens = sum(prompt_pack.estimate_tokens(x) for x in delta)
+        use_delta = delta_tokens <= settings.summary_incremental_max_tokens
+        _log(
+            "summary_incremental" if use_delta else "summary_delta_too_large",
+            rid=_rid(context),
+            issueKey=issue_key,
+            since=prev.get("id"),
+            comments=prev_idx,
+            delta_tokens=delta_tokens,
         )
-        if context_texts:
-            p += "\n\n追加コンテキスト:\n" + "\n".join(context_texts[:2])
-        return p
-
-    def _build_ask_prompt(q: str) -> str:
-        p = (
-            f"以下のチケット情報に基づいて質問に回答してください。\n質問: {q}\n\n"
-            f"題名: {title}\n説明: {description[:1500]}\n"
-            + ("\n主要フィールド:\n- " + "\n- ".join(fields_lines) if fields_lines else "")
-            + (
-                "\n直近コメント(新しい順):\n- " + "\n- ".join(latest_lines[:50])
-                if latest_lines
-                else ""
-            )
+        if use_delta:
+            fields_block = "\n- ".join(fields_lines)
+            incremental_prompt = [
+                f"題名: {title}\n主要フィールド（現在）:\n- {fields_block}",
+                f"前回の要約（{prev.get('created') or ''}）:\n{incremental.summary_text(prev)}",
+                "前回の要約以降のコメントと変更（古い順）:\n- " + "\n- ".join(delta)
+                if delta
+                else "前回の要約以降のコメントや変更はありません。",
+                "前回の要約を起点に、その後のコメントと変更を反映したPM観点の最新の要約を"
+                "作ってください。前回から変わった点が分かるようにしてください。",
+            ]
+
+    def _summarize_overflow(items: list[str], share: float, timeout: float) -> list[str]:
+        if not items:
+            return []
+        # Chunk summaries are many small calls; they always go to the fast model.
+        model_id = settings.llm_fast_model
+        result = map_reduce.summarize_history(
+            model_id,
+            items,
+            chunk_tokens=settings.summary_chunk_tokens,
+            max_tokens=int(settings.llm_prompt_max_tokens * share),
+            concurrency=settings.summary_map_concurrency,
+            timeout=timeout,
+            cache_ttl_seconds=settings.summary_chunk_cache_ttl_seconds,
+            cache_bucket=settings.llm_cache_bucket,
         )
-        if context_texts:
-            p += "\n\n追加コンテキスト:\n" + "\n".join(context_texts[:2])
-        return p
-
-    def _build_update_prompt() -> str:
-        return (
-            "以下の本文から、期限・優先度・状態・担当の妥当性をレビューし、"
-            "フォーマット『項目名: before → after （理由）』で更新提案を出してください。\n\n"
-            f"題名: {title}\n説明: {description[:1500]}\n"
-            + ("\n主要フィールド:\n- " + "\n- ".join(fields_lines) if fields_lines else "")
-            + (
-                "\n直近コメント(新しい順):\n- " + "\n- ".join(latest_lines[:50])
-                if latest_lines
-                else ""
-            )
+        _log(
+            "llm_map",
+            rid=_rid(context),
+            model=model_id,
+            items=len(items),
+            chunks=result.chunks,
+            cached=result.cached,
+            ms=result.ms,
         )
+        return result.summaries
+
+    def _build_reduce_prompt(timeout: float) -> list[str]:
+        history = _summarize_overflow(overflow_comments, 0.35, timeout)
+        more_context = _summarize_overflow(overflow_context, 0.3, timeout)
+        return [
+            issue_block,
+            extra_block,
+            "それ以前の経緯（古い順の要約）:\n" + "\n\n".join(history) if history else "",
+            "追加コンテキスト（続き）の要約:\n" + "\n\n".join(more_context) if more_context else "",
+            "上記のチケットの題名と説明、経緯の要約と直近コメントからPM観点の要約を作ってください。",
+        ]
+
+    def _build_summary_prompt() -> list[str]:
+        return [
+            issue_block,
+            extra_block,
+            "上記のチケットの題名と説明、直近コメントからPM観点の要約を作ってください。",
+        ]
+
+    def _build_ask_prompt(q: str) -> list[str]:
+        return [
+            issue_block,
+            extra_block,
+            f"上記のチケット情報に基づいて質問に回答してください。\n質問: {q}",
+        ]
+
+    def _build_update_prompt() -> list[str]:
+        return [
+            issue_block,
+            "上記の本文から、期限・優先度・状態・担当の妥当性をレビューし、"
+            "フォーマット『項目名: before → after （理由）』で更新提案を出してください。",
+        ]
+
+    progress: _ProgressComment | None = None
+
+    def _deliver(text: str) -> Any:
+        """Post (or finish streaming) the reply; returns the reply's comment id."""
+        if progress is not None:
+            try:
+                progress.finish(text)
+                return progress.comment_id
+            except Exception as e:
+                _log("stream_finish_error", rid=_rid(context), error=str(e))
+        posted = post_comment(issue_key, text)
+        return posted.get("id") if isinstance(posted, dict) else None
 
     def _call_with_retry(kind: str) -> str:
+        nonlocal progress, job
+        reduce = kind == "summary" and map_reduce_on and incremental_prompt is None
+        if kind == "summary" and incremental_prompt is not None:
+            prompt, call = incremental_prompt, summarize
+        elif kind == "summary":
+            prompt, call = _build_summary_prompt(), summarize
+        elif kind == "ask":
+            prompt, call = _build_ask_prompt(cmd.get("question", "").strip()), answer
+        elif kind == "update":
+            prompt, call = _build_update_prompt(), review_update
+        else:
+            raise ValueError("unknown kind")
+
+        # The map-reduce reply depends on the full overflowing history as well.
+        key_parts = prompt + overflow_comments + overflow_context if reduce else prompt
+        prompt_tokens = sum(prompt_pack.estimate_tokens(p) for p in key_parts)
+        model_id = router.choose(settings, kind, prompt_tokens, deadline)
+        p95 = router.p95(model_id)
+        _log(
+            "llm_route",
+            rid=_rid(context),
+            kind=kind,
+            model=model_id,
+            prompt_tokens=prompt_tokens,
+            p95_ms=int(p95 * 1000) if p95 is not None else None,
+        )
+        cache_key = llm_cache.cache_key(model_id, kind, SYSTEM_PROMPTS[kind], key_parts)
+        cache_ttl, cache_bucket = settings.llm_cache_ttl_seconds, settings.llm_cache_bucket
+        if cache_ttl > 0:
+            hit = llm_cache.get(cache_key, ttl_seconds=cache_ttl, bucket=cache_bucket)
+            _log(
+                "llm_cache_hit" if hit else "llm_cache_miss",
+                rid=_rid(context),
+                kind=kind,
+                model=model_id,
+                tier=hit[1] if hit else None,
+                key=cache_key[:16],
+            )
+            if hit:
+                return hit[0]
+
+        resume_id = int((job.claim.record if job.claim else {}).get("progress_comment_id") or 0)
+        progress = _ProgressComment.start(
+            settings, issue_key, post_comment, update_comment, context, resume_id
+        )
+        if progress is not None and progress.comment_id != resume_id:
+            # Lets an attempt that takes over this job finish the placeholder.
+            job = _note_job(settings, job, context, progress_comment_id=progress.comment_id)
+        primary = hedge.Target(model_id)
+        alternate = _hedge_target(settings, model_id)
         last_err: Exception | None = None
-        for _i in range(max(1, settings.llm_max_retries)):
+        for i in range(max(1, settings.llm_max_retries)):
+            # Retry only while an attempt still fits before the posting reserve.
+            if i and not deadline.can_afford(_MIN_LLM_ATTEMPT_SECONDS):
+                _log("llm_retry_skipped", rid=_rid(context), kind=kind, reason="deadline")
+                break
             try:
-                if kind == "summary":
-                    prompt = _build_summary_prompt()
-                    t0 = time.time()
-                    out = summarize(model_id, prompt)
-                    _log(
-                        "llm_ok",
-                        rid=_rid(context),
-                        kind=kind,
-                        model=model_id,
-                        ms=int((time.time() - t0) * 1000),
-                        prompt_chars=len(prompt),
-                        out_chars=len(out or ""),
-                    )
-                    return out
-                if kind == "ask":
-                    q = cmd.get("question", "").strip()
-                    prompt = _build_ask_prompt(q)
-                    t0 = time.time()
-                    out = answer(model_id, prompt)
-                    _log(
-                        "llm_ok",
-                        rid=_rid(context),
-                        kind=kind,
-                        model=model_id,
-                        ms=int((time.time() - t0) * 1000),
-                        prompt_chars=len(prompt),
-                        out_chars=len(out or ""),
-                    )
-                    return out
-                if kind == "update":
-                    prompt = _build_update_prompt()
-                    t0 = time.time()
-                    out = review_update(model_id, prompt)
-                    _log(
-                        "llm_ok",
-                        rid=_rid(context),
-                        kind=kind,
-                        model=model_id,
-                        ms=int((time.time() - t0) * 1000),
-                        prompt_chars=len(prompt),
-                        out_chars=len(out or ""),
-                    )
-                    return out
-                raise ValueError("unknown kind")
+                timeout = deadline.timeout(settings.llm_timeout_seconds)
+                if reduce:
+                    prompt = _build_reduce_prompt(timeout)
+                    timeout = deadline.timeout(settings.llm_timeout_seconds)
+                # The read timeout bounds the first token and each gap of a stream;
+                # the stream as a whole may run until the deadline.
+                total_timeout = deadline.timeout(float("inf"))
+                t0 = time.time()
+                # Fresh per attempt, closed when the attempt ends, so a stream that
+                # outlives its attempt cannot write into the retry's progress comment.
+                stream_to = hedge.exclusive_stream(
+                    progress.on_text if progress is not None and settings.llm_streaming else None
+                )
+
+                def attempt(
+                    target: hedge.Target,
+                    prompt: list[str] = prompt,
+                    timeout: float = timeout,
+                    total_timeout: float = total_timeout,
+                    stream_to: hedge.ExclusiveStream = stream_to,
+                ) -> Completion:
+                    t_start = time.time()
+                    try:
+                        return call(
+                            target.model_id,
+                            prompt,
+                            timeout=timeout,
+                            total_timeout=total_timeout,
+                            on_text=stream_to(target),
+                            cache_prompt=settings.llm_prompt_caching,
+                            region=target.region,
+                        )
+                    finally:
+                        router.observe(target.model_id, time.time() - t_start)
+
+                hedge_delay = router.p90(model_id) or settings.llm_hedge_delay_seconds
+                try:
+                    result = hedge.run(attempt, primary, alternate, hedge_delay)
+                finally:
+                    stream_to.close()
+                out = result.value
+                _log(
+                    "llm_ok",
+                    rid=_rid(context),
+                    kind=kind,
+                    model=model_id,
+                    served_by=result.target.label(),
+                    hedged=result.hedged,
+                    ms=int((time.time() - t0) * 1000),
+                    prompt_chars=sum(len(p) for p in prompt),
+                    out_chars=len(out.text or ""),
+                    input_tokens=out.usage.get("input_tokens"),
+                    output_tokens=out.usage.get("output_tokens"),
+                    cache_read_tokens=out.usage.get("cache_read_input_tokens"),
+                    cache_write_tokens=out.usage.get("cache_creation_input_tokens"),
+                )
+                llm_cache.put(cache_key, out.text, ttl_seconds=cache_ttl, bucket=cache_bucket)
+                return out.text
             except Exception as e:  # pragma: no cover
                 last_err = e
                 _log(
@@ -479,7 +1036,7 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         reply_text = _call_with_retry(cmd["cmd"])
         if cmd["cmd"] == "summary" and used_context_urls:
             ctx_lines = "\n".join(f"- {u}" for u in used_context_urls)
-            reply_text += "\n\n**参照コンテキスト**\n" + ctx_lines
+            reply_text += f"\n\n{incremental.CONTEXT_HEADING}\n" + ctx_lines
     except Exception as e:  # pragma: no cover
         logger.exception("LLM failed after retries: %s", e)
         _log("llm_failed", rid=_rid(context), error=str(e))
@@ -487,19 +1044,31 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             "⚠️ エラーが発生したため要約/回答を生成できませんでした。"
             "お手数ですが管理者にお問い合わせください。"
         )
+        deadline.release_reserve()
+        error_id = None
         try:
-            bl.post_comment(issue_key, error_text)
+            error_id = _deliver(error_text)
         except Exception:
             pass
+        # Settle the job instead of releasing it: a redelivery would otherwise post
+        # a second reply under the error (and the error may be out even if this raised).
+        elapsed_ms = int((time.time() - start_ts) * 1000)
+        _complete_job(settings, job, context, error_id, elapsed_ms, error="llm_failed")
         return _response(500, {"error": "llm_failed"})
 
     # 9) Post reply
+    deadline.release_reserve()
     try:
-        bl.post_comment(issue_key, reply_text)
+        reply_id = _deliver(reply_text)
     except Exception as e:  # pragma: no cover
         logger.exception("Backlog post failed")
         _log("backlog_post_error", rid=_rid(context), error=str(e))
-        return _response(500, {"error": f"backlog post failed: {e}"})
+        # The reply (or the streamed edit) may be out even though the call raised;
+        # retrying could post it twice, so the job is settled as failed.
+        elapsed_ms = int((time.time() - start_ts) * 1000)
+        _complete_job(settings, job, context, None, elapsed_ms, error="backlog_post_failed")
+        return _response(500, {"error": "backlog_post_failed", "detail": str(e)})
+    _complete_job(settings, job, context, reply_id, int((time.time() - start_ts) * 1000))
     _log(
         "ok",
         rid=_rid(context),
@@ -509,3 +1078,410 @@ def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
         cmd=cmd.get("cmd"),
     )
     return _response(200, {"result": "ok"})
+
+
+def _idempotency_backend(settings: Settings) -> idempotency.Backend | None:
+    kind = settings.idempotency_backend
+    if not kind:
+        return None
+    if kind == "s3" and settings.idempotency_bucket:
+        return idempotency.S3Backend(settings.idempotency_bucket)
+    if kind == "dynamodb" and settings.idempotency_table:
+        return idempotency.DynamoDBBackend(
+            settings.idempotency_table, settings.idempotency_ttl_seconds
+        )
+    if kind == "sqlite":
+        return idempotency.sqlite_backend(
+            settings.idempotency_sqlite_path, settings.idempotency_ttl_seconds
+        )
+    if kind == "s3":
+        raise ValueError("IDEMPOTENCY_BACKEND=s3 needs IDEMPOTENCY_BUCKET")
+    if kind == "dynamodb":
+        raise ValueError("IDEMPOTENCY_BACKEND=dynamodb needs IDEMPOTENCY_TABLE")
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND={kind!r}; expected one of: s3, dynamodb, sqlite")
+
+
+def _marker(issue_key: str, comment_id: str) -> str:
+    return f"{issue_key}/{comment_id}"
+
+
+def _complete_job(
+    settings: Settings,
+    job: _Job,
+    context: Any,
+    reply_id: Any,
+    elapsed_ms: int,
+    error: str | None = None,
+) -> None:
+    """Record the posted reply (or the failure) so redeliveries are answered from the marker."""
+    store = _idempotency_backend(settings)
+    if job.claim is None or store is None:
+        return
+    try:
+        done = idempotency.complete(
+            store,
+            _marker(job.issue_key, job.comment_id),
+            job.claim,
+            reply_comment_id=reply_id,
+            elapsed_ms=elapsed_ms,
+            error=error,
+        )
+        if not done:
+            _lease_lost(job, context, "complete")
+    except idempotency.IdempotencyError as e:
+        # The reply is out; a redelivery after the lease expires may repeat it.
+        _log("idempotency_error", rid=_rid(context), issueKey=job.issue_key, error=str(e))
+
+
+def _release_job(settings: Settings, job: _Job, context: Any, reason: str) -> None:
+    """Hand the lease back after a failure, so Backlog's redelivery retries right away."""
+    store = _idempotency_backend(settings)
+    if job.claim is None or store is None:
+        return
+    try:
+        released = idempotency.release(
+            store,
+            _marker(job.issue_key, job.comment_id),
+            job.claim,
+            error=reason,
+        )
+        if not released:
+            _lease_lost(job, context, "release")
+    except idempotency.IdempotencyError as e:
+        # The lease then simply expires.
+        _log("idempotency_error", rid=_rid(context), issueKey=job.issue_key, error=str(e))
+
+
+def _note_job(settings: Settings, job: _Job, context: Any, **fields: Any) -> _Job:
+    """Add `fields` to the job's in-progress record; returns the job with the updated lease."""
+    store = _idempotency_backend(settings)
+    if job.claim is None or store is None:
+        return job
+    try:
+        claimed = idempotency.note(
+            store, _marker(job.issue_key, job.comment_id), job.claim, **fields
+        )
+    except idempotency.IdempotencyError as e:
+        _log("idempotency_error", rid=_rid(context), issueKey=job.issue_key, error=str(e))
+        return job
+    if claimed is None:
+        _lease_lost(job, context, "note")
+        return job
+    return job._replace(claim=claimed)
+
+
+def _lease_lost(job: _Job, context: Any, step: str) -> None:
+    # This attempt outlived its lease and a retry took the record over; leave it to the retry.
+    _log(
+        "idempotency_lease_lost",
+        rid=_rid(context),
+        issueKey=job.issue_key,
+        commentId=job.comment_id,
+        step=step,
+    )
+
+
+def _backlog_api_key(settings: Settings, context: Any) -> str | None:
+    # 5) Backlog API client
+    secrets = _load_secrets(settings)
+    api_key = secrets.get("BACKLOG_API_KEY")
+    if not api_key:
+        _log("config_error_missing_api_key", rid=_rid(context))
+    return api_key
+
+
+def _hedge_target(settings: Settings, model_id: str) -> hedge.Target | None:
+    """Alternate model/region to hedge `model_id` calls to, if hedging is configured."""
+    if not (settings.llm_hedge_model or settings.llm_hedge_region):
+        return None
+    return hedge.Target(settings.llm_hedge_model or model_id, settings.llm_hedge_region)
+
+
+def _client_options(settings: Settings, deadline: Deadline) -> dict[str, Any]:
+    return {
+        "timeout": settings.backlog_timeout_seconds,
+        "deadline": deadline,
+        "cache_max_bytes": settings.backlog_cache_max_bytes,
+        "max_response_bytes": settings.backlog_max_response_bytes,
+        "rate_limit_max_wait": settings.backlog_rate_limit_max_wait_seconds,
+        "rate_limit_retries": settings.backlog_rate_limit_retries,
+    }
+
+
+def _aws_options(settings: Settings) -> aws.ClientOptions:
+    return aws.ClientOptions(
+        connect_timeout=settings.aws_connect_timeout_seconds,
+        read_timeout=settings.aws_read_timeout_seconds,
+        bedrock_read_timeout=float(settings.llm_timeout_seconds),
+        max_pool_connections=settings.aws_max_pool_connections,
+        retry_mode=settings.aws_retry_mode,
+        max_attempts=settings.aws_max_attempts,
+    )
+
+
+def _llm_provider(settings: Settings) -> llm.Provider:
+    if settings.llm_provider == "bedrock":
+        return llm.BedrockProvider()
+    if settings.llm_provider == "local":
+        return llm_local.LocalProvider(
+            llm_local.LocalOptions(
+                latency_p50_seconds=settings.llm_local_latency_p50_seconds,
+                latency_p95_seconds=settings.llm_local_latency_p95_seconds,
+                tokens_per_second=settings.llm_local_tokens_per_second,
+                output_tokens=settings.llm_local_output_tokens,
+                error_rate=settings.llm_local_error_rate,
+            )
+        )
+    raise ValueError(f"unknown LLM_PROVIDER: {settings.llm_provider}")
+
+
+def _fetch_failed(issue_key: str, e: Exception, context: Any) -> dict[str, Any]:
+    logger.exception("Backlog fetch failed")
+    _log(
+        "backlog_fetch_error",
+        rid=_rid(context),
+        issueKey=issue_key,
+        error=str(e),
+    )
+    return _response(500, {"error": f"backlog fetch failed: {e}"})
+
+
+def _job_queue(settings: Settings) -> jobqueue.Queue | None:
+    kind = settings.job_queue
+    if not kind:
+        return None
+    if kind == "sqs" and settings.job_queue_url:
+        return jobqueue.SQSQueue(settings.job_queue_url)
+    if kind == "lambda" and settings.job_worker_function:
+        return jobqueue.LambdaQueue(settings.job_worker_function)
+    if kind == "local":
+        return jobqueue.local_queue(_work_local, settings.job_local_workers)
+    raise ValueError(f"JOB_QUEUE={kind} needs JOB_QUEUE_URL/JOB_WORKER_FUNCTION")
+
+
+def _job_message(job: _Job) -> dict[str, Any]:
+    # Only what the worker needs; the webhook payload itself can be large.
+    return {
+        "cmd": job.cmd,
+        "issueKey": job.issue_key,
+        "commentId": job.comment_id,
+        "content": job.comment.get("content"),
+        "enqueuedAt": time.time(),
+    }
+
+
+def _job_from_message(message: dict[str, Any]) -> _Job:
+    comment_id = str(message.get("commentId") or "")
+    comment = {"id": comment_id, "content": message.get("content")}
+    return _Job(message["cmd"], comment, str(message.get("issueKey") or ""), comment_id)
+
+
+def _enqueue(queue: jobqueue.Queue, job: _Job, context: Any) -> dict[str, Any]:
+    t0 = time.perf_counter()
+    try:
+        queue.send(_job_message(job))
+    except Exception as e:
+        # Nothing was queued: fail so Backlog redelivers the webhook.
+        _log("enqueue_failed", rid=_rid(context), issueKey=job.issue_key, error=str(e))
+        return _response(500, {"error": "enqueue_failed"})
+    _log(
+        "job_enqueued",
+        rid=_rid(context),
+        issueKey=job.issue_key,
+        commentId=job.comment_id,
+        queue=queue.name,
+        ms=int((time.perf_counter() - t0) * 1000),
+    )
+    return _response(200, {"result": "queued"})
+
+
+def _work(settings: Settings, message: dict[str, Any], context: Any) -> dict[str, Any]:
+    """Worker side of fast-ack mode: dedupe and process one queued job."""
+    start_ts = time.time()
+    deadline = Deadline.from_context(context, settings.deadline_reserve_seconds)
+    job = _claim(settings, _job_from_message(message), context)
+    if not isinstance(job, _Job):
+        return job
+    enqueued_at = message.get("enqueuedAt")
+    _log(
+        "job_started",
+        rid=_rid(context),
+        issueKey=job.issue_key,
+        commentId=job.comment_id,
+        queuedMs=int((start_ts - enqueued_at) * 1000) if enqueued_at else None,
+    )
+    return _process(settings, job, context, start_ts, deadline)
+
+
+def _work_local(message: dict[str, Any]) -> dict[str, Any]:
+    return _work(load_settings(), message, None)
+
+
+# Failures recorded as the job's outcome (see `_respond`): a redelivery would only
+# be answered as a duplicate, so the worker does not hand them back to the queue.
+_SETTLED_ERRORS = frozenset({"llm_failed", "backlog_post_failed"})
+
+
+def _retryable(result: dict[str, Any]) -> bool:
+    if result["statusCode"] < 500:
+        return False
+    return json.loads(result["body"]).get("error") not in _SETTLED_ERRORS
+
+
+def worker_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """Lambda entry point for queued jobs (SQS batch or asynchronous invoke).
+
+    For SQS, failed jobs are returned as `batchItemFailures` (enable
+    ReportBatchItemFailures on the event source mapping) so only they are
+    redelivered. A failed asynchronous invoke raises, so Lambda retries it.
+    Failures already settled with an error reply count as done.
+    """
+    _configure_logging()
+    settings = load_settings()
+    aws.configure(_aws_options(settings))
+    llm.configure(_llm_provider(settings))
+    batch = jobqueue.messages(event) or []
+    failed: list[str | None] = []
+    result: dict[str, Any] = _response(200, {"result": "ignored"})
+    for message in batch:
+        try:
+            result = _work(settings, message.job, context)
+        except Exception as e:
+            logger.exception("job failed")
+            _log("job_failed", rid=_rid(context), messageId=message.id, error=str(e))
+            result = _response(500, {"error": "job_failed"})
+        if _retryable(result):
+            failed.append(message.id)
+    if batch and batch[0].id is not None:
+        return {"batchItemFailures": [{"itemIdentifier": i} for i in failed]}
+    if failed:
+        raise RuntimeError(f"job failed: {result.get('body')}")
+    return result
+
+
+def lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    if jobqueue.messages(event) is not None:
+        # Asynchronous self-invoke, or SQS mapped onto this same function.
+        return worker_handler(event, context)
+    _configure_logging()
+    settings = load_settings()
+    aws.configure(_aws_options(settings))
+    llm.configure(_llm_provider(settings))
+    start_ts = time.time()
+    deadline = Deadline.from_context(context, settings.deadline_reserve_seconds)
+
+    queue = _job_queue(settings)
+    job = _accept(event, context, settings, claim=queue is None)
+    if not isinstance(job, _Job):
+        return job
+    if queue is not None:
+        return _enqueue(queue, job, context)
+    return _process(settings, job, context, start_ts, deadline)
+
+
+def _process(
+    settings: Settings, job: _Job, context: Any, start_ts: float, deadline: Deadline
+) -> dict[str, Any]:
+    """Steps 5-9 for an accepted (and claimed) job."""
+    api_key = _backlog_api_key(settings, context)
+    if not api_key:
+        _release_job(settings, job, context, "missing_api_key")
+        return _response(500, {"error": "BACKLOG_API_KEY not found"})
+    bl = BacklogClient(settings.backlog_base_url, api_key, **_client_options(settings, deadline))
+
+    try:
+        fetched = _fetch(bl, settings, job, context)
+    except Exception as e:
+        _release_job(settings, job, context, "backlog_fetch_failed")
+        return _fetch_failed(job.issue_key, e, context)
+    update_comment = bl.update_comment if settings.llm_streaming else None
+    return _respond(
+        settings, job, fetched, bl.post_comment, context, start_ts, deadline, update_comment
+    )
+
+
+async def lambda_handler_async(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """Same pipeline as `lambda_handler`, with Backlog I/O on `AsyncBacklogClient`.
+
+    The LLM call (blocking boto3) runs in a worker thread; posting the reply is
+    scheduled back onto the event loop. Queued jobs run on the sync worker path.
+    """
+    if jobqueue.messages(event) is not None:
+        return await asyncio.to_thread(worker_handler, event, context)
+    _configure_logging()
+    settings = load_settings()
+    aws.configure(_aws_options(settings))
+    llm.configure(_llm_provider(settings))
+    start_ts = time.time()
+    deadline = Deadline.from_context(context, settings.deadline_reserve_seconds)
+
+    queue = _job_queue(settings)
+    job = _accept(event, context, settings, claim=queue is None)
+    if not isinstance(job, _Job):
+        return job
+    if queue is not None:
+        return await asyncio.to_thread(_enqueue, queue, job, context)
+
+    api_key = _backlog_api_key(settings, context)
+    if not api_key:
+        _release_job(settings, job, context, "missing_api_key")
+        return _response(500, {"error": "BACKLOG_API_KEY not found"})
+    abl = AsyncBacklogClient(
+        settings.backlog_base_url, api_key, **_client_options(settings, deadline)
+    )
+
+    try:
+        fetched = await _fetch_async(abl, settings, job, context)
+    except Exception as e:
+        _release_job(settings, job, context, "backlog_fetch_failed")
+        return _fetch_failed(job.issue_key, e, context)
+
+    loop = asyncio.get_running_loop()
+
+    def post_comment(key: str, content: str) -> Any:
+        return asyncio.run_coroutine_threadsafe(abl.post_comment(key, content), loop).result()
+
+    def update_comment(key: str, cid: int, content: str) -> Any:
+        coro = abl.update_comment(key, cid, content)
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    return await asyncio.to_thread(
+        _respond,
+        settings,
+        job,
+        fetched,
+        post_comment,
+        context,
+        start_ts,
+        deadline,
+        update_comment if settings.llm_streaming else None,
+    )
+
+
+def async_lambda_handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """Lambda entry point for the asyncio pipeline.
+
+    Runs on a module-scope event loop so keep-alive connections survive warm starts.
+    """
+    return backlog_async.run(lambda_handler_async(event, context))
+
+
+def _prewarm() -> None:
+    """Create AWS clients during the Lambda init phase, which runs with boosted CPU."""
+    try:
+        settings = load_settings()
+        aws.configure(_aws_options(settings))
+        services = ["bedrock-runtime"] if settings.llm_provider == "bedrock" else []
+        if settings.idempotency_backend == "s3" or settings.comment_cache_bucket:
+            services.append("s3")
+        if settings.idempotency_backend == "dynamodb":
+            services.append("dynamodb")
+        if settings.job_queue in ("sqs", "lambda"):
+            services.append(settings.job_queue)
+        aws.prewarm(*services)
+    except Exception as e:
+        logger.warning("AWS client prewarm skipped: %s", e)
+
+
+if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+    _prewarm()
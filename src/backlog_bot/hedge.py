@@ -0,0 +1,138 @@
+"""
+Hedged Bedrock invocations.
+
+The primary request is sent first. If it has not completed after the hedge
+delay (normally the model's observed p90), the same request is sent to an
+alternate target, another region or inference profile or model, and whichever
+succeeds first is used. A throttling error on the primary fails over
+immediately instead of waiting for the delay. The losing request cannot be
+aborted once boto3 has sent it; it is left to finish (bounded by its own
+timeout) and its result is ignored.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Generic, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+# Bedrock error codes that mean "try elsewhere" rather than "the request is bad".
+_THROTTLE_CODES = frozenset(
+    {
+        "ThrottlingException",
+        "TooManyRequestsException",
+        "ServiceUnavailableException",
+        "ModelNotReadyException",
+    }
+)
+
+
+class Target(NamedTuple):
+    model_id: str
+    # None = the function's own region
+    region: str | None = None
+
+    def label(self) -> str:
+        return f"{self.model_id}@{self.region}" if self.region else self.model_id
+
+
+@dataclass(frozen=True)
+class HedgeResult(Generic[T]):
+    value: T
+    target: Target
+    # None when the primary answered in time, else "slow" or "throttled"
+    hedged: str | None
+
+
+def is_throttle(err: BaseException) -> bool:
+    """True for throttling/capacity errors (botocore ClientError or stream error events)."""
+    response = getattr(err, "response", None)
+    if isinstance(response, dict):
+        code = (response.get("Error") or {}).get("Code")
+        if code in _THROTTLE_CODES:
+            return True
+    text = f"{type(err).__name__} {err}".lower()
+    return "throttl" in text or "too many requests" in text
+
+
+class ExclusiveStream:
+    """Per-target streaming callbacks for one attempt.
+
+    Only the first target to emit text is forwarded. After `close` (the attempt
+    is over: answered, failed or timed out) every callback is a no-op, so a
+    request that is still streaming in the background cannot overwrite the
+    output of the next attempt.
+    """
+
+    def __init__(self, on_text: Callable[[str], None] | None) -> None:
+        self._on_text = on_text
+        self._lock = threading.Lock()
+        self._owner: Target | None = None
+        self._closed = False
+
+    def __call__(self, target: Target) -> Callable[[str], None] | None:
+        on_text = self._on_text
+        if on_text is None:
+            return None
+
+        def cb(text: str) -> None:
+            # Forward under the lock so nothing is emitted after `close` returns.
+            with self._lock:
+                if self._closed:
+                    return
+                if self._owner is None:
+                    self._owner = target
+                if self._owner == target:
+                    on_text(text)
+
+        return cb
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+
+
+def exclusive_stream(on_text: Callable[[str], None] | None) -> ExclusiveStream:
+    """Streaming callbacks for one attempt; create a fresh one per attempt and close it after."""
+    return ExclusiveStream(on_text)
+
+
+def run(
+    call: Callable[[Target], T],
+    primary: Target,
+    alternate: Target | None,
+    delay: float,
+) -> HedgeResult[T]:
+    """Run `call(primary)`, hedging to `alternate` after `delay` seconds or on throttling."""
+    first = _POOL.submit(call, primary)
+    if alternate is None or alternate == primary:
+        return HedgeResult(first.result(), primary, None)
+    done, _ = wait([first], timeout=max(0.0, delay))
+    if done:
+        err = first.exception()
+        if err is None:
+            return HedgeResult(first.result(), primary, None)
+        if not is_throttle(err):
+            raise err
+        reason = "throttled"
+    else:
+        reason = "slow"
+    futures: dict[Future[Any], Target] = {first: primary, _POOL.submit(call, alternate): alternate}
+    errors: list[BaseException] = []
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            err = f.exception()
+            if err is None:
+                for loser in pending:
+                    loser.cancel()
+                return HedgeResult(f.result(), futures[f], reason)
+            errors.append(err)
+    raise errors[-1]
@@ -1,13 +1,82 @@
 """
-Simple idempotency guard using S3.
+Idempotency for webhook deliveries, stored in S3, DynamoDB or SQLite.
 
-Stores a tiny marker object per processed comment id.
+One small JSON record per processed comment id moves through
+
+    (absent) --claim--> in_progress (lease) --complete--> completed
+                             |  ^
+                  release /  |  |  lease expired: next delivery takes over
+                  expiry     v  |
+
+`claim` creates the record with a single conditional write, so two concurrent
+deliveries of the same webhook cannot both see it as new: the store accepts
+exactly one of the writes and rejects the others. The winner holds a lease. If
+it crashes or times out, the lease expires and a later delivery takes the
+record over with a write conditional on the expired record's version, so again
+only one retry wins. `complete` and `release` are conditional on the version
+the claim wrote, so an invocation that outlived its lease cannot overwrite the
+record of the retry that took it over. A completed record keeps the posted
+reply's comment id and timing, so true duplicates are answered from it
+instantly.
+
+The store is a `Backend`: S3 (`If-None-Match: *` / `If-Match` on the ETag),
+a DynamoDB table (condition expressions, items expire by native TTL, and
+conditional puts are faster than S3's), or SQLite for local runs and tests.
+
+A bounded in-process map of recently seen records sits in front of the store:
+Backlog's redeliveries usually land on the same warm container seconds later
+and are then rejected without a round trip. Records only enter it after the
+store has been consulted (or written), so the durable guarantee is the store's
+alone.
 """
 
 from __future__ import annotations
 
 import importlib
-from typing import Any
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, NamedTuple, Protocol
+
+from . import aws
+from .cache import LRUCache
+
+CLAIMED = "claimed"
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+# Lease of an in-progress attempt; keep it above the Lambda timeout.
+LEASE_SECONDS = 120.0
+
+# Another write already holds the key (412), or one is in flight for it (409).
+_DUPLICATE_CODES = frozenset({"PreconditionFailed", "412", "ConditionalRequestConflict", "409"})
+
+
+# Last known record per (backend name, key); sized in entries (each counts as 1).
+_RECENT: LRUCache[tuple[str, str], dict[str, Any]] = LRUCache(10_000, ttl_seconds=600)
+_STATS_LOCK = threading.Lock()
+_STATS = {"memory_hits": 0, "backend_calls": 0}
+
+
+class IdempotencyError(RuntimeError):
+    """The marker store failed; whether the event is new is unknown."""
+
+
+class Claim(NamedTuple):
+    # CLAIMED: this invocation should do the work; IN_PROGRESS / COMPLETED: skip it.
+    state: str
+    record: dict[str, Any]
+    # Version this claim wrote (CLAIMED only); later writes are conditional on it.
+    version: str | None = None
+
+    @property
+    def resumed(self) -> bool:
+        """True when a previous attempt's expired lease was taken over."""
+        return self.state == CLAIMED and int(self.record.get("attempt") or 1) > 1
 
 
 def _boto3() -> Any:
@@ -15,13 +84,359 @@ def _boto3() -> Any:
     return globals().get("boto3") or importlib.import_module("boto3")
 
 
-def s3_record_if_new(bucket: str, key: str) -> bool:
-    """Return True if recorded now (i.e., first time), False if already exists."""
-    s3 = _boto3().client("s3")
+def _error_code(err: BaseException) -> str | None:
+    response = getattr(err, "response", None)
+    if not isinstance(response, dict):
+        return None
+    code = (response.get("Error") or {}).get("Code")
+    return str(code) if code is not None else None
+
+
+def _count(name: str) -> None:
+    with _STATS_LOCK:
+        _STATS[name] += 1
+
+
+def stats() -> dict[str, int]:
+    """Process-lifetime counters: duplicates answered from memory, calls to the store."""
+    with _STATS_LOCK:
+        return dict(_STATS)
+
+
+def _memory_on(ttl_seconds: float, max_entries: int) -> bool:
+    if max_entries <= 0 or ttl_seconds <= 0:
+        return False
+    _RECENT.max_bytes = max_entries
+    _RECENT.ttl_seconds = ttl_seconds
+    return True
+
+
+def _parse(body: bytes) -> dict[str, Any]:
+    try:
+        record = json.loads(body)
+    except ValueError:
+        record = None
+    # One-shot markers of earlier versions (b"1") or unreadable ones: treat as done.
+    return record if isinstance(record, dict) and "state" in record else {"state": COMPLETED}
+
+
+def _dump(record: dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False)
+
+
+class Backend(Protocol):
+    """Conditional record store; implementations raise IdempotencyError on failures."""
+
+    # Identifies the store in the in-process map (e.g. "s3:bucket").
+    name: str
+
+    def create(self, key: str, record: dict[str, Any]) -> str | None:
+        """Store `record` unless `key` exists; the new version, or None if it does."""
+        ...
+
+    def read(self, key: str) -> tuple[dict[str, Any], str] | None:
+        """(record, version) of `key`, or None if absent."""
+        ...
+
+    def replace(self, key: str, record: dict[str, Any], version: str) -> str | None:
+        """Overwrite `key` if it is still at `version`; the new version, or None if it changed."""
+        ...
+
+
+class S3Backend:
+    """One JSON object per key; versions are ETags. Expire old markers with a lifecycle rule."""
+
+    def __init__(self, bucket: str) -> None:
+        self.bucket = bucket
+        self.name = f"s3:{bucket}"
+
+    def _put(self, key: str, record: dict[str, Any], **condition: str) -> str | None:
+        try:
+            resp = aws.client(_boto3(), "s3").put_object(
+                Bucket=self.bucket, Key=key, Body=_dump(record).encode("utf-8"), **condition
+            )
+        except Exception as e:
+            if _error_code(e) in _DUPLICATE_CODES:
+                return None
+            raise IdempotencyError(f"idempotency S3 write failed: {e}") from e
+        return str((resp or {}).get("ETag") or "*")
+
+    def create(self, key: str, record: dict[str, Any]) -> str | None:
+        return self._put(key, record, IfNoneMatch="*")
+
+    def read(self, key: str) -> tuple[dict[str, Any], str] | None:
+        try:
+            obj = aws.client(_boto3(), "s3").get_object(Bucket=self.bucket, Key=key)
+            body = obj["Body"].read()
+        except Exception as e:
+            if _error_code(e) in ("NoSuchKey", "404"):
+                return None
+            raise IdempotencyError(f"idempotency S3 read failed: {e}") from e
+        return _parse(body), str(obj.get("ETag") or "*")
+
+    def replace(self, key: str, record: dict[str, Any], version: str) -> str | None:
+        return self._put(key, record, IfMatch=version)
+
+
+class DynamoDBBackend:
+    """Table with partition key `pk` (S); enable TTL on the `expires_at` attribute.
+
+    Conditional puts take single-digit milliseconds. Items expire through the
+    table's native TTL, and expired items that are not deleted yet are treated
+    as absent.
+    """
+
+    def __init__(self, table: str, ttl_seconds: float) -> None:
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self.name = f"dynamodb:{table}"
+
+    def _item(self, key: str, record: dict[str, Any], version: str) -> dict[str, Any]:
+        return {
+            "pk": {"S": key},
+            "record": {"S": _dump(record)},
+            "version": {"S": version},
+            "expires_at": {"N": str(int(time.time() + self.ttl_seconds))},
+        }
+
+    def _put(self, key: str, record: dict[str, Any], **condition: Any) -> str | None:
+        version = uuid.uuid4().hex
+        try:
+            aws.client(_boto3(), "dynamodb").put_item(
+                TableName=self.table, Item=self._item(key, record, version), **condition
+            )
+        except Exception as e:
+            if _error_code(e) == "ConditionalCheckFailedException":
+                return None
+            raise IdempotencyError(f"idempotency DynamoDB write failed: {e}") from e
+        return version
+
+    def create(self, key: str, record: dict[str, Any]) -> str | None:
+        return self._put(
+            key,
+            record,
+            ConditionExpression="attribute_not_exists(pk) OR expires_at < :now",
+            ExpressionAttributeValues={":now": {"N": str(int(time.time()))}},
+        )
+
+    def read(self, key: str) -> tuple[dict[str, Any], str] | None:
+        try:
+            item = (
+                aws.client(_boto3(), "dynamodb").get_item(
+                    TableName=self.table, Key={"pk": {"S": key}}, ConsistentRead=True
+                )
+            ).get("Item")
+        except Exception as e:
+            raise IdempotencyError(f"idempotency DynamoDB read failed: {e}") from e
+        if not item or float(item["expires_at"]["N"]) < time.time():
+            return None
+        return _parse(item["record"]["S"].encode("utf-8")), item["version"]["S"]
+
+    def replace(self, key: str, record: dict[str, Any], version: str) -> str | None:
+        return self._put(
+            key,
+            record,
+            ConditionExpression="version = :v",
+            ExpressionAttributeValues={":v": {"S": version}},
+        )
+
+
+@contextmanager
+def _sqlite_errors(op: str) -> Iterator[None]:
+    # Locked, corrupt or unwritable databases fail like the other backends do.
     try:
-        s3.head_object(Bucket=bucket, Key=key)
+        yield
+    except sqlite3.Error as e:
+        raise IdempotencyError(f"idempotency SQLite {op} failed: {e}") from e
+
+
+class SQLiteBackend:
+    """Local stand-in for tests and benchmarks (`:memory:` or a file shared by processes)."""
+
+    def __init__(self, path: str = ":memory:", ttl_seconds: float = 7 * 86400) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.name = f"sqlite:{path}"
+        self._lock = threading.Lock()
+        with _sqlite_errors("open"):
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS idempotency ("
+                " key TEXT PRIMARY KEY, record TEXT NOT NULL,"
+                " version TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _row(self, key: str, record: dict[str, Any]) -> tuple[str, str, str, float]:
+        return key, _dump(record), uuid.uuid4().hex, time.time() + self.ttl_seconds
+
+    def create(self, key: str, record: dict[str, Any]) -> str | None:
+        row = self._row(key, record)
+        with self._lock, _sqlite_errors("write"):
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "DELETE FROM idempotency WHERE key = ? AND expires_at < ?", (key, time.time())
+                )
+                cur = self._db.execute("INSERT OR IGNORE INTO idempotency VALUES (?, ?, ?, ?)", row)
+            except sqlite3.Error:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return row[2] if cur.rowcount == 1 else None
+
+    def read(self, key: str) -> tuple[dict[str, Any], str] | None:
+        with self._lock, _sqlite_errors("read"):
+            row = self._db.execute(
+                "SELECT record, version FROM idempotency WHERE key = ? AND expires_at >= ?",
+                (key, time.time()),
+            ).fetchone()
+        return (_parse(row[0].encode("utf-8")), row[1]) if row else None
+
+    def replace(self, key: str, record: dict[str, Any], version: str) -> str | None:
+        _, body, new_version, expires_at = self._row(key, record)
+        with self._lock, _sqlite_errors("write"):
+            cur = self._db.execute(
+                "UPDATE idempotency SET record = ?, version = ?, expires_at = ?"
+                " WHERE key = ? AND version = ?",
+                (body, new_version, expires_at, key, version),
+            )
+        return new_version if cur.rowcount == 1 else None
+
+
+_SQLITE: dict[str, SQLiteBackend] = {}
+_SQLITE_LOCK = threading.Lock()
+
+
+def sqlite_backend(path: str = ":memory:", ttl_seconds: float = 7 * 86400) -> SQLiteBackend:
+    """Process-wide SQLite backend per path (an in-memory one lives as long as the process)."""
+    with _SQLITE_LOCK:
+        backend = _SQLITE.get(path)
+        if backend is None:
+            backend = _SQLITE[path] = SQLiteBackend(path, ttl_seconds)
+        return backend
+
+
+def _settled(record: dict[str, Any], now: float) -> Claim | None:
+    """Claim for an existing record, or None when its lease has expired."""
+    if record.get("state") == COMPLETED:
+        return Claim(COMPLETED, record)
+    if float(record.get("lease_until") or 0) > now:
+        return Claim(IN_PROGRESS, record)
+    return None
+
+
+def claim(
+    backend: Backend,
+    key: str,
+    *,
+    lease_seconds: float = LEASE_SECONDS,
+    memory_ttl_seconds: float = 600,
+    memory_max_entries: int = 10_000,
+) -> Claim:
+    """Claim `key` for this invocation, or report the state that blocks it.
+
+    Raises IdempotencyError when the backend fails.
+    """
+    now = time.time()
+    memory = _memory_on(memory_ttl_seconds, memory_max_entries)
+    known = _RECENT.get((backend.name, key)) if memory else None
+    if known is not None:
+        settled = _settled(known, now)
+        if settled is not None:
+            _count("memory_hits")
+            return settled
+    _count("backend_calls")
+    record = {
+        "state": IN_PROGRESS,
+        "attempt": 1,
+        "claimed_at": now,
+        "lease_until": now + lease_seconds,
+    }
+    created = backend.create(key, record)
+    if created is not None:
+        if memory:
+            _RECENT.put((backend.name, key), record, 1)
+        return Claim(CLAIMED, record, created)
+
+    found = backend.read(key)
+    if found is None:
+        # The competing write is not visible yet (or just expired): someone else has it.
+        return Claim(IN_PROGRESS, {"state": IN_PROGRESS})
+    current, version = found
+    settled = _settled(current, now)
+    if settled is not None:
+        if memory:
+            _RECENT.put((backend.name, key), current, 1)
+        return settled
+
+    # The previous attempt crashed or gave up: take over, unless another retry just did.
+    record = dict(record, attempt=int(current.get("attempt") or 1) + 1)
+    if current.get("progress_comment_id"):
+        # Its streaming placeholder is still on the issue; the new attempt finishes it.
+        record["progress_comment_id"] = current["progress_comment_id"]
+    replaced = backend.replace(key, record, version)
+    if replaced is None:
+        return Claim(IN_PROGRESS, current)
+    if memory:
+        _RECENT.put((backend.name, key), record, 1)
+    return Claim(CLAIMED, record, replaced)
+
+
+def note(backend: Backend, key: str, claimed: Claim, **fields: Any) -> Claim | None:
+    """Add `fields` to the claimed in-progress record, for an attempt that takes it over.
+
+    Returns the updated claim (later writes must use its version), or None,
+    writing nothing, when the lease was taken over in the meantime.
+    """
+    if claimed.version is None:
+        return None
+    record = dict(claimed.record, **fields)
+    version = backend.replace(key, record, claimed.version)
+    if version is None:
+        return None
+    if _RECENT.get((backend.name, key)) is not None:
+        _RECENT.put((backend.name, key), record, 1)
+    return Claim(CLAIMED, record, version)
+
+
+def complete(
+    backend: Backend,
+    key: str,
+    claimed: Claim,
+    *,
+    reply_comment_id: Any = None,
+    elapsed_ms: int | None = None,
+    error: str | None = None,
+) -> bool:
+    """Mark the claimed work done, storing the posted reply's id and timing.
+
+    With `error`, the attempt failed but answered (e.g. with an error comment)
+    and must not be retried. Returns False, writing nothing, when the lease was
+    taken over by another attempt in the meantime.
+    """
+    record = {
+        "state": COMPLETED,
+        "attempt": claimed.record.get("attempt", 1),
+        "claimed_at": claimed.record.get("claimed_at"),
+        "completed_at": time.time(),
+        "reply_comment_id": reply_comment_id,
+        "elapsed_ms": elapsed_ms,
+    }
+    if error is not None:
+        record["error"] = error
+    if claimed.version is None or backend.replace(key, record, claimed.version) is None:
         return False
-    except Exception:
-        pass
-    s3.put_object(Bucket=bucket, Key=key, Body=b"1")
+    if _RECENT.get((backend.name, key)) is not None:
+        _RECENT.put((backend.name, key), record, 1)
     return True
+
+
+def release(backend: Backend, key: str, claimed: Claim, *, error: str | None = None) -> bool:
+    """Give up the lease after a failed attempt so that the next delivery can retry at once.
+
+    Returns False, writing nothing, when the lease was taken over in the meantime.
+    """
+    _RECENT.pop((backend.name, key))
+    if claimed.version is None:
+        return False
+    record = dict(claimed.record, lease_until=0, error=error)
+    return backend.replace(key, record, claimed.version) is not None
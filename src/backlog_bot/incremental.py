@@ -0,0 +1,78 @@
+"""
+Incremental `/summary`: locate the bot's previous summary on the issue.
+
+A reply is recognized as a summary by the command comment it answers: walking
+the history from newest to oldest, the nearest older comment that invokes the
+bot must be a `/summary`. Placeholders of a streamed reply (still in flight, or
+left half-written by an attempt that died) and error replies are not summaries.
+The handler then prompts with that summary plus the comments and field changes
+posted after it, instead of the whole issue.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from typing import Any
+
+from .commands import is_command_comment, parse_command
+
+# Heading of the list of context URLs appended to summaries (not part of the summary).
+CONTEXT_HEADING = "**参照コンテキスト**"
+# Marker of a streamed reply that is not finished yet (`handler._ProgressComment`):
+# the whole placeholder at first, then appended to the partial text.
+PROGRESS_PLACEHOLDER = "⏳ 生成中です…"
+# Error notice replies.
+_ERROR_PREFIX = "⚠️"
+
+
+def _is_bot(comment: dict[str, Any], bot_user_id: int) -> bool:
+    return str((comment.get("createdUser") or {}).get("id")) == str(bot_user_id)
+
+
+def _content(comment: dict[str, Any]) -> str:
+    return (comment.get("content") or "").strip()
+
+
+def _unfinished(text: str) -> bool:
+    return PROGRESS_PLACEHOLDER in text
+
+
+def find_previous_summary(comments: Sequence[dict[str, Any]], bot_user_id: int) -> int | None:
+    """Index (in the newest-first `comments`) of the bot's latest summary reply, if any."""
+    for i, c in enumerate(comments):
+        text = _content(c)
+        if not _is_bot(c, bot_user_id) or not text:
+            continue
+        if _unfinished(text) or text.startswith(_ERROR_PREFIX):
+            continue
+        for older in comments[i + 1 :]:
+            if _is_bot(older, bot_user_id) and _unfinished(_content(older)):
+                # A dead placeholder answers nothing; look past it.
+                continue
+            if _is_bot(older, bot_user_id):
+                # Another reply in between: cannot tell which command this one answers.
+                break
+            older_text = _content(older)
+            if is_command_comment(older_text):
+                if (parse_command(older_text) or {}).get("cmd") == "summary":
+                    return i
+                break
+    return None
+
+
+def summary_text(comment: dict[str, Any]) -> str:
+    """The summary body of a bot reply, without the appended context URL list."""
+    return _content(comment).split(CONTEXT_HEADING)[0].strip()
+
+
+def change_lines(comment: dict[str, Any]) -> list[str]:
+    """Field changes recorded on a comment (`changeLog`), as "field: before → after"."""
+    lines: list[str] = []
+    for change in comment.get("changeLog") or []:
+        field = (change or {}).get("field")
+        if not field:
+            continue
+        before = change.get("originalValue") or "(なし)"
+        after = change.get("newValue") or "(なし)"
+        lines.append(f"{field}: {before} → {after}")
+    return lines
@@ -0,0 +1,132 @@
+"""
+Fast-ack mode: the webhook enqueues a job, a worker invocation processes it.
+
+Inline processing keeps Backlog's webhook request open for the whole pipeline
+(fetch, LLM, post), 10-20 s, and Backlog redelivers when it times out. With a
+queue the Function URL path only authenticates, filters and enqueues a compact
+job, then answers in milliseconds. A worker entry point runs the rest, so its
+latency and concurrency are decoupled from the webhook's.
+
+Queues:
+
+- `SQSQueue`: `SendMessage` to a queue whose event source mapping invokes the
+  worker (at-least-once; failed jobs are reported as batch item failures).
+- `LambdaQueue`: asynchronous `Invoke` (`InvocationType=Event`), normally of
+  this same function; Lambda retries failed invocations twice.
+- `LocalQueue`: in-process thread pool, for local runs, tests and benchmarks.
+
+Deduplication happens in the worker (idempotency claim), which also covers
+SQS's own redeliveries.
+"""
+
+from __future__ import annotations
+
+import importlib
+import json
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, NamedTuple, Protocol
+
+from . import aws
+
+# Key of the job in an asynchronous self-invoke payload.
+JOB_KEY = "backlogBotJob"
+
+
+class Message(NamedTuple):
+    # SQS message id (None for a direct invocation)
+    id: str | None
+    job: dict[str, Any]
+
+
+class Queue(Protocol):
+    name: str
+
+    def send(self, job: dict[str, Any]) -> None:
+        """Enqueue `job` (JSON-serializable); raises on failure."""
+        ...
+
+
+def _boto3() -> Any:
+    # Allow tests to monkeypatch module-level `boto3` symbol.
+    return globals().get("boto3") or importlib.import_module("boto3")
+
+
+def _dump(job: dict[str, Any]) -> str:
+    return json.dumps(job, ensure_ascii=False, separators=(",", ":"))
+
+
+class SQSQueue:
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.name = "sqs"
+
+    def send(self, job: dict[str, Any]) -> None:
+        aws.client(_boto3(), "sqs").send_message(QueueUrl=self.url, MessageBody=_dump(job))
+
+
+class LambdaQueue:
+    def __init__(self, function_name: str) -> None:
+        self.function_name = function_name
+        self.name = "lambda"
+
+    def send(self, job: dict[str, Any]) -> None:
+        aws.client(_boto3(), "lambda").invoke(
+            FunctionName=self.function_name,
+            InvocationType="Event",
+            Payload=_dump({JOB_KEY: job}).encode("utf-8"),
+        )
+
+
+class LocalQueue:
+    """Runs `process(job)` on a thread pool; `drain` waits for the queued jobs."""
+
+    def __init__(self, process: Callable[[dict[str, Any]], Any], workers: int = 4) -> None:
+        self.name = "local"
+        self._process = process
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._pending: set[Future[Any]] = set()
+
+    def send(self, job: dict[str, Any]) -> None:
+        # Round-trip through JSON like the real queues, so nothing unserializable slips in.
+        future = self._pool.submit(self._process, json.loads(_dump(job)))
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future[Any]) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+    def drain(self, timeout: float | None = None) -> None:
+        """Wait until the jobs queued so far have run."""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+
+_LOCAL: dict[str, LocalQueue] = {}
+_LOCAL_LOCK = threading.Lock()
+
+
+def local_queue(process: Callable[[dict[str, Any]], Any], workers: int = 4) -> LocalQueue:
+    """Process-wide local queue (created on first use)."""
+    with _LOCAL_LOCK:
+        queue = _LOCAL.get("default")
+        if queue is None:
+            queue = _LOCAL["default"] = LocalQueue(process, workers)
+        return queue
+
+
+def messages(event: dict[str, Any]) -> list[Message] | None:
+    """Jobs carried by a worker invocation (SQS batch or async invoke); None for webhooks."""
+    if isinstance(event.get(JOB_KEY), dict):
+        return [Message(None, event[JOB_KEY])]
+    records = event.get("Records")
+    if not isinstance(records, list) or not records:
+        return None
+    if any((r or {}).get("eventSource") != "aws:sqs" for r in records):
+        return None
+    return [Message(r.get("messageId"), json.loads(r.get("body") or "{}")) for r in records]
@@ -1,14 +1,79 @@
 """
 Bedrock Claude minimal wrapper.
 
-Uses Anthropic Messages API on Bedrock (anthropic_version=bedrock-2023-05-31).
+Requests go through the configured `Provider` (see `configure`): Bedrock by
+default, or the simulated local provider in `llm_local` for offline load tests.
+The Bedrock provider uses the Anthropic Messages API
+(anthropic_version=bedrock-2023-05-31). With `on_text`, the response is
+streamed (invoke_model_with_response_stream) and the callback receives the
+accumulated text after every delta.
+
+A call's `timeout` is enforced by the client itself (the botocore read timeout,
+see `aws.client`), so a timed-out request is actually torn down rather than
+left running in the background, and no thread pool sits in front of Bedrock.
+For a stream the read timeout bounds the first token and each gap between
+events, not the whole reply; `total_timeout` caps the stream as a whole.
+
+Prompts may be given as a sequence of parts, most stable first (e.g. issue
+context, then the question). With `cache_prompt`, the system prompt and every
+part but the last get a `cache_control` breakpoint so Bedrock prompt caching can
+reuse the shared prefix across commands on the same issue.
 """
 
 from __future__ import annotations
 
 import importlib
 import json
-from typing import Any
+import time
+from collections.abc import Callable, Sequence
+from typing import Any, NamedTuple, Protocol
+
+from . import aws
+
+# Anthropic allows at most 4 cache breakpoints per request (one goes to system).
+_MAX_CACHE_BREAKPOINTS = 4
+_EPHEMERAL = {"type": "ephemeral"}
+_USAGE_KEYS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens",
+)
+
+
+class Completion(NamedTuple):
+    text: str
+    # input/output and cache read/creation token counts as reported by the model
+    usage: dict[str, int]
+
+
+class Request(NamedTuple):
+    model_id: str
+    system: str | None
+    # Prompt parts, most stable first; empty parts are dropped.
+    parts: list[str]
+    max_tokens: int
+    cache_prompt: bool = False
+    # None = the function's own region
+    region: str | None = None
+    # Seconds to wait for the response (with streaming: for the first token and
+    # between events); None = the client's configured timeout.
+    timeout: float | None = None
+    # With streaming, seconds the whole stream may take; None = unbounded.
+    total_timeout: float | None = None
+
+
+class Provider(Protocol):
+    """LLM backend.
+
+    `complete` blocks until the reply is done. With `on_text` it streams and
+    calls it with the accumulated text as it grows. Token usage is reported in
+    `Completion.usage` with the keys in `_USAGE_KEYS` that the backend knows.
+    It raises TimeoutError when `request.timeout` or, for a stream,
+    `request.total_timeout` expires.
+    """
+
+    def complete(self, request: Request, on_text: Callable[[str], None] | None) -> Completion: ...
 
 
 def _boto3() -> Any:
@@ -16,57 +81,229 @@ def _boto3() -> Any:
     return globals().get("boto3") or importlib.import_module("boto3")
 
 
-def _bedrock_client() -> Any:
-    return _boto3().client("bedrock-runtime")
+def _bedrock_client(region: str | None = None, timeout: float | None = None) -> Any:
+    return aws.client(_boto3(), "bedrock-runtime", region, read_timeout=timeout)
+
+
+def _is_read_timeout(err: BaseException) -> bool:
+    # botocore.exceptions.ReadTimeoutError / ConnectTimeoutError (botocore is optional here).
+    return type(err).__name__ in ("ReadTimeoutError", "ConnectTimeoutError")
+
+
+def _add_usage(usage: dict[str, int], reported: Any) -> None:
+    if not isinstance(reported, dict):
+        return
+    for k in _USAGE_KEYS:
+        v = reported.get(k)
+        if isinstance(v, int):
+            usage[k] = v
+
+
+def _stream_text(
+    resp: Any, on_text: Callable[[str], None], total_timeout: float | None = None
+) -> Completion:
+    """Collect text deltas from a Bedrock response stream, reporting progress."""
+    parts: list[str] = []
+    usage: dict[str, int] = {}
+    until = None if total_timeout is None else time.monotonic() + total_timeout
+    for event in resp["body"]:
+        if until is not None and time.monotonic() > until:
+            close = getattr(resp["body"], "close", None)
+            if callable(close):
+                close()
+            raise TimeoutError(f"LLM stream exceeded {total_timeout:.1f}s")
+        chunk = event.get("chunk")
+        if chunk is None:
+            # Mid-stream errors arrive as e.g. {"throttlingException": {...}}
+            errors = [k for k in event if k.endswith("Exception")]
+            if errors:
+                raise RuntimeError(f"Bedrock stream error: {errors[0]}: {event[errors[0]]}")
+            continue
+        data = json.loads(chunk["bytes"])
+        if data.get("type") == "message_start":
+            _add_usage(usage, (data.get("message") or {}).get("usage"))
+        elif data.get("type") == "message_delta":
+            _add_usage(usage, data.get("usage"))
+        elif data.get("type") == "content_block_delta":
+            text = (data.get("delta") or {}).get("text")
+            if text:
+                parts.append(text)
+                on_text("".join(parts))
+    return Completion("".join(parts), usage)
+
+
+def _user_content(parts: Sequence[str], cache_prompt: bool) -> list[dict[str, Any]]:
+    blocks: list[dict[str, Any]] = [{"type": "text", "text": p} for p in parts if p]
+    if cache_prompt:
+        # Breakpoints on the stable prefix only; the last part (the question) varies.
+        for block in blocks[:-1][-(_MAX_CACHE_BREAKPOINTS - 1) :]:
+            block["cache_control"] = _EPHEMERAL
+    return blocks
+
+
+class BedrockProvider:
+    """Anthropic Messages API on Bedrock."""
+
+    def complete(self, request: Request, on_text: Callable[[str], None] | None) -> Completion:
+        body: dict[str, Any] = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": request.max_tokens,
+            "messages": [
+                {"role": "user", "content": _user_content(request.parts, request.cache_prompt)}
+            ],
+        }
+        if request.system and request.cache_prompt:
+            body["system"] = [{"type": "text", "text": request.system, "cache_control": _EPHEMERAL}]
+        elif request.system:
+            body["system"] = request.system
+        client = _bedrock_client(request.region, request.timeout)
+        kwargs = {
+            "modelId": request.model_id,
+            "body": json.dumps(body),
+            "accept": "application/json",
+            "contentType": "application/json",
+        }
+        try:
+            if on_text is not None:
+                resp = client.invoke_model_with_response_stream(**kwargs)
+                return _stream_text(resp, on_text, request.total_timeout)
+            resp = client.invoke_model(**kwargs)
+            data = json.loads(resp["body"].read())
+        except Exception as e:
+            if _is_read_timeout(e):
+                raise TimeoutError(f"LLM call timed out: {e}") from e
+            raise
+        # Anthropic messages returns { content: [{text: "..."}]} on Bedrock
+        usage: dict[str, int] = {}
+        _add_usage(usage, data.get("usage"))
+        return Completion(str(data.get("content", [{}])[0].get("text", "")), usage)
+
+
+_PROVIDER: Provider = BedrockProvider()
+
+
+def configure(provider: Provider) -> None:
+    """Select the backend used by every call from now on (see `Settings.llm_provider`)."""
+    global _PROVIDER
+    _PROVIDER = provider
 
 
 def _invoke_messages(
-    model_id: str, system: str | None, user_text: str, max_tokens: int = 512
-) -> str:
-    body = {
-        "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": max_tokens,
-        "messages": [{"role": "user", "content": [{"type": "text", "text": user_text}]}],
-    }
-    if system:
-        body["system"] = system
-    client = _bedrock_client()
-    resp = client.invoke_model(
-        modelId=model_id,
-        body=json.dumps(body),
-        accept="application/json",
-        contentType="application/json",
+    model_id: str,
+    system: str | None,
+    user_text: str | Sequence[str],
+    max_tokens: int = 512,
+    timeout: float | None = None,
+    on_text: Callable[[str], None] | None = None,
+    cache_prompt: bool = False,
+    region: str | None = None,
+    total_timeout: float | None = None,
+) -> Completion:
+    parts = [user_text] if isinstance(user_text, str) else list(user_text)
+    request = Request(
+        model_id, system, parts, max_tokens, cache_prompt, region, timeout, total_timeout
     )
-    data = json.loads(resp["body"].read())
-    # Anthropic messages returns { content: [{text: "..."}]} on Bedrock
-    return data.get("content", [{}])[0].get("text", "")
+    return _PROVIDER.complete(request, on_text)
+
 
+SUMMARY_SYSTEM = (
+    "あなたはプロジェクトマネジメント観点の要約を作るアシスタントです。"
+    "出力は日本語、Markdown。次を短く整理: 1) 背景/目的 2) 現状と進捗"
+    " 3) 期限と担当 4) リスク/ブロッカー 5) 次の具体アクション(1-3)。"
+    " 最後に『不足情報/確認事項』を箇条書きで質問として提示してください。"
+)
+ANSWER_SYSTEM = (
+    "あなたはBacklogチケットのコンテキストに基づいて正確に回答するAIです。"
+    "不確実な点はその旨を明記し、根拠を短く示してください。"
+    "もし提供情報から結論できない場合は、回答不能と明記し、誰に何を確認すべきか(担当者/起票者/最近の発言者など)を役割ベースで助言してください。"
+)
+REVIEW_UPDATE_SYSTEM = (
+    "あなたはBacklogチケットのフィールド整合性レビューを行います。"
+    "出力は日本語、Markdownの箇条書き。フォーマットは厳守:"
+    "『項目名: before → after （理由）』を各行で出力。"
+    " 項目名の例: 期限, 優先度, 状態, 担当者, カスタム(… )。"
+    " 変更不要なら提案しないか、'変更なし'と明記。"
+)
+CHUNK_SYSTEM = (
+    "あなたはBacklogチケットの長い履歴の一部を要約するアシスタントです。"
+    "出力は日本語の箇条書き。時系列を保ち、決定事項・仕様や方針の変更・課題/ブロッカー・"
+    "担当や期限の変化・未解決の質問を、日付と発言者が分かる形で簡潔に残してください。"
+    " 挨拶や重複は省略してください。"
+)
+# System prompt per command kind (used e.g. to key the reply cache).
+SYSTEM_PROMPTS = {
+    "summary": SUMMARY_SYSTEM,
+    "ask": ANSWER_SYSTEM,
+    "update": REVIEW_UPDATE_SYSTEM,
+}
 
-def summarize(model_id: str, prompt: str) -> str:
-    system = (
-        "あなたはプロジェクトマネジメント観点の要約を作るアシスタントです。"
-        "出力は日本語、Markdown。次を短く整理: 1) 背景/目的 2) 現状と進捗"
-        " 3) 期限と担当 4) リスク/ブロッカー 5) 次の具体アクション(1-3)。"
-        " 最後に『不足情報/確認事項』を箇条書きで質問として提示してください。"
+
+def summarize(
+    model_id: str,
+    prompt: str | Sequence[str],
+    timeout: float | None = None,
+    on_text: Callable[[str], None] | None = None,
+    cache_prompt: bool = False,
+    region: str | None = None,
+    total_timeout: float | None = None,
+) -> Completion:
+    return _invoke_messages(
+        model_id,
+        SUMMARY_SYSTEM,
+        prompt,
+        max_tokens=700,
+        timeout=timeout,
+        on_text=on_text,
+        cache_prompt=cache_prompt,
+        region=region,
+        total_timeout=total_timeout,
     )
-    return _invoke_messages(model_id, system, prompt, max_tokens=700)
 
 
-def answer(model_id: str, prompt: str) -> str:
-    system = (
-        "あなたはBacklogチケットのコンテキストに基づいて正確に回答するAIです。"
-        "不確実な点はその旨を明記し、根拠を短く示してください。"
-        "もし提供情報から結論できない場合は、回答不能と明記し、誰に何を確認すべきか(担当者/起票者/最近の発言者など)を役割ベースで助言してください。"
+def answer(
+    model_id: str,
+    prompt: str | Sequence[str],
+    timeout: float | None = None,
+    on_text: Callable[[str], None] | None = None,
+    cache_prompt: bool = False,
+    region: str | None = None,
+    total_timeout: float | None = None,
+) -> Completion:
+    return _invoke_messages(
+        model_id,
+        ANSWER_SYSTEM,
+        prompt,
+        max_tokens=700,
+        timeout=timeout,
+        on_text=on_text,
+        cache_prompt=cache_prompt,
+        region=region,
+        total_timeout=total_timeout,
     )
-    return _invoke_messages(model_id, system, prompt, max_tokens=700)
 
 
-def review_update(model_id: str, prompt: str) -> str:
-    system = (
-        "あなたはBacklogチケットのフィールド整合性レビューを行います。"
-        "出力は日本語、Markdownの箇条書き。フォーマットは厳守:"
-        "『項目名: before → after （理由）』を各行で出力。"
-        " 項目名の例: 期限, 優先度, 状態, 担当者, カスタム(… )。"
-        " 変更不要なら提案しないか、'変更なし'と明記。"
+def review_update(
+    model_id: str,
+    prompt: str | Sequence[str],
+    timeout: float | None = None,
+    on_text: Callable[[str], None] | None = None,
+    cache_prompt: bool = False,
+    region: str | None = None,
+    total_timeout: float | None = None,
+) -> Completion:
+    return _invoke_messages(
+        model_id,
+        REVIEW_UPDATE_SYSTEM,
+        prompt,
+        max_tokens=700,
+        timeout=timeout,
+        on_text=on_text,
+        cache_prompt=cache_prompt,
+        region=region,
+        total_timeout=total_timeout,
     )
-    return _invoke_messages(model_id, system, prompt, max_tokens=700)
+
+
+def summarize_chunk(model_id: str, text: str, timeout: float | None = None) -> Completion:
+    """Map step of long-issue summarization: condense one window of history."""
+    return _invoke_messages(model_id, CHUNK_SYSTEM, text, max_tokens=500, timeout=timeout)
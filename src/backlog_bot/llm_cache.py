@@ -0,0 +1,85 @@
+"""
+Content-addressed cache of LLM replies.
+
+The key is a hash of everything that determines the reply (model id, command
+kind, system prompt and the built prompt), so an unchanged issue asked the same
+thing twice is answered without a second Bedrock call. Warm containers keep
+replies in memory; an optional S3 tier shares them across containers. Entries
+expire after the configured TTL in both tiers.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import logging
+import time
+from collections.abc import Sequence
+from typing import Any
+
+from . import aws
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+S3_PREFIX = "llm-cache/"
+
+_MEMORY: LRUCache[str, dict[str, Any]] = LRUCache(4 * 1024 * 1024)
+
+
+def _boto3() -> Any:
+    # Allow tests to monkeypatch module-level `boto3` symbol.
+    return globals().get("boto3") or importlib.import_module("boto3")
+
+
+def cache_key(model_id: str, kind: str, system: str, prompt: Sequence[str]) -> str:
+    raw = json.dumps([model_id, kind, system, list(prompt)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _s3_key(key: str) -> str:
+    return f"{S3_PREFIX}{key}.json"
+
+
+def _fresh(entry: dict[str, Any] | None, ttl_seconds: int) -> bool:
+    return entry is not None and time.time() - float(entry.get("created") or 0) <= ttl_seconds
+
+
+def get(key: str, *, ttl_seconds: int, bucket: str | None = None) -> tuple[str, str] | None:
+    """Return (text, tier) for a fresh entry, where tier is "memory" or "s3"; else None."""
+    if ttl_seconds <= 0:
+        return None
+    entry = _MEMORY.get(key)
+    if _fresh(entry, ttl_seconds):
+        assert entry is not None
+        return str(entry["text"]), "memory"
+    if not bucket:
+        return None
+    try:
+        obj = aws.client(_boto3(), "s3").get_object(Bucket=bucket, Key=_s3_key(key))
+        body = obj["Body"].read()
+        entry = json.loads(body)
+    except Exception as e:
+        logger.debug("LLM cache S3 miss for %s: %s", key, e)
+        return None
+    if not isinstance(entry, dict) or not _fresh(entry, ttl_seconds):
+        return None
+    _MEMORY.put(key, entry, len(body))
+    return str(entry["text"]), "s3"
+
+
+def put(key: str, text: str, *, ttl_seconds: int, bucket: str | None = None) -> None:
+    if ttl_seconds <= 0 or not text:
+        return
+    entry = {"created": time.time(), "text": text}
+    body = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+    _MEMORY.put(key, entry, len(body))
+    if not bucket:
+        return
+    try:
+        aws.client(_boto3(), "s3").put_object(
+            Bucket=bucket, Key=_s3_key(key), Body=body, ContentType="application/json"
+        )
+    except Exception as e:
+        logger.warning("LLM cache S3 store failed for %s: %s", key, e)
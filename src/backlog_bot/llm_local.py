@@ -0,0 +1,130 @@
+"""
+Simulated LLM provider for offline load tests and benchmarks (LLM_PROVIDER=local).
+
+Nothing leaves the process. Time to first token follows a log-normal
+distribution given by its p50/p95, after which output "tokens" arrive at a
+fixed throughput, so streaming, timeouts, hedging and handler concurrency
+behave as they would against Bedrock. Each request seeds its own RNG from the
+request content, so the same prompt always gets the same latency and reply.
+An optional error rate raises throttling errors to exercise retries and
+failover. `Request.timeout` behaves like the botocore read timeout: it bounds
+the whole reply, or with streaming the first token and each gap between deltas,
+and `Request.total_timeout` bounds a stream as a whole.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import random
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from .llm import Completion, Request
+from .prompt_pack import estimate_tokens
+
+# z-score of the 95th percentile of a normal distribution.
+_Z95 = 1.6449
+# Tokens emitted per streaming callback.
+_TOKENS_PER_DELTA = 8
+_WORDS = (
+    "背景",
+    "目的",
+    "進捗",
+    "期限",
+    "担当",
+    "リスク",
+    "対応",
+    "確認",
+    "仕様",
+    "次のアクション",
+)
+
+
+@dataclass(frozen=True)
+class LocalOptions:
+    """Simulated latency and throughput (see `Settings.llm_local_*`)."""
+
+    latency_p50_seconds: float = 0.8
+    latency_p95_seconds: float = 2.0
+    tokens_per_second: float = 80.0
+    output_tokens: int = 300
+    error_rate: float = 0.0
+    seed: int = 0
+
+
+class LocalProvider:
+    """Deterministic stand-in for Bedrock with configurable latency."""
+
+    def __init__(
+        self,
+        options: LocalOptions | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.options = options or LocalOptions()
+        self._sleep = sleep
+
+    def _rng(self, request: Request) -> random.Random:
+        raw = "\x00".join(
+            [
+                str(self.options.seed),
+                request.model_id,
+                request.region or "",
+                request.system or "",
+                *request.parts,
+            ]
+        )
+        return random.Random(hashlib.sha256(raw.encode("utf-8")).digest())
+
+    def first_token_seconds(self, rng: random.Random) -> float:
+        p50, p95 = self.options.latency_p50_seconds, self.options.latency_p95_seconds
+        if p50 <= 0:
+            return 0.0
+        sigma = math.log(p95 / p50) / _Z95 if p95 > p50 else 0.0
+        return math.exp(rng.gauss(math.log(p50), sigma))
+
+    def _wait(self, seconds: float, timeout: float | None) -> None:
+        if timeout is not None and seconds > timeout:
+            self._sleep(timeout)
+            raise TimeoutError(f"LLM call timed out after {timeout:.1f}s (simulated)")
+        self._sleep(seconds)
+
+    def complete(self, request: Request, on_text: Callable[[str], None] | None) -> Completion:
+        rng = self._rng(request)
+        first = self.first_token_seconds(rng)
+        n_out = max(1, min(self.options.output_tokens, request.max_tokens))
+        tps = self.options.tokens_per_second
+        if on_text is None:
+            # The whole reply arrives at once, so the timeout covers generation too.
+            self._wait(first + (n_out / tps if tps > 0 else 0.0), request.timeout)
+        else:
+            self._wait(first, request.timeout)
+        # Stream time left (first token included), like the Bedrock provider's check.
+        budget = None if request.total_timeout is None else request.total_timeout - first
+        if rng.random() < self.options.error_rate:
+            raise RuntimeError("ThrottlingException: simulated by the local LLM provider")
+        words = [f"（ローカル応答: {request.model_id}）"]
+        words += [rng.choice(_WORDS) for _ in range(n_out - 1)]
+        parts: list[str] = []
+        for i in range(0, n_out, _TOKENS_PER_DELTA):
+            delta = words[i : i + _TOKENS_PER_DELTA]
+            if tps > 0 and on_text is not None:
+                gap = len(delta) / tps
+                if budget is not None and gap > budget:
+                    self._sleep(max(0.0, budget))
+                    raise TimeoutError(
+                        f"LLM stream exceeded {request.total_timeout:.1f}s (simulated)"
+                    )
+                self._wait(gap, request.timeout)
+                if budget is not None:
+                    budget -= gap
+            parts.extend(delta)
+            if on_text is not None:
+                on_text(" ".join(parts))
+        usage = {
+            "input_tokens": estimate_tokens(request.system or "")
+            + sum(estimate_tokens(p) for p in request.parts),
+            "output_tokens": n_out,
+        }
+        return Completion(" ".join(parts), usage)
@@ -0,0 +1,131 @@
+"""
+Map step of hierarchical summarization for issues whose history does not fit
+in one prompt.
+
+History that the prompt packer could not keep is cut into token-bounded
+windows, oldest first, so that earlier windows stay byte-identical as new
+comments arrive. Each window is condensed by `llm.summarize_chunk` on a bounded
+thread pool. Chunk summaries are cached by content hash (through `llm_cache`),
+so later runs only summarize the windows that changed. The handler then
+reduces the chunk summaries into the usual `/summary` reply.
+"""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from . import llm, llm_cache
+from .prompt_pack import estimate_tokens, truncate_to_tokens
+
+# Levels of re-summarizing summaries before giving up on fitting the budget.
+_MAX_LEVELS = 3
+
+
+class MapResult(NamedTuple):
+    summaries: list[str]
+    chunks: int
+    cached: int
+    ms: int
+
+
+def chunk_texts(items: Sequence[str], max_tokens: int) -> list[str]:
+    """Group items, in order, into windows of at most `max_tokens` (estimated).
+
+    An item larger than a window is split across consecutive windows.
+    """
+    chunks: list[str] = []
+    current: list[str] = []
+    used = 0
+    for item in items:
+        while estimate_tokens(item) > max_tokens:
+            head = truncate_to_tokens(item, max_tokens).removesuffix("…")
+            if not head:
+                break
+            if current:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            chunks.append(head)
+            item = item[len(head) :]
+        cost = estimate_tokens(item) + 1
+        if current and used + cost > max_tokens:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        if item:
+            current.append(item)
+            used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def summarize_chunks(
+    model_id: str,
+    chunks: Sequence[str],
+    *,
+    concurrency: int,
+    timeout: float | None = None,
+    cache_ttl_seconds: int = 0,
+    cache_bucket: str | None = None,
+) -> MapResult:
+    """Summarize each chunk (cache first); results are in chunk order."""
+    t0 = time.time()
+    keys = [llm_cache.cache_key(model_id, "chunk", llm.CHUNK_SYSTEM, [c]) for c in chunks]
+    summaries: list[str | None] = []
+    for key in keys:
+        hit = llm_cache.get(key, ttl_seconds=cache_ttl_seconds, bucket=cache_bucket)
+        summaries.append(hit[0] if hit else None)
+    todo = [i for i, s in enumerate(summaries) if s is None]
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(todo)))) as executor:
+            futures = {
+                i: executor.submit(llm.summarize_chunk, model_id, chunks[i], timeout) for i in todo
+            }
+            for i, future in futures.items():
+                text = future.result().text
+                summaries[i] = text
+                llm_cache.put(keys[i], text, ttl_seconds=cache_ttl_seconds, bucket=cache_bucket)
+    return MapResult(
+        [s or "" for s in summaries],
+        len(chunks),
+        len(chunks) - len(todo),
+        int((time.time() - t0) * 1000),
+    )
+
+
+def summarize_history(
+    model_id: str,
+    items: Sequence[str],
+    *,
+    chunk_tokens: int,
+    max_tokens: int,
+    concurrency: int,
+    timeout: float | None = None,
+    cache_ttl_seconds: int = 0,
+    cache_bucket: str | None = None,
+) -> MapResult:
+    """Condense `items` (oldest first) into chunk summaries totalling ~`max_tokens`.
+
+    When the summaries themselves are too long they are chunked and summarized
+    again, up to a few levels.
+    """
+    t0 = time.time()
+    summaries = list(items)
+    chunks = cached = 0
+    for _level in range(_MAX_LEVELS):
+        result = summarize_chunks(
+            model_id,
+            chunk_texts(summaries, chunk_tokens),
+            concurrency=concurrency,
+            timeout=timeout,
+            cache_ttl_seconds=cache_ttl_seconds,
+            cache_bucket=cache_bucket,
+        )
+        summaries = result.summaries
+        chunks += result.chunks
+        cached += result.cached
+        if len(summaries) <= 1 or sum(estimate_tokens(x) for x in summaries) <= max_tokens:
+            break
+    return MapResult(summaries, chunks, cached, int((time.time() - t0) * 1000))
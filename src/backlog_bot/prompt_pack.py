@@ -0,0 +1,98 @@
+"""
+Token-budgeted prompt packing.
+
+Token counts are estimated locally (no tokenizer download): Claude's tokenizer
+spends roughly one token per kana/kanji and about four characters per token on
+ASCII text, so each class of character is weighted separately. The estimate is
+deliberately a little pessimistic so packed prompts stay within the window.
+
+Each section gets a guaranteed share of the budget; whatever a section does not
+need is handed to the others in priority order. Within a section items are
+taken in the given order (e.g. newest comment first) until the allocation is
+used up, truncating the last one when enough room is left for it to be useful.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+# Hiragana/Katakana, CJK ideographs (+ext. A), Hangul, and full-width forms.
+_CJK_RE = re.compile(r"[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_SPACE_RE = re.compile(r"\s")
+
+_CJK_TOKENS = 1.1
+_OTHER_CHARS_PER_TOKEN = 3.5
+# Separator/bullet added around each item when sections are joined.
+_ITEM_OVERHEAD = 2
+# A truncated item shorter than this is dropped instead.
+_MIN_PARTIAL_TOKENS = 32
+_ELLIPSIS = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate Claude token count for mixed Japanese/ASCII text."""
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    spaces = len(_SPACE_RE.findall(text))
+    other = len(text) - cjk - spaces
+    return math.ceil(cjk * _CJK_TOKENS + (other + spaces / 2) / _OTHER_CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` (plus an ellipsis) estimated within `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text
+    lo, hi = 0, min(len(text), int(len(text) * max_tokens / total) + 1)
+    # Binary search on the prefix length; the estimate is monotonic in it.
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) + 1 <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + _ELLIPSIS if lo else ""
+
+
+@dataclass(frozen=True)
+class Section:
+    """One prompt section; `items` are in fill order (most important first)."""
+
+    name: str
+    items: Sequence[str]
+    # Fraction of the budget reserved for this section.
+    share: float
+    # Sections with a lower value receive unused budget first.
+    priority: int = 0
+
+
+def _fill(items: Sequence[str], budget: int) -> list[str]:
+    out: list[str] = []
+    for item in items:
+        cost = estimate_tokens(item) + _ITEM_OVERHEAD
+        if cost <= budget:
+            out.append(item)
+            budget -= cost
+            continue
+        if budget >= _MIN_PARTIAL_TOKENS:
+            out.append(truncate_to_tokens(item, budget - _ITEM_OVERHEAD))
+        break
+    return out
+
+
+def pack(sections: Sequence[Section], budget: int) -> dict[str, list[str]]:
+    """Fit the sections into `budget` tokens; returns the kept items per section."""
+    need = {s.name: sum(estimate_tokens(i) + _ITEM_OVERHEAD for i in s.items) for s in sections}
+    alloc = {s.name: min(need[s.name], int(budget * s.share)) for s in sections}
+    leftover = max(0, budget - sum(alloc.values()))
+    for s in sorted(sections, key=lambda s: s.priority):
+        extra = min(leftover, need[s.name] - alloc[s.name])
+        alloc[s.name] += extra
+        leftover -= extra
+    return {s.name: _fill(s.items, alloc[s.name]) for s in sections}
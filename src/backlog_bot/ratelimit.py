@@ -0,0 +1,130 @@
+"""
+Adaptive client-side throttling driven by Backlog's X-RateLimit-* headers.
+
+One limiter per API key is kept at module scope, so every thread in a warm
+container shares the same view of the quota. A fresh container starts without
+throttling and re-seeds from the first response: Backlog reports the key's
+remaining quota authoritatively on every call, so no cross-container store is
+needed.
+
+The limiter only computes delays; callers decide how to sleep (blocking or
+asyncio).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Protocol
+
+# Max tokens that may be spent in a burst when the quota is known.
+_BURST = 10.0
+
+
+class Headers(Protocol):
+    """Case-insensitive header lookup (http.client.HTTPMessage or a plain dict)."""
+
+    def get(self, name: str, /) -> Any: ...
+
+
+def _jitter(delay: float) -> float:
+    return delay + random.uniform(0, min(1.0, 0.25 * delay + 0.05))
+
+
+class RateLimiter:
+    """Token bucket whose refill rate spreads the remaining quota until reset."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.limit: int | None = None
+        self.remaining: int | None = None
+        self.reset_at: float | None = None  # epoch seconds
+        self._tokens = _BURST
+        self._rate: float | None = None  # tokens/sec; None = unthrottled
+        self._updated = time.time()
+
+    def _refill(self, now: float) -> None:
+        if self.reset_at is not None and now >= self.reset_at:
+            # Window rolled over: back to unthrottled until headers say otherwise.
+            self._rate = None
+            self.remaining = None
+            self.reset_at = None
+            self._tokens = _BURST
+        if self._rate is not None:
+            self._tokens = min(_BURST, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def reserve(self, now: float | None = None) -> float:
+        """Take one token and return how many seconds to wait before sending."""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._refill(now)
+            if self._rate is None:
+                return 0.0
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            if self._rate <= 0:
+                return _jitter(max(0.0, (self.reset_at or now) - now))
+            return _jitter(-self._tokens / self._rate)
+
+    def cancel(self) -> None:
+        """Give back the token of a `reserve` whose request was never sent."""
+        with self._lock:
+            if self._rate is not None:
+                self._tokens = min(_BURST, self._tokens + 1.0)
+
+    def observe(self, headers: Headers, now: float | None = None) -> None:
+        """Update the quota from response headers (no-op when they are absent)."""
+        now = time.time() if now is None else now
+        limit, remaining, reset_at = parse_headers(headers)
+        if remaining is None or reset_at is None:
+            return
+        with self._lock:
+            self._refill(now)
+            self.limit, self.remaining, self.reset_at = limit, remaining, reset_at
+            self._rate = remaining / max(1.0, reset_at - now)
+            self._tokens = min(self._tokens, float(min(remaining, _BURST)))
+
+    def retry_delay(self, headers: Headers, attempt: int) -> float:
+        """Delay before retrying a 429: until reset (or Retry-After), with jitter."""
+        now = time.time()
+        retry_after = headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return _jitter(float(retry_after))
+        _, _, reset_at = parse_headers(headers)
+        if reset_at is not None and reset_at > now:
+            return _jitter(reset_at - now)
+        return _jitter(min(8.0, 0.5 * (2**attempt)))
+
+
+def parse_headers(headers: Headers) -> tuple[int | None, int | None, float | None]:
+    def _int(name: str) -> int | None:
+        v = headers.get(name)
+        try:
+            return int(v) if v is not None else None
+        except ValueError:
+            return None
+
+    reset = _int("X-RateLimit-Reset")
+    return (
+        _int("X-RateLimit-Limit"),
+        _int("X-RateLimit-Remaining"),
+        float(reset) if reset is not None else None,
+    )
+
+
+_LIMITERS: dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def for_key(api_key: str) -> RateLimiter:
+    """Shared limiter for an API key (keyed by digest; the key itself is not stored)."""
+    digest = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(digest)
+        if limiter is None:
+            limiter = _LIMITERS[digest] = RateLimiter()
+        return limiter
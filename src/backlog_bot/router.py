@@ -0,0 +1,117 @@
+"""
+Per-request model routing between a fast and a strong model.
+
+The route table maps a command, optionally above an estimated prompt size, to a
+tier (`fast` or `strong`), e.g. ``summary>4000=strong,update=strong``; anything
+not matched goes to the fast model. The strong model is only used when the
+remaining Lambda budget can afford its observed p95 latency, so a slow strong
+model or a late invocation degrades to the fast model instead of timing out.
+
+Latencies are kept per model in a rolling window at module scope, so warm
+containers learn from every invocation they serve.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+from .config import Settings
+from .deadline import Deadline
+
+FAST = "fast"
+STRONG = "strong"
+
+# Observations kept per model, and how many are needed before trusting the p95.
+_WINDOW = 50
+_MIN_SAMPLES = 5
+
+
+@dataclass(frozen=True)
+class Route:
+    kind: str
+    min_tokens: int
+    tier: str
+
+
+def parse_routes(spec: str) -> tuple[Route, ...]:
+    """Parse ``kind[>tokens]=tier`` entries separated by commas."""
+    routes: list[Route] = []
+    for entry in (e.strip() for e in spec.split(",")):
+        if not entry:
+            continue
+        cond, _, tier = entry.partition("=")
+        kind, _, min_tokens = cond.partition(">")
+        tier = tier.strip().lower()
+        if tier not in (FAST, STRONG):
+            raise ValueError(f"invalid route {entry!r}: tier must be fast or strong")
+        routes.append(Route(kind.strip(), int(min_tokens or 0), tier))
+    return tuple(routes)
+
+
+class LatencyTracker:
+    """Rolling per-model latency window."""
+
+    def __init__(self, window: int = _WINDOW) -> None:
+        self._lock = threading.Lock()
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, model_id: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.setdefault(model_id, deque(maxlen=self._window))
+            samples.append(seconds)
+
+    def percentile(self, model_id: str, pct: float) -> float | None:
+        """Nearest-rank percentile, or None until enough samples were seen."""
+        with self._lock:
+            samples = sorted(self._samples.get(model_id) or ())
+        if len(samples) < _MIN_SAMPLES:
+            return None
+        return samples[max(0, math.ceil(pct / 100 * len(samples)) - 1)]
+
+    def p95(self, model_id: str) -> float | None:
+        return self.percentile(model_id, 95)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._samples.clear()
+
+
+_LATENCY = LatencyTracker()
+
+
+def observe(model_id: str, seconds: float) -> None:
+    """Record how long a call to `model_id` took (failures count with their elapsed time)."""
+    _LATENCY.observe(model_id, seconds)
+
+
+def p95(model_id: str) -> float | None:
+    return _LATENCY.p95(model_id)
+
+
+def p90(model_id: str) -> float | None:
+    return _LATENCY.percentile(model_id, 90)
+
+
+def tier_for(routes: tuple[Route, ...], kind: str, prompt_tokens: int) -> str:
+    """First matching route wins; unmatched requests use the fast model."""
+    for route in routes:
+        if route.kind == kind and prompt_tokens >= route.min_tokens:
+            return route.tier
+    return FAST
+
+
+def choose(settings: Settings, kind: str, prompt_tokens: int, deadline: Deadline) -> str:
+    """Model id for one request."""
+    fast, strong = settings.llm_fast_model, settings.llm_strong_model
+    if strong == fast or tier_for(parse_routes(settings.llm_routes), kind, prompt_tokens) == FAST:
+        return fast
+    # Without observations assume the strong model may use the full timeout.
+    timeout = float(settings.llm_timeout_seconds)
+    expected = p95(strong) or timeout
+    if expected > timeout or not deadline.can_afford(expected):
+        return fast
+    return strong
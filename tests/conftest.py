@@ -1,8 +1,42 @@
 import os
 import sys
 
+import pytest
+
 # Ensure src/ is on sys.path for src-layout imports
 ROOT = os.path.dirname(os.path.dirname(__file__))
 SRC = os.path.join(ROOT, "src")
 if SRC not in sys.path:
     sys.path.insert(0, SRC)
+
+
+@pytest.fixture(autouse=True)
+def _reset_process_caches():
+    """Module-scope caches survive across warm invocations; isolate tests."""
+    from backlog_bot import (
+        aws,
+        backlog,
+        comment_cache,
+        context_fetch,
+        idempotency,
+        jobqueue,
+        llm,
+        llm_cache,
+        ratelimit,
+        router,
+    )
+
+    backlog._RESPONSES.clear()
+    backlog._ISSUE_IDS.clear()
+    comment_cache._MEMORY.clear()
+    context_fetch._TEXT_CACHE.clear()
+    ratelimit._LIMITERS.clear()
+    aws._CLIENTS.clear()
+    llm_cache._MEMORY.clear()
+    idempotency._RECENT.clear()
+    idempotency._STATS.update(memory_hits=0, backend_calls=0)
+    idempotency._SQLITE.clear()
+    jobqueue._LOCAL.clear()
+    llm.configure(llm.BedrockProvider())
+    router._LATENCY.clear()
+    yield
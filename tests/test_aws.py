@@ -0,0 +1,80 @@
+from backlog_bot import aws, idempotency, llm
+
+
+class CountingBoto:
+    def __init__(self):
+        self.created = []
+
+    def client(self, name: str):
+        self.created.append(name)
+        return Bedrock() if name == "bedrock-runtime" else S3()
+
+
+class Bedrock:
+    def invoke_model(self, **_kw):
+        return {
+            "body": type("R", (), {"read": lambda self=None: b'{"content": [{"text": "ok"}]}'})()
+        }
+
+
+class S3:
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None):
+        return {"ETag": '"v1"'}
+
+
+def test_clients_are_created_once_per_process(monkeypatch):
+    boto = CountingBoto()
+    monkeypatch.setitem(llm.__dict__, "boto3", boto)
+    monkeypatch.setitem(idempotency.__dict__, "boto3", boto)
+
+    for _ in range(3):
+        assert llm.summarize("m", "p").text == "ok"
+        idempotency.S3Backend("b").create("k", {"state": "in_progress"})
+    assert boto.created == ["bedrock-runtime", "s3"]
+
+
+def test_changed_options_create_a_new_client(monkeypatch):
+    boto = CountingBoto()
+    first = aws.client(boto, "s3")
+    monkeypatch.setattr(aws, "_OPTIONS", aws.ClientOptions(read_timeout=1.0))
+    second = aws.client(boto, "s3")
+    assert first is not second
+    assert aws.client(boto, "s3") is second
+
+
+def test_region_gets_its_own_client():
+    class RegionalBoto:
+        def __init__(self):
+            self.regions = []
+
+        def client(self, name: str, region_name=None, **_kw):
+            self.regions.append(region_name)
+            return object()
+
+    boto = RegionalBoto()
+    home = aws.client(boto, "bedrock-runtime")
+    other = aws.client(boto, "bedrock-runtime", "us-west-2")
+    assert home is not other
+    assert aws.client(boto, "bedrock-runtime", "us-west-2") is other
+    assert boto.regions == [None, "us-west-2"]
+
+
+def test_read_timeout_override_is_rounded_to_whole_seconds(monkeypatch):
+    class ConfigBoto:
+        def __init__(self):
+            self.configs = []
+
+        def client(self, name: str, config=None, **_kw):
+            self.configs.append(config)
+            return object()
+
+    # Without botocore installed, hand the options through as the "config".
+    monkeypatch.setattr(aws, "_config", lambda service, options: (service, options))
+    boto = ConfigBoto()
+    default = aws.client(boto, "bedrock-runtime")
+    assert aws.client(boto, "bedrock-runtime", read_timeout=10.0) is default
+    short = aws.client(boto, "bedrock-runtime", read_timeout=3.7)
+    assert aws.client(boto, "bedrock-runtime", read_timeout=3.2) is short
+    assert boto.configs[-1][1].bedrock_read_timeout == 3.0
+    assert aws.client(boto, "bedrock-runtime", read_timeout=0.4) is not short
+    assert boto.configs[-1][1].bedrock_read_timeout == 1.0
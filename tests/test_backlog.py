@@ -0,0 +1,244 @@
+import gzip
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backlog_bot.backlog as bl
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_a):
+        pass
+
+    def _send(self, status: int, payload) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):  # noqa: N802
+        self.server.ports.add(self.client_address[1])
+        if self.path.startswith("/api/v2/wikis/"):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.server.not_modified += 1
+                self.send_response(304)
+                self.send_header("ETag", '"v1"')
+                self.end_headers()
+                return
+            data = json.dumps({"id": 1, "content": "w" * 1000}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if self.path.startswith("/api/v2/issues/MISSING"):
+            self._send(404, {"errors": [{"message": "No issue"}]})
+            return
+        if self.path.startswith("/api/v2/issues/GZ"):
+            self.server.accept_encoding = self.headers.get("Accept-Encoding")
+            data = gzip.compress(json.dumps(self.server.gz_payload).encode("utf-8"))
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if self.path.startswith("/api/v2/issues/LIMITED") and self.server.throttle:
+            self.server.throttle -= 1
+            data = b'{"errors": []}'
+            self.send_response(429)
+            self.send_header("X-RateLimit-Limit", "150")
+            self.send_header("X-RateLimit-Remaining", "0")
+            self.send_header("X-RateLimit-Reset", str(int(time.time()) + 1))
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if self.path.startswith("/api/v2/issues/LONG/comments"):
+            self.server.paths.append(self.path)
+            q = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            lo, hi = int(q.get("minId", ["1"])[0]), int(q.get("maxId", ["250"])[0])
+            # Backlog caps count at 100; bounds are treated as inclusive here.
+            ids = [i for i in range(1, 251) if lo <= i <= hi]
+            if q["order"][0] == "desc":
+                ids.reverse()
+            page = ids[: min(int(q["count"][0]), 100)]
+            self._send(200, [{"id": i, "content": "x" * 10} for i in page])
+            return
+        if self.path.startswith("/api/v2/issues/BULK-"):
+            self.server.paths.append(self.path)
+            key = urllib.parse.urlsplit(self.path).path.rsplit("/", 1)[1]
+            self._send(200, {"id": int(key.split("-")[1]), "issueKey": key})
+            return
+        if self.path.startswith("/api/v2/issues?"):
+            self.server.paths.append(self.path)
+            query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+            ids = [int(i) for i in query["id[]"]] + self.server.bulk_extra
+            self._send(200, [{"id": i, "issueKey": f"BULK-{i}"} for i in ids])
+            return
+        self._send(200, {"issueKey": "PROJ-1", "summary": "S"})
+        if self.path.startswith("/api/v2/issues/DROP"):
+            # Close without announcing it, like an idle timeout on the server side
+            self.close_connection = True
+
+    def do_POST(self):  # noqa: N802
+        self.server.ports.add(self.client_address[1])
+        n = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(n)
+        self.server.paths.append(f"{self.command} {self.path}")
+        self._send(201, {"id": 1})
+
+    do_PATCH = do_POST
+
+
+@pytest.fixture()
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.ports = set()
+    srv.paths = []
+    srv.not_modified = 0
+    srv.gz_payload = {}
+    srv.throttle = 0
+    # Ids of issues the bulk search returns on top of the requested ones.
+    srv.bulk_extra = []
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    bl._POOL.clear()
+
+
+def _client(srv) -> bl.BacklogClient:
+    return bl.BacklogClient(f"http://127.0.0.1:{srv.server_address[1]}", "k")
+
+
+def test_keep_alive_connection_is_reused_across_clients(server):
+    _client(server).get_issue("PROJ-1")
+    _client(server).post_comment("PROJ-1", "hi")
+    _client(server).get_issue("PROJ-1")
+    assert len(server.ports) == 1
+
+
+def test_stale_connection_reconnects(server):
+    c = _client(server)
+    c.get_issue("DROP-1")
+    assert c.get_issue("PROJ-1")["issueKey"] == "PROJ-1"
+    assert len(server.ports) == 2
+
+
+def test_error_status_raises(server):
+    with pytest.raises(bl.BacklogAPIError) as ei:
+        _client(server).get_issue("MISSING")
+    assert ei.value.status == 404
+
+
+def test_etag_revalidation_returns_cached_wiki(server):
+    c = _client(server)
+    first = c.get_wiki(1)
+    second = c.get_wiki(1)
+    assert server.not_modified == 1
+    assert second is first
+
+
+def test_unchanged_body_without_etag_is_not_reparsed(server):
+    first = _client(server).get_issue("PROJ-1")
+    second = _client(server).get_issue("PROJ-1")
+    assert second is first
+
+
+def test_gzip_response_is_decoded(server):
+    server.gz_payload = {"issueKey": "GZ-1", "description": "日本語" * 100}
+    issue = _client(server).get_issue("GZ-1")
+    assert "gzip" in server.accept_encoding
+    assert issue == server.gz_payload
+
+
+def test_oversized_response_is_aborted(server):
+    server.gz_payload = {"description": "x" * 100_000}
+    c = bl.BacklogClient(
+        f"http://127.0.0.1:{server.server_address[1]}", "k", max_response_bytes=10_000
+    )
+    with pytest.raises(bl.ResponseTooLargeError):
+        c.get_issue("GZ-2")
+
+
+def test_429_waits_for_reset_then_retries(server, monkeypatch):
+    slept = []
+    real_time = time.time
+    monkeypatch.setattr(bl.time, "sleep", lambda s: slept.append(s))
+    monkeypatch.setattr(bl.time, "time", lambda: real_time() + sum(slept))
+    server.throttle = 1
+    assert _client(server).get_issue("LIMITED-1")["issueKey"] == "PROJ-1"
+    assert len(slept) == 1 and 0 < slept[0] <= 3
+
+
+def test_429_beyond_max_wait_raises(server, monkeypatch):
+    monkeypatch.setattr(bl.time, "sleep", lambda s: None)
+    server.throttle = 5
+    c = bl.BacklogClient(
+        f"http://127.0.0.1:{server.server_address[1]}", "k", rate_limit_max_wait=0.0
+    )
+    with pytest.raises(bl.RateLimitedError):
+        c.get_issue("LIMITED-2")
+
+
+def test_bulk_fetch_uses_issue_search_once_ids_are_known(server):
+    c = _client(server)
+    first = c.get_issues_bulk(["BULK-1", "BULK-2"])
+    assert [i["id"] for i in first.values()] == [1, 2]
+    assert all(p.startswith("/api/v2/issues/BULK-") for p in server.paths)
+    assert c.known_issue_keys(["BULK-2", "BULK-3", "BULK-2"]) == ["BULK-2"]
+
+    server.paths.clear()
+    second = c.get_issues_bulk(["BULK-2", "BULK-1", "BULK-3"])
+    assert list(second) == ["BULK-2", "BULK-1", "BULK-3"]
+    bulk = [p for p in server.paths if p.startswith("/api/v2/issues?")]
+    assert len(bulk) == 1
+    assert "id%5B%5D=1" in bulk[0] and "id%5B%5D=2" in bulk[0]
+    assert server.paths.count("/api/v2/issues/BULK-3?apiKey=k") == 1
+
+
+def test_bulk_fetch_keeps_only_the_requested_issues(server):
+    c = _client(server)
+    c.get_issues_bulk(["BULK-1", "BULK-2"])
+    server.paths.clear()
+    server.bulk_extra = [7, 8]
+
+    assert list(c.get_issues_bulk(["BULK-1", "BULK-2"])) == ["BULK-1", "BULK-2"]
+    assert [p for p in server.paths if p.startswith("/api/v2/issues/")] == []
+    # Unrequested issues in the response are not learned either.
+    assert c.known_issue_keys(["BULK-7", "BULK-8"]) == []
+
+
+def test_iter_comments_pages_past_the_100_limit(server):
+    c = _client(server)
+    ids = [x["id"] for x in c.iter_comments("LONG")]
+    assert ids == list(range(250, 0, -1))
+    assert len(server.paths) == 3
+
+    server.paths.clear()
+    asc = [x["id"] for x in c.iter_comments("LONG", order="asc", page_size=60, min_id=200)]
+    assert asc == list(range(200, 251))
+
+
+def test_iter_comments_is_lazy_and_stops_at_budget(server):
+    c = _client(server)
+    it = c.iter_comments("LONG", page_size=50, stop_when=bl.comment_budget(705))
+    assert server.paths == []
+    assert [x["id"] for x in it] == list(range(250, 180, -1))
+    assert len(server.paths) == 2
+
+
+def test_update_comment_patches_in_place(server):
+    _client(server).update_comment("PROJ-1", 42, "edited")
+    assert server.paths[-1].startswith("PATCH /api/v2/issues/PROJ-1/comments/42?")
@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import backlog_bot.backlog as bl
+import backlog_bot.backlog_async as abl
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *_a):
+        pass
+
+    def do_GET(self):  # noqa: N802
+        self.server.ports.add(self.client_address[1])
+        if self.path.startswith("/api/v2/issues/MISSING"):
+            data = b'{"errors": []}'
+            self.send_response(404)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if "/comments" in self.path:
+            # Chunked + gzip, like large comment lists from Backlog
+            data = gzip.compress(json.dumps([{"id": 2, "content": "こんにちは"}]).encode("utf-8"))
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i in range(0, len(data), 7):
+                part = data[i : i + 7]
+                self.wfile.write(f"{len(part):x}\r\n".encode() + part + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        data = json.dumps({"issueKey": "PROJ-1", "summary": "S"}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):  # noqa: N802
+        n = int(self.headers.get("Content-Length") or 0)
+        self.server.posted.append(self.rfile.read(n))
+        data = b'{"id": 10}'
+        self.send_response(201)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture()
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    srv.ports = set()
+    srv.posted = []
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _client(srv) -> abl.AsyncBacklogClient:
+    return abl.AsyncBacklogClient(f"http://127.0.0.1:{srv.server_address[1]}", "k")
+
+
+def test_async_client_reuses_connection_and_decodes_chunked_gzip(server):
+    async def main():
+        c = _client(server)
+        issue = await c.get_issue("PROJ-1")
+        comments = await c.list_comments("PROJ-1", count=5)
+        posted = await c.post_comment("PROJ-1", "返信")
+        return issue, comments, posted
+
+    issue, comments, posted = abl.run(main())
+    assert issue["issueKey"] == "PROJ-1"
+    assert comments == [{"id": 2, "content": "こんにちは"}]
+    assert posted == {"id": 10}
+    assert b"content=" in server.posted[0]
+    assert len(server.ports) == 1
+
+
+def test_async_client_fans_out_concurrently(server):
+    async def main():
+        c = _client(server)
+        return await asyncio.gather(*(c.get_issue(f"PROJ-{i}") for i in range(5)))
+
+    assert len(abl.run(main())) == 5
+
+
+def test_async_client_raises_on_error_status(server):
+    with pytest.raises(bl.BacklogAPIError):
+        abl.run(_client(server).get_issue("MISSING"))
@@ -34,3 +34,19 @@ def test_rule_based_summary():
     out = commands.rule_based_summary("タイトル", "説明がここにあります", ["最新コメント"])
     assert "要約" in out
     assert "タイトル" in out
+
+
+@pytest.mark.parametrize(
+    "text,expect",
+    [
+        ("@bot /summary", True),
+        ("\n  @bot @alice /ask 誰が担当?", True),
+        ("前置き\n@bot /ask 誰が担当?", False),
+        ("進捗共有です。\n/update は来週やります", False),
+        ("/update", False),
+        ("手順は https://example.com/summary を参照", False),
+        ("進捗: API実装完了", False),
+    ],
+)
+def test_is_command_comment(text, expect):
+    assert commands.is_command_comment(text) is expect
@@ -0,0 +1,114 @@
+import io
+import json
+
+from backlog_bot import comment_cache
+
+
+class FakeBacklog:
+    def __init__(self, comments):
+        self.comments = comments
+        self.calls = []
+
+    def list_comments(self, issue_id_or_key, count=30, order="desc", min_id=None):
+        self.calls.append(min_id)
+        rows = sorted(self.comments, key=lambda c: c["id"], reverse=True)
+        if min_id is not None:
+            rows = [c for c in rows if c["id"] > min_id]
+        return rows[:count]
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise Exception("NoSuchKey")
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = Body
+        return {}
+
+
+def _c(i):
+    return {"id": i, "content": f"c{i}", "createdUser": {"id": 1, "name": "A", "icon": "x"}}
+
+
+def test_incremental_fetch_uses_min_id_and_keeps_window():
+    fb = FakeBacklog([_c(1), _c(2), _c(3)])
+    first = comment_cache.recent_comments(fb, "P-1", 3, ttl_seconds=60)
+    assert [c["id"] for c in first] == [3, 2, 1]
+    assert "icon" not in first[0]["createdUser"]
+
+    fb.comments.append(_c(4))
+    second = comment_cache.recent_comments(fb, "P-1", 3, ttl_seconds=60)
+    assert fb.calls == [None, 3]
+    assert [c["id"] for c in second] == [4, 3, 2]
+
+
+def test_s3_tier_is_shared_across_containers(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setitem(
+        comment_cache.__dict__, "boto3", type("B", (), {"client": lambda self, n: s3})()
+    )
+    fb = FakeBacklog([_c(1), _c(2)])
+    comment_cache.recent_comments(fb, "P-2", 5, ttl_seconds=60, bucket="b")
+    stored = json.loads(s3.objects[("b", "comment-cache/P-2.json")])
+    assert stored["maxId"] == 2
+
+    comment_cache._MEMORY.clear()  # cold container
+    comment_cache.recent_comments(fb, "P-2", 5, ttl_seconds=60, bucket="b")
+    assert fb.calls == [None, 2]
+
+
+def test_stale_or_disabled_cache_refetches_full_window():
+    fb = FakeBacklog([_c(1)])
+    comment_cache.recent_comments(fb, "P-3", 5, ttl_seconds=0)
+    comment_cache.recent_comments(fb, "P-3", 5, ttl_seconds=0)
+    assert fb.calls == [None, None]
+
+    comment_cache.recent_comments(fb, "P-3", 5, ttl_seconds=60)
+    comment_cache.recent_comments(fb, "P-3", 10, ttl_seconds=60)  # wider window
+    assert fb.calls == [None, None, None, None]
+
+
+def test_narrower_request_keeps_the_wider_window():
+    fb = FakeBacklog([_c(i) for i in range(1, 11)])
+    comment_cache.recent_comments(fb, "P-4", 10, ttl_seconds=60)
+    fb.comments.append(_c(11))
+    narrow = comment_cache.recent_comments(fb, "P-4", 3, ttl_seconds=60)
+    assert [c["id"] for c in narrow] == [11, 10, 9]
+
+    wide = comment_cache.recent_comments(fb, "P-4", 10, ttl_seconds=60)
+    assert [c["id"] for c in wide] == list(range(11, 1, -1))
+    assert fb.calls == [None, 10, 11]
+
+    # More new comments than a narrow page holds: the window restarts, without a gap.
+    fb.comments.extend(_c(i) for i in range(12, 16))
+    assert [c["id"] for c in comment_cache.recent_comments(fb, "P-4", 3, ttl_seconds=60)] == [
+        15,
+        14,
+        13,
+    ]
+    assert comment_cache.recent_comments(fb, "P-4", 10, ttl_seconds=60)[-1]["id"] == 6
+    assert fb.calls[-1] is None
+
+
+def test_window_beyond_one_page_is_read_through_iter_comments():
+    class PagedBacklog(FakeBacklog):
+        def iter_comments(self, issue_id_or_key, page_size=100, stop_when=None, min_id=None):
+            self.calls.append(("iter", page_size, min_id))
+            for c in sorted(self.comments, key=lambda c: c["id"], reverse=True):
+                if min_id is not None and c["id"] <= min_id:
+                    return
+                if stop_when is not None and stop_when(c):
+                    return
+                yield c
+
+    fb = PagedBacklog([_c(i) for i in range(1, 301)])
+    got = comment_cache.recent_comments(fb, "P-3", 150, ttl_seconds=0)
+    assert [c["id"] for c in got] == list(range(300, 150, -1))
+
+    got = comment_cache.recent_comments(fb, "P-3", 150, ttl_seconds=0, max_chars=20)
+    assert [c["id"] for c in got] == [300, 299, 298, 297, 296]
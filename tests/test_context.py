@@ -2,10 +2,12 @@ from backlog_bot.context_fetch import (
     allowlisted,
     backlog_issue_to_text,
     backlog_wiki_to_text,
+    cached_text,
     extract_context_urls,
     is_http_url,
     parse_backlog_issue_url,
     parse_backlog_wiki_url,
+    wiki_text_key,
 )
 
 
@@ -54,3 +56,18 @@ def test_backlog_wiki_to_text_truncates():
     wiki = {"name": "W", "content": "y" * 1000}
     text = backlog_wiki_to_text(wiki, [], max_chars=100)
     assert len(text) <= 100
+
+
+def test_cached_text_skips_reflatten_until_updated_changes():
+    calls = []
+
+    def build(wiki):
+        calls.append(wiki["updated"])
+        return backlog_wiki_to_text(wiki, [], max_chars=100)
+
+    wiki = {"id": 1, "name": "W", "content": "body", "updated": "2024-01-01T00:00:00Z"}
+    cached_text(wiki_text_key(wiki, [], 100), lambda: build(wiki))
+    cached_text(wiki_text_key(wiki, [], 100), lambda: build(wiki))
+    wiki2 = {**wiki, "updated": "2024-01-02T00:00:00Z"}
+    cached_text(wiki_text_key(wiki2, [], 100), lambda: build(wiki2))
+    assert calls == ["2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z"]
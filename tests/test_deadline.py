@@ -0,0 +1,33 @@
+import pytest
+
+from backlog_bot.deadline import Deadline, DeadlineExceeded
+
+
+class Ctx:
+    def __init__(self, ms):
+        self.ms = ms
+
+    def get_remaining_time_in_millis(self):
+        return self.ms
+
+
+def test_timeout_is_capped_by_remaining_time_minus_reserve():
+    d = Deadline.from_context(Ctx(5000), reserve_seconds=3)
+    assert 1.5 < d.timeout(10) <= 2.0
+    assert d.timeout(1) == 1
+    assert not d.can_afford(2.5)
+
+    d.release_reserve()
+    assert d.can_afford(4.5)
+
+
+def test_exhausted_budget_raises():
+    d = Deadline.from_context(Ctx(2000), reserve_seconds=3)
+    with pytest.raises(DeadlineExceeded):
+        d.timeout(10)
+
+
+def test_context_without_clock_is_unbounded():
+    d = Deadline.from_context(None, reserve_seconds=3)
+    assert d.timeout(8) == 8
+    assert d.can_afford(1e9)
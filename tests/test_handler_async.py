@@ -0,0 +1,91 @@
+import json
+
+import backlog_bot.handler as h
+
+
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.store = set()
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfNoneMatch: str | None = None):
+        if IfNoneMatch == "*" and (Bucket, Key) in self.store:
+            raise PreconditionFailed()
+        self.store.add((Bucket, Key))
+        return {}
+
+
+class FakeAsyncBacklog:
+    def __init__(self, *_a, **_k):
+        self.posted = []
+
+    async def get_issue(self, issue_id_or_key: str):
+        return {"issueKey": issue_id_or_key, "summary": "S", "description": "D"}
+
+    async def list_comments(self, issue_id_or_key: str, count: int = 30):
+        return [{"id": 1, "content": "c1"}]
+
+    async def post_comment(self, issue_id_or_key: str, content: str):
+        self.posted.append(content)
+        return {"ok": True}
+
+    async def get_wiki(self, wiki_id: int):
+        return {"name": "W", "content": "wiki-body"}
+
+    async def list_wiki_attachments(self, wiki_id: int):
+        return []
+
+
+def test_async_pipeline_posts_reply_with_context(monkeypatch):
+    import backlog_bot.idempotency as idem
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("WEBHOOK_SHARED_SECRET", "secret")
+    monkeypatch.setenv("IDEMPOTENCY_BUCKET", "b")
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+
+    fs3 = FakeS3()
+    fb = FakeAsyncBacklog()
+
+    class BR:
+        def invoke_model(self, **_kw):
+            body = json.dumps({"content": [{"text": "OK"}]})
+            return {"body": type("R", (), {"read": lambda self=None: body.encode("utf-8")})()}
+
+    class BotoModule:
+        def client(self, name: str):
+            if name == "s3":
+                return fs3
+            if name == "bedrock-runtime":
+                return BR()
+            raise ValueError(name)
+
+    monkeypatch.setitem(idem.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "AsyncBacklogClient", lambda *_a, **_k: fb)
+
+    body = {
+        "type": 3,
+        "content": {
+            "comment": {
+                "id": 5000,
+                "content": "@bot /summary\ncontext: https://space.backlog.com/wiki/1",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "issue": {"issueKey": "PROJ-6"},
+        },
+    }
+    event = {
+        "headers": {"X-Webhook-Secret": "secret"},
+        "body": json.dumps(body, ensure_ascii=False),
+        "isBase64Encoded": False,
+    }
+
+    res = h.async_lambda_handler(event, None)
+    assert res["statusCode"] == 200
+    assert any("参照コンテキスト" in c for c in fb.posted)
@@ -0,0 +1,126 @@
+import json
+import threading
+
+import pytest
+
+import backlog_bot.handler as h
+
+
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.store = set()
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfNoneMatch: str | None = None):
+        if IfNoneMatch == "*" and (Bucket, Key) in self.store:
+            raise PreconditionFailed()
+        self.store.add((Bucket, Key))
+        return {}
+
+
+class FakeBacklog:
+    """Issue fetches block until the main issue and the context issues run at the same time."""
+
+    def __init__(self, known=(), parties=2):
+        self.posted = []
+        self.known = set(known)
+        self.barrier = threading.Barrier(parties, timeout=5)
+        self.comment_keys = []
+        self.bulk_calls = []
+
+    def _issue(self, key: str):
+        return {"issueKey": key, "summary": f"S-{key}", "description": "D"}
+
+    def get_issue(self, issue_id_or_key: str):
+        self.barrier.wait()
+        return self._issue(issue_id_or_key)
+
+    def known_issue_keys(self, keys):
+        return [k for k in dict.fromkeys(keys) if k in self.known]
+
+    def get_issues_bulk(self, keys):
+        self.bulk_calls.append(list(keys))
+        self.barrier.wait()
+        return {k: self._issue(k) for k in keys}
+
+    def list_comments(self, issue_id_or_key: str, count: int = 30):
+        self.comment_keys.append(issue_id_or_key)
+        return [{"id": 1, "content": f"c-{issue_id_or_key}"}]
+
+    def post_comment(self, issue_id_or_key: str, content: str):
+        self.posted.append(content)
+        return {"ok": True}
+
+
+@pytest.mark.parametrize(
+    ("known", "parties", "bulk_calls"),
+    [
+        # Warm: both ids known, one bulk search alongside the main issue.
+        (("PROJ-10", "PROJ-20"), 2, [["PROJ-20", "PROJ-10"]]),
+        # Cold: each context issue gets its own GET, all three in flight at once.
+        ((), 3, []),
+    ],
+)
+def test_context_sources_are_fetched_concurrently_in_url_order(
+    monkeypatch, known, parties, bulk_calls
+):
+    import backlog_bot.idempotency as idem
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("WEBHOOK_SHARED_SECRET", "secret")
+    monkeypatch.setenv("IDEMPOTENCY_BUCKET", "b")
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+
+    fs3 = FakeS3()
+    fb = FakeBacklog(known, parties)
+    prompts = []
+
+    class BR:
+        def invoke_model(self, **kw):
+            blocks = json.loads(kw["body"])["messages"][0]["content"]
+            prompts.append("\n".join(b["text"] for b in blocks))
+            body = json.dumps({"content": [{"text": "OK"}]})
+            return {"body": type("R", (), {"read": lambda self=None: body.encode("utf-8")})()}
+
+    class BotoModule:
+        def client(self, name: str):
+            if name == "s3":
+                return fs3
+            if name == "bedrock-runtime":
+                return BR()
+            raise ValueError(name)
+
+    monkeypatch.setitem(idem.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+
+    body = {
+        "type": 3,
+        "content": {
+            "comment": {
+                "id": 4000,
+                "content": "@bot /summary\ncontext: https://space.backlog.com/view/PROJ-20 "
+                "https://space.backlog.com/view/PROJ-10",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "issue": {"issueKey": "PROJ-5"},
+        },
+    }
+    event = {
+        "headers": {"X-Webhook-Secret": "secret"},
+        "body": json.dumps(body, ensure_ascii=False),
+        "isBase64Encoded": False,
+    }
+
+    res = h.lambda_handler(event, None)
+    assert res["statusCode"] == 200
+    # Each context issue pulls its own comments
+    assert sorted(fb.comment_keys) == ["PROJ-10", "PROJ-20", "PROJ-5"]
+    assert fb.bulk_calls == bulk_calls
+    prompt = prompts[0]
+    assert prompt.index("S-PROJ-20") < prompt.index("S-PROJ-10")
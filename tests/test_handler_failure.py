@@ -8,16 +8,17 @@ class FailingBedrock:
         raise RuntimeError("bedrock down")
 
 
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
 class FakeS3:
     def __init__(self):
         self.store = set()
 
-    def head_object(self, Bucket: str, Key: str):
-        if (Bucket, Key) not in self.store:
-            raise Exception("404")
-        return {}
-
-    def put_object(self, Bucket: str, Key: str, Body: bytes):
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfNoneMatch: str | None = None):
+        if IfNoneMatch == "*" and (Bucket, Key) in self.store:
+            raise PreconditionFailed()
         self.store.add((Bucket, Key))
         return {}
 
@@ -86,3 +87,180 @@ def test_llm_failure_posts_error_comment(monkeypatch):
     res = h.lambda_handler(event, None)
     assert res["statusCode"] == 500
     assert any("管理者" in c for c in fb.posted)
+
+
+def test_slow_llm_is_cut_off_by_deadline_and_error_is_posted(monkeypatch):
+    import threading
+
+    import backlog_bot.idempotency as idem
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("WEBHOOK_SHARED_SECRET", "secret")
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("LLM_TIMEOUT_SECONDS", "10")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "3")
+    monkeypatch.setenv("DEADLINE_RESERVE_SECONDS", "3")
+
+    import backlog_bot.aws as aws
+
+    release = threading.Event()
+    calls = []
+
+    class ReadTimeoutError(Exception):
+        pass
+
+    class SlowBedrock:
+        """Stalls until botocore's read timeout (from the client config) fires."""
+
+        def __init__(self, read_timeout):
+            self.read_timeout = read_timeout
+
+        def invoke_model(self, **kwargs):
+            calls.append(self.read_timeout)
+            release.wait(self.read_timeout)
+            raise ReadTimeoutError("Read timeout on endpoint URL")
+
+    class BotoModule:
+        def client(self, name: str, config=None):
+            if name == "bedrock-runtime":
+                return SlowBedrock(config.bedrock_read_timeout)
+            raise ValueError(name)
+
+    # No botocore here: hand the client options through as its "config".
+    monkeypatch.setattr(aws, "_config", lambda _service, options: options)
+
+    class LambdaContext:
+        aws_request_id = "rid"
+
+        def get_remaining_time_in_millis(self):
+            return 4000
+
+    fb = FakeBacklog()
+    monkeypatch.setitem(idem.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 1001,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 2,
+        },
+    }
+    event = {"headers": {"X-Webhook-Secret": "secret"}, "body": json.dumps(body)}
+
+    try:
+        res = h.lambda_handler(event, LambdaContext())
+    finally:
+        release.set()
+    assert res["statusCode"] == 500
+    # The first attempt's read timeout was the ~1s left before the reserve; no retry fit.
+    assert calls == [1.0]
+    assert any("管理者" in c for c in fb.posted)
+
+
+def test_throttled_model_fails_over_to_hedge_model(monkeypatch):
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("LLM_MODEL", "primary")
+    monkeypatch.setenv("LLM_HEDGE_MODEL", "backup")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "1")
+
+    models = []
+
+    class ThrottlingBedrock:
+        def invoke_model(self, **kwargs):
+            models.append(kwargs["modelId"])
+            if kwargs["modelId"] == "primary":
+                raise RuntimeError("ThrottlingException: Too many requests")
+            data = b'{"content": [{"text": "from backup"}]}'
+            return {"body": type("R", (), {"read": lambda self=None: data})()}
+
+    class BotoModule:
+        def client(self, name: str):
+            return ThrottlingBedrock()
+
+    fb = FakeBacklog()
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 1002,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 2,
+        },
+    }
+    res = h.lambda_handler({"body": json.dumps(body)}, None)
+    assert res["statusCode"] == 200
+    assert models == ["primary", "backup"]
+    assert fb.posted == ["from backup"]
+
+
+def _mention(comment_id):
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": comment_id,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 2,
+        },
+    }
+    return {"body": json.dumps(body)}
+
+
+def test_failed_jobs_are_settled_so_redeliveries_do_not_reply_again(monkeypatch):
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "sqlite")
+    monkeypatch.setenv("IDEMPOTENCY_MEMORY_MAX_ENTRIES", "0")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "1")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+
+    class BotoModule:
+        def client(self, name: str):
+            return FailingBedrock()
+
+    class PostTimesOut(FakeBacklog):
+        def post_comment(self, issue_id_or_key: str, content: str):
+            # Backlog accepted the comment, but the response never arrived.
+            super().post_comment(issue_id_or_key, content)
+            raise TimeoutError("read timed out")
+
+    fb = FakeBacklog()
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+
+    # LLM failure: the error comment is the one and only answer.
+    assert h.lambda_handler(_mention(2000), None)["statusCode"] == 500
+    assert h.lambda_handler(_mention(2000), None)["statusCode"] == 200
+    assert len(fb.posted) == 1 and "管理者" in fb.posted[0]
+
+    # Post failure after the comment went out: the redelivery must not post it again.
+    fb = PostTimesOut()
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+    assert h.lambda_handler(_mention(2001), None)["statusCode"] == 500
+    assert h.lambda_handler(_mention(2001), None)["statusCode"] == 200
+    assert len(fb.posted) == 1
@@ -0,0 +1,147 @@
+import json
+
+import backlog_bot.handler as h
+
+
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
+class FakeS3:
+    def __init__(self):
+        self.store = set()
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfNoneMatch: str | None = None):
+        if IfNoneMatch == "*" and (Bucket, Key) in self.store:
+            raise PreconditionFailed()
+        self.store.add((Bucket, Key))
+        return {}
+
+
+class StreamingBedrock:
+    def invoke_model_with_response_stream(self, **_kw):
+        def events():
+            yield {"chunk": {"bytes": json.dumps({"type": "message_start"}).encode()}}
+            for part in ["要約", "です", "。"]:
+                delta = {
+                    "type": "content_block_delta",
+                    "delta": {"type": "text_delta", "text": part},
+                }
+                yield {"chunk": {"bytes": json.dumps(delta).encode()}}
+            yield {"chunk": {"bytes": json.dumps({"type": "message_stop"}).encode()}}
+
+        return {"body": events()}
+
+
+class FakeBacklog:
+    def __init__(self, *_a, **_k):
+        self.log = []
+
+    def get_issue(self, issue_id_or_key: str):
+        return {"summary": "S", "description": "D"}
+
+    def list_comments(self, issue_id_or_key: str, count: int = 30):
+        return [{"content": "c1"}]
+
+    def post_comment(self, issue_id_or_key: str, content: str):
+        self.log.append(("post", content))
+        return {"id": 77}
+
+    def update_comment(self, issue_id_or_key: str, comment_id: int, content: str):
+        self.log.append(("update", comment_id, content))
+        return {"id": comment_id}
+
+
+def test_streaming_edits_placeholder_in_place(monkeypatch):
+    import backlog_bot.idempotency as idem
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("WEBHOOK_SHARED_SECRET", "secret")
+    monkeypatch.setenv("IDEMPOTENCY_BUCKET", "b")
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("LLM_STREAMING", "true")
+    monkeypatch.setenv("LLM_STREAM_UPDATE_INTERVAL_SECONDS", "0")
+
+    fs3 = FakeS3()
+    fb = FakeBacklog()
+
+    class BotoModule:
+        def client(self, name: str):
+            if name == "s3":
+                return fs3
+            if name == "bedrock-runtime":
+                return StreamingBedrock()
+            raise ValueError(name)
+
+    monkeypatch.setitem(idem.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 5000,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 2,
+        },
+    }
+    event = {"headers": {"X-Webhook-Secret": "secret"}, "body": json.dumps(body)}
+
+    res = h.lambda_handler(event, None)
+    assert res["statusCode"] == 200
+    assert fb.log[0] == ("post", h._ProgressComment.PLACEHOLDER)
+    assert [e[0] for e in fb.log[1:]] == ["update"] * (len(fb.log) - 1)
+    # Partial text carries the progress marker; the last edit is the final reply.
+    assert fb.log[1][2].startswith("要約") and h._ProgressComment.PLACEHOLDER in fb.log[1][2]
+    assert fb.log[-1] == ("update", 77, "要約です。")
+
+
+def test_resumed_attempt_finishes_the_dead_placeholder(monkeypatch):
+    import backlog_bot.idempotency as idem
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "sqlite")
+    monkeypatch.setenv("IDEMPOTENCY_MEMORY_MAX_ENTRIES", "0")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("LLM_STREAMING", "true")
+    monkeypatch.setenv("LLM_STREAM_UPDATE_INTERVAL_SECONDS", "0")
+
+    # An earlier attempt posted placeholder 66, streamed part of the reply and died.
+    store = idem.sqlite_backend()
+    stale = {"state": "in_progress", "attempt": 1, "lease_until": 0, "progress_comment_id": 66}
+    store.create("PROJ-2/5001", stale)
+
+    fb = FakeBacklog()
+    monkeypatch.setitem(
+        llm.__dict__, "boto3", type("B", (), {"client": lambda self, n: StreamingBedrock()})()
+    )
+    monkeypatch.setitem(h.__dict__, "BacklogClient", lambda *_a, **_k: fb)
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 5001,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 2,
+        },
+    }
+
+    assert h.lambda_handler({"body": json.dumps(body)}, None)["statusCode"] == 200
+    # No new placeholder: the old one is reset, streamed into and finished.
+    assert [e[0] for e in fb.log] == ["update"] * len(fb.log)
+    assert fb.log[0] == ("update", 66, h._ProgressComment.PLACEHOLDER)
+    assert fb.log[-1] == ("update", 66, "要約です。")
+    record = store.read("PROJ-2/5001")[0]
+    assert (record["state"], record["reply_comment_id"]) == ("completed", 66)
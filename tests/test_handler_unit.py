@@ -4,16 +4,17 @@ import types
 import backlog_bot.handler as h
 
 
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
 class FakeS3:
     def __init__(self):
         self.store = set()
 
-    def head_object(self, Bucket: str, Key: str):
-        if (Bucket, Key) not in self.store:
-            raise Exception("404")
-        return {}
-
-    def put_object(self, Bucket: str, Key: str, Body: bytes):
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfNoneMatch: str | None = None):
+        if IfNoneMatch == "*" and (Bucket, Key) in self.store:
+            raise PreconditionFailed()
         self.store.add((Bucket, Key))
         return {}
 
@@ -99,3 +100,252 @@ def test_lambda_handler_happy_path(monkeypatch):
     res = h.lambda_handler(event, None)
     assert res["statusCode"] == 200
     assert json.loads(res["body"]) == {"result": "ok"}
+
+
+def test_repeated_summary_on_unchanged_issue_reuses_cached_reply(monkeypatch):
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("LLM_CACHE_TTL_SECONDS", "600")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+
+    invocations = []
+
+    class CountingBedrock(FakeBedrock):
+        def invoke_model(self, **kw):
+            invocations.append(kw)
+            return super().invoke_model(**kw)
+
+    class Backlog(FakeBacklog):
+        comments = [{"id": 1, "content": "c1"}]
+
+        def list_comments(self, issue_id_or_key: str, count: int = 30):
+            return self.comments
+
+    class BotoModule:
+        def client(self, name: str):
+            return CountingBedrock()
+
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+
+    def run(comment_id: int) -> None:
+        # Each run comes from a new "/summary" comment, and the previous reply is
+        # visible in the history; neither should change the prompt.
+        Backlog.comments = [
+            {"id": comment_id, "content": "@bot /summary"},
+            {"id": comment_id - 1, "content": "OK", "createdUser": {"id": 123}},
+            {"id": 1, "content": "c1"},
+        ]
+        body = {
+            "type": 3,
+            "project": {"projectKey": "PROJ"},
+            "content": {
+                "comment": {
+                    "id": comment_id,
+                    "content": "@bot /summary",
+                    "notifications": [{"user": {"id": 123}}],
+                },
+                "key_id": 1,
+            },
+        }
+        res = h.lambda_handler({"body": json.dumps(body)}, None)
+        assert res["statusCode"] == 200
+
+    run(10)
+    run(20)
+    assert len(invocations) == 1
+
+
+def test_summary_of_long_history_folds_overflow_through_chunk_summaries(monkeypatch):
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("RECENT_COMMENT_COUNT", "40")
+    monkeypatch.setenv("LLM_PROMPT_MAX_TOKENS", "1000")
+    monkeypatch.setenv("SUMMARY_CHUNK_TOKENS", "300")
+
+    prompts: list[tuple[str, str]] = []
+
+    class RecordingBedrock(FakeBedrock):
+        def invoke_model(self, **kw):
+            body = json.loads(kw["body"])
+            text = "\n".join(b["text"] for b in body["messages"][0]["content"])
+            prompts.append((body["system"], text))
+            return super().invoke_model(**kw)
+
+    class Backlog(FakeBacklog):
+        def list_comments(self, issue_id_or_key: str, count: int = 30):
+            # Newest first, like the API.
+            return [
+                {"id": i, "content": f"コメント{i}: " + "経緯の説明です。" * 10}
+                for i in range(40, 0, -1)
+            ]
+
+        def post_comment(self, issue_id_or_key: str, content: str):
+            return {"ok": True}
+
+    class BotoModule:
+        def client(self, name: str):
+            return RecordingBedrock()
+
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 99,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 1,
+        },
+    }
+    res = h.lambda_handler({"body": json.dumps(body)}, None)
+    assert res["statusCode"] == 200
+
+    chunk_prompts = [p for s, p in prompts if s == llm.CHUNK_SYSTEM]
+    assert len(chunk_prompts) > 1
+    # Windows are oldest first and start from the very first comment.
+    assert chunk_prompts[0].startswith("[] : コメント1:")
+    reduce_prompt = prompts[-1][1]
+    assert prompts[-1][0] == llm.SUMMARY_SYSTEM
+    assert "それ以前の経緯（古い順の要約）:\nOK" in reduce_prompt
+    assert "コメント40:" in reduce_prompt
+
+
+def test_summary_builds_on_the_previous_bot_summary(monkeypatch):
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+
+    prompts: list[str] = []
+
+    class RecordingBedrock(FakeBedrock):
+        def invoke_model(self, **kw):
+            body = json.loads(kw["body"])
+            prompts.append("\n".join(b["text"] for b in body["messages"][0]["content"]))
+            return super().invoke_model(**kw)
+
+    class Backlog(FakeBacklog):
+        def list_comments(self, issue_id_or_key: str, count: int = 30):
+            return [
+                {"id": 30, "content": "@bot /summary"},
+                {
+                    "id": 29,
+                    "content": "",
+                    "created": "2024-05-02",
+                    "changeLog": [
+                        {"field": "status", "originalValue": "処理中", "newValue": "完了"}
+                    ],
+                },
+                {"id": 28, "content": "リリースしました", "created": "2024-05-01"},
+                {
+                    "id": 20,
+                    "content": "前回の要約本文",
+                    "created": "2024-04-01",
+                    "createdUser": {"id": 123},
+                },
+                {"id": 19, "content": "@bot /summary"},
+                {"id": 1, "content": "ずっと前の議論"},
+            ]
+
+    class BotoModule:
+        def client(self, name: str):
+            return RecordingBedrock()
+
+    monkeypatch.setitem(llm.__dict__, "boto3", BotoModule())
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 30,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 1,
+        },
+    }
+    res = h.lambda_handler({"body": json.dumps(body)}, None)
+    assert res["statusCode"] == 200
+
+    (prompt,) = prompts
+    assert "前回の要約（2024-04-01）:\n前回の要約本文" in prompt
+    assert (
+        "[2024-05-01] : リリースしました\n- [2024-05-02] : （変更）status: 処理中 → 完了" in prompt
+    )
+    assert "ずっと前の議論" not in prompt
+
+
+def test_without_reply_cache_the_prompt_keeps_bot_answers_and_discussions(monkeypatch):
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+
+    prompts = []
+
+    class RecordingBedrock(FakeBedrock):
+        def invoke_model(self, **kw):
+            prompts.append(json.loads(kw["body"])["messages"][0]["content"][0]["text"])
+            return super().invoke_model(**kw)
+
+    class Backlog(FakeBacklog):
+        def list_comments(self, issue_id_or_key: str, count: int = 30):
+            return [
+                {"id": 4, "content": "@bot /ask 次は?"},
+                {"id": 3, "content": "進捗共有です。\n/update は来週やります"},
+                {"id": 2, "content": "担当は山田さんです", "createdUser": {"id": 123}},
+                {"id": 1, "content": "@bot /ask 担当は?"},
+            ]
+
+    monkeypatch.setitem(
+        llm.__dict__, "boto3", type("B", (), {"client": lambda self, n: RecordingBedrock()})()
+    )
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 4,
+                "content": "@bot /ask 次は?",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 1,
+        },
+    }
+    assert h.lambda_handler({"body": json.dumps(body)}, None)["statusCode"] == 200
+    (prompt,) = prompts
+    assert "/update は来週やります" in prompt and "担当は山田さんです" in prompt
+    assert "担当は?" not in prompt
+
+
+def test_overflow_holds_only_what_the_prompt_lacks():
+    from backlog_bot import prompt_pack
+
+    items = ["新しい短いコメント", "長いコメント" * 200, "古いコメント"]
+    kept = prompt_pack._fill(items, 120)
+    assert kept[0] == items[0] and kept[1] != items[1]
+
+    overflow = h._overflow(items, kept)
+    # The truncated comment continues where the prompt stops; nothing is repeated.
+    assert kept[1].rstrip("…") + overflow[0].lstrip("…") == items[1]
+    assert overflow[1:] == ["古いコメント"]
+    assert h._overflow(items, items[:2]) == ["古いコメント"]
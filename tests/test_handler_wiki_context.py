@@ -3,16 +3,17 @@ import json
 import backlog_bot.handler as h
 
 
+class PreconditionFailed(Exception):
+    response = {"Error": {"Code": "PreconditionFailed"}}
+
+
 class FakeS3:
     def __init__(self):
         self.store = set()
 
-    def head_object(self, Bucket: str, Key: str):
-        if (Bucket, Key) not in self.store:
-            raise Exception("404")
-        return {}
-
-    def put_object(self, Bucket: str, Key: str, Body: bytes):
+    def put_object(self, Bucket: str, Key: str, Body: bytes, IfNoneMatch: str | None = None):
+        if IfNoneMatch == "*" and (Bucket, Key) in self.store:
+            raise PreconditionFailed()
         self.store.add((Bucket, Key))
         return {}
 
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import pytest
+
+from backlog_bot import hedge
+
+PRIMARY = hedge.Target("haiku")
+ALTERNATE = hedge.Target("haiku", "us-west-2")
+
+
+class ThrottlingException(Exception):
+    pass
+
+
+def test_fast_primary_is_not_hedged():
+    calls = []
+
+    def call(target):
+        calls.append(target)
+        return target.label()
+
+    result = hedge.run(call, PRIMARY, ALTERNATE, delay=1.0)
+    assert (result.value, result.target, result.hedged) == ("haiku", PRIMARY, None)
+    assert calls == [PRIMARY]
+
+
+def test_slow_primary_is_hedged_and_the_first_success_wins():
+    release = threading.Event()
+
+    def call(target):
+        if target == PRIMARY:
+            release.wait(2)
+        return target.label()
+
+    t0 = time.monotonic()
+    result = hedge.run(call, PRIMARY, ALTERNATE, delay=0.05)
+    release.set()
+    assert result.value == "haiku@us-west-2"
+    assert result.hedged == "slow"
+    assert time.monotonic() - t0 < 1
+
+
+def test_throttling_fails_over_without_waiting_for_the_delay():
+    def call(target):
+        if target == PRIMARY:
+            raise ThrottlingException("Too many requests, please wait before trying again.")
+        return "ok"
+
+    t0 = time.monotonic()
+    result = hedge.run(call, PRIMARY, ALTERNATE, delay=5.0)
+    assert (result.value, result.target, result.hedged) == ("ok", ALTERNATE, "throttled")
+    assert time.monotonic() - t0 < 1
+
+
+def test_other_errors_are_raised_without_hedging():
+    calls = []
+
+    def call(target):
+        calls.append(target)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        hedge.run(call, PRIMARY, ALTERNATE, delay=5.0)
+    assert calls == [PRIMARY]
+
+
+def test_throttle_detection():
+    class ClientError(Exception):
+        response = {"Error": {"Code": "ServiceUnavailableException"}}
+
+    assert hedge.is_throttle(ClientError())
+    assert hedge.is_throttle(RuntimeError("Bedrock stream error: throttlingException: {}"))
+    assert not hedge.is_throttle(ValueError("ValidationException: prompt too long"))
+
+
+def test_only_the_first_streaming_target_is_forwarded():
+    seen = []
+    stream_to = hedge.exclusive_stream(seen.append)
+    stream_to(ALTERNATE)("a1")
+    stream_to(PRIMARY)("p1")
+    stream_to(ALTERNATE)("a2")
+    assert seen == ["a1", "a2"]
+    assert hedge.exclusive_stream(None)(PRIMARY) is None
+
+
+def test_closed_stream_drops_text_from_abandoned_attempts():
+    seen = []
+    first = hedge.exclusive_stream(seen.append)
+    abandoned = first(PRIMARY)
+    abandoned("old 1")
+    first.close()
+    retry = hedge.exclusive_stream(seen.append)(PRIMARY)
+    retry("new 1")
+    abandoned("old 2")
+    retry("new 2")
+    assert seen == ["old 1", "new 1", "new 2"]
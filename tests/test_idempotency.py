@@ -0,0 +1,365 @@
+import io
+import json
+
+import pytest
+
+from backlog_bot import cache, idempotency
+
+
+class ClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FailingS3:
+    def __init__(self, code):
+        self.code = code
+
+    def put_object(self, **_kw):
+        raise ClientError(self.code)
+
+
+def _patch(monkeypatch, s3):
+    monkeypatch.setitem(
+        idempotency.__dict__, "boto3", type("B", (), {"client": lambda self, n: s3})()
+    )
+
+
+class VersionedS3:
+    """S3 stand-in with ETags and If-None-Match / If-Match conditional puts."""
+
+    def __init__(self):
+        self.objects = {}
+        self.version = 0
+
+    def put_object(self, Bucket, Key, Body, IfNoneMatch=None, IfMatch=None):
+        current = self.objects.get((Bucket, Key))
+        if IfNoneMatch == "*" and current is not None:
+            raise ClientError("PreconditionFailed")
+        if IfMatch is not None and (current is None or current[1] != IfMatch):
+            raise ClientError("PreconditionFailed")
+        self.version += 1
+        self.objects[(Bucket, Key)] = (Body, f'"v{self.version}"')
+        return {"ETag": f'"v{self.version}"'}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise ClientError("NoSuchKey")
+        body, etag = self.objects[(Bucket, Key)]
+        return {"Body": io.BytesIO(body), "ETag": etag}
+
+    def record(self, key):
+        return json.loads(self.objects[("b", key)][0])
+
+
+NO_MEMORY = {"memory_max_entries": 0}
+S3 = idempotency.S3Backend("b")
+
+
+@pytest.mark.parametrize("code", ["PreconditionFailed", "ConditionalRequestConflict"])
+def test_concurrent_creates_are_duplicates(monkeypatch, code):
+    _patch(monkeypatch, FailingS3(code))
+    assert S3.create("k", {"state": "in_progress"}) is None
+
+
+@pytest.mark.parametrize("code", ["SlowDown", "AccessDenied", "NoSuchBucket"])
+def test_real_s3_errors_are_not_mistaken_for_duplicates(monkeypatch, code):
+    _patch(monkeypatch, FailingS3(code))
+    with pytest.raises(idempotency.IdempotencyError):
+        idempotency.claim(S3, "k", **NO_MEMORY)
+
+
+def test_redelivery_on_a_warm_container_skips_the_store(monkeypatch):
+    _patch(monkeypatch, VersionedS3())
+
+    first = idempotency.claim(S3, "k")
+    idempotency.complete(S3, "k", first, reply_comment_id=1)
+    for _ in range(2):
+        assert idempotency.claim(S3, "k").state == idempotency.COMPLETED
+    assert idempotency.stats() == {"memory_hits": 2, "backend_calls": 1}
+
+
+def test_memory_layer_defers_to_the_store_after_eviction_or_expiry(monkeypatch):
+    _patch(monkeypatch, VersionedS3())
+
+    for key in ("a", "b"):
+        claimed = idempotency.claim(S3, key, memory_max_entries=1)
+        idempotency.complete(S3, key, claimed)
+    # "a" was evicted: the store still reports it done.
+    assert idempotency.claim(S3, "a", memory_max_entries=1).state == idempotency.COMPLETED
+    assert idempotency.stats()["backend_calls"] == 3
+
+    now = cache.time.monotonic()
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now + 601)
+    assert idempotency.claim(S3, "a", memory_max_entries=1).state == idempotency.COMPLETED
+    assert idempotency.stats()["backend_calls"] == 4
+
+
+def test_memory_layer_can_be_disabled(monkeypatch):
+    _patch(monkeypatch, VersionedS3())
+    idempotency.claim(S3, "k", **NO_MEMORY)
+    assert idempotency.claim(S3, "k", **NO_MEMORY).state == idempotency.IN_PROGRESS
+    assert idempotency.stats() == {"memory_hits": 0, "backend_calls": 2}
+
+
+def test_claim_then_complete_stores_the_reply(monkeypatch):
+    s3 = VersionedS3()
+    _patch(monkeypatch, s3)
+
+    first = idempotency.claim(S3, "k", **NO_MEMORY)
+    assert first.state == idempotency.CLAIMED and not first.resumed
+    assert idempotency.claim(S3, "k", **NO_MEMORY).state == idempotency.IN_PROGRESS
+
+    idempotency.complete(S3, "k", first, reply_comment_id=42, elapsed_ms=1500)
+    done = idempotency.claim(S3, "k", **NO_MEMORY)
+    assert done.state == idempotency.COMPLETED
+    assert (done.record["reply_comment_id"], done.record["elapsed_ms"]) == (42, 1500)
+
+
+def test_expired_lease_is_taken_over_by_exactly_one_retry(monkeypatch):
+    s3 = VersionedS3()
+    _patch(monkeypatch, s3)
+    idempotency.claim(S3, "k", lease_seconds=30, **NO_MEMORY)
+
+    now = idempotency.time.time()
+    monkeypatch.setattr(idempotency.time, "time", lambda: now + 31)
+    real_put = s3.put_object
+
+    def racing_put(**kw):
+        # Another retry takes the record over between our read and our write.
+        if kw.get("IfMatch") and not racing_put.raced:
+            racing_put.raced = True
+            assert idempotency.claim(S3, "k", **NO_MEMORY).resumed
+        return real_put(**kw)
+
+    racing_put.raced = False
+    monkeypatch.setattr(s3, "put_object", racing_put)
+
+    assert idempotency.claim(S3, "k", **NO_MEMORY).state == idempotency.IN_PROGRESS
+    assert s3.record("k")["attempt"] == 2
+
+
+def test_released_claim_can_be_retried_at_once(monkeypatch):
+    s3 = VersionedS3()
+    _patch(monkeypatch, s3)
+
+    first = idempotency.claim(S3, "k")
+    idempotency.release(S3, "k", first, error="llm_failed")
+    assert s3.record("k")["error"] == "llm_failed"
+    retry = idempotency.claim(S3, "k")
+    assert retry.state == idempotency.CLAIMED and retry.resumed
+
+
+def test_one_shot_markers_of_earlier_versions_count_as_completed(monkeypatch):
+    s3 = VersionedS3()
+    _patch(monkeypatch, s3)
+    s3.put_object(Bucket="b", Key="k", Body=b"1")
+    assert idempotency.claim(S3, "k").state == idempotency.COMPLETED
+
+
+class ConditionalDynamo:
+    """DynamoDB client stand-in for the condition expressions DynamoDBBackend uses."""
+
+    def __init__(self):
+        self.items = {}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, ExpressionAttributeValues=None):
+        current = self.items.get(Item["pk"]["S"])
+        values = ExpressionAttributeValues or {}
+        if ConditionExpression == "attribute_not_exists(pk) OR expires_at < :now":
+            ok = current is None or int(current["expires_at"]["N"]) < int(values[":now"]["N"])
+        elif ConditionExpression == "version = :v":
+            ok = current is not None and current["version"] == values[":v"]
+        else:
+            ok = ConditionExpression is None
+        if not ok:
+            raise ClientError("ConditionalCheckFailedException")
+        self.items[Item["pk"]["S"]] = Item
+        return {}
+
+    def get_item(self, TableName, Key, ConsistentRead=False):
+        assert ConsistentRead
+        item = self.items.get(Key["pk"]["S"])
+        return {"Item": item} if item else {}
+
+
+@pytest.fixture(params=["s3", "dynamodb", "sqlite"])
+def backend(request, monkeypatch):
+    if request.param == "sqlite":
+        return idempotency.SQLiteBackend(ttl_seconds=3600)
+    if request.param == "s3":
+        _patch(monkeypatch, VersionedS3())
+        return idempotency.S3Backend("b")
+    _patch(monkeypatch, ConditionalDynamo())
+    return idempotency.DynamoDBBackend("t", ttl_seconds=3600)
+
+
+def test_backend_contract(backend):
+    assert backend.read("k") is None
+    created = backend.create("k", {"state": "in_progress"})
+    assert created is not None
+    assert backend.create("k", {"state": "in_progress"}) is None
+
+    record, version = backend.read("k")
+    assert (record, version) == ({"state": "in_progress"}, created)
+    replaced = backend.replace("k", {"state": "in_progress", "attempt": 2}, version)
+    assert replaced not in (None, version)
+    assert backend.replace("k", {"state": "in_progress", "attempt": 3}, version) is None
+    assert backend.read("k")[1] == replaced
+
+
+def test_claims_work_on_every_backend(backend):
+    first = idempotency.claim(backend, "k", **NO_MEMORY)
+    assert first.state == idempotency.CLAIMED
+    assert idempotency.claim(backend, "k", **NO_MEMORY).state == idempotency.IN_PROGRESS
+    idempotency.release(backend, "k", first, error="llm_failed")
+    retry = idempotency.claim(backend, "k", **NO_MEMORY)
+    assert retry.resumed
+    assert idempotency.complete(backend, "k", retry, reply_comment_id=9)
+    assert idempotency.claim(backend, "k", **NO_MEMORY).record["reply_comment_id"] == 9
+
+
+def test_noted_fields_survive_a_takeover(backend, monkeypatch):
+    first = idempotency.claim(backend, "k", lease_seconds=30, **NO_MEMORY)
+    noted = idempotency.note(backend, "k", first, progress_comment_id=66)
+    assert noted.record["progress_comment_id"] == 66
+    # The note moved the version on: the claim it replaced can no longer write.
+    assert not idempotency.complete(backend, "k", first)
+
+    now = idempotency.time.time()
+    monkeypatch.setattr(idempotency.time, "time", lambda: now + 31)
+    retry = idempotency.claim(backend, "k", **NO_MEMORY)
+    assert retry.resumed and retry.record["progress_comment_id"] == 66
+    assert idempotency.note(backend, "k", noted, progress_comment_id=1) is None
+
+
+def test_stale_attempt_cannot_overwrite_the_retry_that_took_over(backend, monkeypatch):
+    stale = idempotency.claim(backend, "k", lease_seconds=30, **NO_MEMORY)
+    now = idempotency.time.time()
+    monkeypatch.setattr(idempotency.time, "time", lambda: now + 31)
+    retry = idempotency.claim(backend, "k", **NO_MEMORY)
+    assert retry.resumed
+
+    # The slow first attempt finishes late: neither write may touch the retry's lease.
+    assert not idempotency.complete(backend, "k", stale, reply_comment_id=1)
+    assert not idempotency.release(backend, "k", stale, error="llm_failed")
+    assert backend.read("k")[0] == retry.record
+    assert idempotency.complete(backend, "k", retry, reply_comment_id=2)
+
+
+@pytest.mark.parametrize("kind", ["dynamodb", "sqlite"])
+def test_ttl_backends_forget_expired_records(monkeypatch, kind):
+    if kind == "dynamodb":
+        _patch(monkeypatch, ConditionalDynamo())
+        backend = idempotency.DynamoDBBackend("t", ttl_seconds=60)
+    else:
+        backend = idempotency.SQLiteBackend(ttl_seconds=60)
+    backend.create("k", {"state": "completed"})
+
+    now = idempotency.time.time()
+    monkeypatch.setattr(idempotency.time, "time", lambda: now + 61)
+    assert backend.read("k") is None
+    assert idempotency.claim(backend, "k", **NO_MEMORY).state == idempotency.CLAIMED
+
+
+def test_dynamodb_errors_raise(monkeypatch):
+    class Failing(ConditionalDynamo):
+        def put_item(self, **_kw):
+            raise ClientError("ProvisionedThroughputExceededException")
+
+    _patch(monkeypatch, Failing())
+    with pytest.raises(idempotency.IdempotencyError):
+        idempotency.claim(idempotency.DynamoDBBackend("t", 60), "k")
+
+
+def test_sqlite_backend_is_shared_per_path():
+    assert idempotency.sqlite_backend(":memory:") is idempotency.sqlite_backend(":memory:")
+
+
+def test_handler_answers_redelivery_from_the_stored_outcome(monkeypatch):
+    import backlog_bot.handler as h
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("IDEMPOTENCY_BUCKET", "b")
+    monkeypatch.setenv("IDEMPOTENCY_MEMORY_MAX_ENTRIES", "0")
+    monkeypatch.setenv("LLM_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+
+    s3 = VersionedS3()
+    posted = []
+
+    class Bedrock:
+        def invoke_model(self, **_kw):
+            data = b'{"content": [{"text": "OK"}]}'
+            return {"body": io.BytesIO(data)}
+
+    class Backlog:
+        def __init__(self, *_a, **_k):
+            pass
+
+        def get_issue(self, key):
+            return {"summary": "S", "description": "D"}
+
+        def list_comments(self, key, count=30):
+            return []
+
+        def post_comment(self, key, content):
+            posted.append(content)
+            return {"id": 777}
+
+    boto = type("B", (), {"client": lambda self, n: s3 if n == "s3" else Bedrock()})()
+    monkeypatch.setitem(idempotency.__dict__, "boto3", boto)
+    monkeypatch.setitem(llm.__dict__, "boto3", boto)
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 5,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 1,
+        },
+    }
+    event = {"body": json.dumps(body)}
+    assert h.lambda_handler(event, None)["statusCode"] == 200
+    assert s3.record("PROJ-1/5")["reply_comment_id"] == 777
+
+    res = h.lambda_handler(event, None)
+    assert json.loads(res["body"]) == {"result": "duplicate_ignored", "state": "completed"}
+    assert posted == ["OK"]
+
+
+def test_handler_uses_the_configured_backend(monkeypatch):
+    import backlog_bot.handler as h
+    from backlog_bot.config import load_settings
+
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "sqlite")
+    assert isinstance(h._idempotency_backend(load_settings()), idempotency.SQLiteBackend)
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "dynamodb")
+    monkeypatch.setenv("IDEMPOTENCY_TABLE", "t")
+    assert h._idempotency_backend(load_settings()).name == "dynamodb:t"
+    monkeypatch.delenv("IDEMPOTENCY_BACKEND")
+    monkeypatch.setenv("IDEMPOTENCY_BUCKET", "b")
+    assert h._idempotency_backend(load_settings()).name == "s3:b"
+    monkeypatch.delenv("IDEMPOTENCY_BUCKET")
+    assert h._idempotency_backend(load_settings()) is None
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "redis")
+    with pytest.raises(ValueError, match="IDEMPOTENCY_BACKEND='redis'.*s3, dynamodb, sqlite"):
+        h._idempotency_backend(load_settings())
+
+
+def test_sqlite_errors_raise_idempotency_error(tmp_path):
+    backend = idempotency.SQLiteBackend(str(tmp_path / "markers.db"))
+    backend._db.execute("DROP TABLE idempotency")
+    with pytest.raises(idempotency.IdempotencyError):
+        idempotency.claim(backend, "k", **NO_MEMORY)
+    with pytest.raises(idempotency.IdempotencyError):
+        idempotency.SQLiteBackend(str(tmp_path))
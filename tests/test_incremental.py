@@ -0,0 +1,60 @@
+from backlog_bot import incremental
+
+BOT = 123
+
+
+def _c(cid, content, user=1, **extra):
+    return {"id": cid, "content": content, "createdUser": {"id": user}, **extra}
+
+
+def test_finds_latest_reply_to_a_summary_command():
+    comments = [
+        _c(7, "@bot /summary"),
+        _c(6, "新しい議論"),
+        _c(5, "回答です", BOT),
+        _c(4, "@bot /ask 期限は？"),
+        _c(3, "要約です\n\n**参照コンテキスト**\n- https://x", BOT),
+        _c(2, "@bot /summary"),
+        _c(1, "最初のコメント"),
+    ]
+    idx = incremental.find_previous_summary(comments, BOT)
+    assert idx == 4
+    assert incremental.summary_text(comments[idx]) == "要約です"
+
+
+def test_placeholders_errors_and_unknown_replies_are_skipped():
+    comments = [
+        _c(5, "⏳ 生成中です…", BOT),
+        _c(4, "@bot /summary"),
+        _c(3, "⚠️ エラーが発生しました", BOT),
+        _c(2, "@bot /summary"),
+        _c(1, "古い返信", BOT),
+    ]
+    assert incremental.find_previous_summary(comments, BOT) is None
+
+
+def test_half_streamed_placeholder_is_not_a_summary():
+    partial = f"partial su\n\n{incremental.PROGRESS_PLACEHOLDER}"
+    comments = [
+        _c(4, "@bot /summary"),
+        _c(3, "FULL SUMMARY", BOT),
+        _c(2, partial, BOT),
+        _c(1, "@bot /summary"),
+    ]
+    assert incremental.find_previous_summary(comments, BOT) == 1
+
+
+def test_change_log_lines():
+    comment = _c(
+        1,
+        "",
+        changeLog=[
+            {"field": "status", "originalValue": "未対応", "newValue": "処理中"},
+            {"field": "assigner", "originalValue": None, "newValue": "山田"},
+            {"field": None},
+        ],
+    )
+    assert incremental.change_lines(comment) == [
+        "status: 未対応 → 処理中",
+        "assigner: (なし) → 山田",
+    ]
@@ -0,0 +1,173 @@
+import io
+import json
+
+import pytest
+
+from backlog_bot import jobqueue
+
+
+class FakeClients:
+    def __init__(self):
+        self.calls = []
+
+    def client(self, name):
+        outer = self
+
+        class Client:
+            def send_message(self, **kw):
+                outer.calls.append((name, kw))
+                return {"MessageId": "m1"}
+
+            def invoke(self, **kw):
+                outer.calls.append((name, kw))
+                return {"StatusCode": 202}
+
+        return Client()
+
+
+def test_sqs_and_lambda_queues_send_compact_json(monkeypatch):
+    fake = FakeClients()
+    monkeypatch.setitem(jobqueue.__dict__, "boto3", fake)
+
+    jobqueue.SQSQueue("https://sqs/q").send({"issueKey": "課題-1"})
+    jobqueue.LambdaQueue("bot").send({"issueKey": "P-1"})
+
+    (_, sqs), (_, lam) = fake.calls
+    assert sqs == {"QueueUrl": "https://sqs/q", "MessageBody": '{"issueKey":"課題-1"}'}
+    assert lam["InvocationType"] == "Event" and lam["FunctionName"] == "bot"
+    assert jobqueue.messages(json.loads(lam["Payload"])) == [
+        jobqueue.Message(None, {"issueKey": "P-1"})
+    ]
+
+
+def test_messages_tells_worker_events_from_webhooks():
+    sqs = {"Records": [{"eventSource": "aws:sqs", "messageId": "a", "body": '{"x": 1}'}]}
+    assert jobqueue.messages(sqs) == [jobqueue.Message("a", {"x": 1})]
+    assert jobqueue.messages({"body": "{}"}) is None
+    assert jobqueue.messages({"Records": [{"eventSource": "aws:s3"}]}) is None
+
+
+def test_local_queue_runs_jobs_and_drains():
+    seen = []
+    queue = jobqueue.LocalQueue(lambda job: seen.append(job["n"]), workers=2)
+    for n in range(5):
+        queue.send({"n": n})
+    queue.drain(timeout=5)
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    import backlog_bot.handler as h
+    import backlog_bot.llm as llm
+
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("IDEMPOTENCY_BACKEND", "sqlite")
+    monkeypatch.setenv("IDEMPOTENCY_MEMORY_MAX_ENTRIES", "0")
+    monkeypatch.setenv("LLM_CACHE_TTL_SECONDS", "0")
+    monkeypatch.setenv("COMMENT_CACHE_TTL_SECONDS", "0")
+
+    posted = []
+
+    class Bedrock:
+        def invoke_model(self, **_kw):
+            return {"body": io.BytesIO(b'{"content": [{"text": "OK"}]}')}
+
+    class Backlog:
+        def __init__(self, *_a, **_k):
+            pass
+
+        def get_issue(self, key):
+            return {"summary": "S", "description": "D"}
+
+        def list_comments(self, key, count=30):
+            return []
+
+        def post_comment(self, key, content):
+            posted.append((key, content))
+            return {"id": 777}
+
+    boto = type("B", (), {"client": lambda self, n: Bedrock()})()
+    monkeypatch.setitem(llm.__dict__, "boto3", boto)
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+    return h, posted
+
+
+def _webhook(comment_id=5):
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": comment_id,
+                "content": "@bot /summary",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 1,
+        },
+    }
+    return {"body": json.dumps(body)}
+
+
+def test_fast_ack_returns_before_the_worker_posts(monkeypatch, pipeline):
+    h, posted = pipeline
+    monkeypatch.setenv("JOB_QUEUE", "local")
+
+    res = h.lambda_handler(_webhook(), None)
+    assert json.loads(res["body"]) == {"result": "queued"}
+    jobqueue._LOCAL["default"].drain(timeout=5)
+    assert posted == [("PROJ-1", "OK")]
+
+
+def test_sqs_worker_dedupes_redeliveries_and_reports_failures(monkeypatch, pipeline):
+    h, posted = pipeline
+    queued = []
+    monkeypatch.setenv("JOB_QUEUE", "sqs")
+    monkeypatch.setenv("JOB_QUEUE_URL", "https://sqs/q")
+    monkeypatch.setattr(jobqueue.SQSQueue, "send", lambda self, job: queued.append(job))
+
+    assert h.lambda_handler(_webhook(), None)["statusCode"] == 200
+    assert h.lambda_handler(_webhook(), None)["statusCode"] == 200
+    records = [
+        {"eventSource": "aws:sqs", "messageId": f"m{i}", "body": json.dumps(job)}
+        for i, job in enumerate(queued)
+    ]
+    # Both webhook deliveries were queued; the worker answers only once.
+    assert h.lambda_handler({"Records": records}, None) == {"batchItemFailures": []}
+    assert posted == [("PROJ-1", "OK")]
+
+    monkeypatch.delenv("BACKLOG_API_KEY")
+    failing = dict(records[0], messageId="m9", body=json.dumps(dict(queued[0], commentId="6")))
+    assert h.worker_handler({"Records": [failing]}, None) == {
+        "batchItemFailures": [{"itemIdentifier": "m9"}]
+    }
+
+
+def test_failed_async_invoke_raises_for_lambda_retry(monkeypatch, pipeline):
+    h, _ = pipeline
+    monkeypatch.delenv("BACKLOG_API_KEY")
+    job = {"cmd": {"cmd": "summary"}, "issueKey": "PROJ-1", "commentId": "7", "content": "x"}
+    with pytest.raises(RuntimeError):
+        h.lambda_handler({jobqueue.JOB_KEY: job}, None)
+
+
+def test_settled_failures_are_not_handed_back_to_the_queue(monkeypatch, pipeline):
+    import backlog_bot.llm as llm
+
+    h, posted = pipeline
+    monkeypatch.setenv("LLM_MAX_RETRIES", "1")
+
+    class Failing:
+        def invoke_model(self, **_kw):
+            raise RuntimeError("bedrock down")
+
+    monkeypatch.setitem(llm.__dict__, "boto3", type("B", (), {"client": lambda s, n: Failing()})())
+    job = {"cmd": {"cmd": "summary"}, "issueKey": "PROJ-1", "commentId": "8", "content": "x"}
+    record = {"eventSource": "aws:sqs", "messageId": "m1", "body": json.dumps(job)}
+
+    # The error comment is the job's answer: neither SQS nor async invoke retries it.
+    assert h.lambda_handler({"Records": [record]}, None) == {"batchItemFailures": []}
+    assert h.lambda_handler({jobqueue.JOB_KEY: dict(job, commentId="9")}, None)["statusCode"] == 500
+    assert len(posted) == 2 and all("管理者" in text for _, text in posted)
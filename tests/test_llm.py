@@ -0,0 +1,103 @@
+import json
+
+from backlog_bot import llm
+
+
+class RecordingBedrock:
+    def __init__(self):
+        self.bodies = []
+
+    def invoke_model(self, **kw):
+        self.bodies.append(json.loads(kw["body"]))
+        data = {
+            "content": [{"text": "answer"}],
+            "usage": {
+                "input_tokens": 12,
+                "output_tokens": 3,
+                "cache_read_input_tokens": 4000,
+                "cache_creation_input_tokens": 0,
+            },
+        }
+        return {"body": type("R", (), {"read": lambda self=None: json.dumps(data).encode()})()}
+
+
+def _patch(monkeypatch, br):
+    monkeypatch.setitem(llm.__dict__, "boto3", type("B", (), {"client": lambda self, n: br})())
+
+
+def test_prompt_parts_get_cache_breakpoints_except_the_question(monkeypatch):
+    br = RecordingBedrock()
+    _patch(monkeypatch, br)
+
+    out = llm.answer("m", ["issue block", "", "context block", "質問: なぜ?"], cache_prompt=True)
+
+    body = br.bodies[0]
+    assert body["system"][0]["cache_control"] == {"type": "ephemeral"}
+    blocks = body["messages"][0]["content"]
+    assert [b["text"] for b in blocks] == ["issue block", "context block", "質問: なぜ?"]
+    assert [("cache_control" in b) for b in blocks] == [True, True, False]
+    assert out.text == "answer"
+    assert out.usage["cache_read_input_tokens"] == 4000
+
+
+def test_plain_prompt_without_caching_is_unchanged(monkeypatch):
+    br = RecordingBedrock()
+    _patch(monkeypatch, br)
+
+    llm.summarize("m", "p")
+
+    body = br.bodies[0]
+    assert isinstance(body["system"], str)
+    assert body["messages"][0]["content"] == [{"type": "text", "text": "p"}]
+
+
+def test_timeout_is_enforced_by_the_client_read_timeout(monkeypatch):
+    import pytest
+
+    from backlog_bot import aws
+
+    class ReadTimeoutError(Exception):
+        pass
+
+    class Stalled:
+        def invoke_model(self, **_kw):
+            raise ReadTimeoutError("Read timeout on endpoint URL")
+
+    created = []
+
+    def client(_self, name, config=None):
+        created.append(config.bedrock_read_timeout)
+        return Stalled()
+
+    monkeypatch.setattr(aws, "_config", lambda _service, options: options)
+    monkeypatch.setitem(llm.__dict__, "boto3", type("B", (), {"client": client})())
+
+    with pytest.raises(TimeoutError):
+        llm.summarize("m", "p", timeout=4.5)
+    assert created == [4.0]
+
+
+def test_total_timeout_caps_a_stream_that_keeps_trickling(monkeypatch):
+    import itertools
+
+    import pytest
+
+    class Body:
+        closed = False
+
+        def __iter__(self):
+            delta = {"type": "content_block_delta", "delta": {"text": "x"}}
+            for _ in itertools.count():
+                # Each event arrives well within the read timeout.
+                yield {"chunk": {"bytes": json.dumps(delta).encode()}}
+
+        def close(self):
+            Body.closed = True
+
+    clock = itertools.count(0.0, 0.5)
+    monkeypatch.setattr(llm.time, "monotonic", lambda: next(clock))
+    seen = []
+
+    with pytest.raises(TimeoutError):
+        llm._stream_text({"body": Body()}, seen.append, total_timeout=2.0)
+    assert Body.closed and seen[-1] == "xxxx"
@@ -0,0 +1,61 @@
+import io
+import json
+
+from backlog_bot import llm_cache
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise Exception("NoSuchKey")
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = Body
+        return {}
+
+
+def test_key_covers_model_kind_system_and_prompt():
+    base = llm_cache.cache_key("m", "summary", "sys", ["issue", "q"])
+    assert base == llm_cache.cache_key("m", "summary", "sys", ["issue", "q"])
+    assert base != llm_cache.cache_key("m2", "summary", "sys", ["issue", "q"])
+    assert base != llm_cache.cache_key("m", "ask", "sys", ["issue", "q"])
+    assert base != llm_cache.cache_key("m", "summary", "sys", ["issue2", "q"])
+
+
+def test_memory_and_s3_tiers(monkeypatch):
+    s3 = FakeS3()
+    monkeypatch.setitem(
+        llm_cache.__dict__, "boto3", type("B", (), {"client": lambda self, n: s3})()
+    )
+    assert llm_cache.get("k", ttl_seconds=60, bucket="b") is None
+    llm_cache.put("k", "reply", ttl_seconds=60, bucket="b")
+    assert llm_cache.get("k", ttl_seconds=60, bucket="b") == ("reply", "memory")
+
+    llm_cache._MEMORY.clear()  # cold container
+    assert llm_cache.get("k", ttl_seconds=60, bucket="b") == ("reply", "s3")
+    assert json.loads(s3.objects[("b", "llm-cache/k.json")])["text"] == "reply"
+
+
+def test_expired_entries_are_ignored(monkeypatch):
+    llm_cache.put("k", "reply", ttl_seconds=60)
+    now = llm_cache.time.time()
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now + 61)
+    assert llm_cache.get("k", ttl_seconds=60) is None
+    assert llm_cache.get("k", ttl_seconds=0) is None
+
+
+def test_reply_cache_is_opt_in_and_never_uses_the_idempotency_bucket(monkeypatch):
+    from backlog_bot.config import load_settings
+
+    monkeypatch.setenv("IDEMPOTENCY_BUCKET", "markers")
+    monkeypatch.delenv("LLM_CACHE_TTL_SECONDS", raising=False)
+    monkeypatch.delenv("LLM_CACHE_BUCKET", raising=False)
+    monkeypatch.delenv("COMMENT_CACHE_BUCKET", raising=False)
+    settings = load_settings()
+    assert settings.llm_cache_ttl_seconds == 0
+    assert settings.llm_cache_bucket is None
+    assert settings.comment_cache_bucket is None
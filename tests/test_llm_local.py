@@ -0,0 +1,108 @@
+import json
+
+import pytest
+
+import backlog_bot.handler as h
+from backlog_bot import llm
+from backlog_bot.llm_local import LocalOptions, LocalProvider
+
+REQUEST = llm.Request("m", "sys", ["issue", "question"], max_tokens=40)
+
+
+def test_replies_and_latency_are_deterministic_per_request():
+    slept: list[float] = []
+    provider = LocalProvider(LocalOptions(tokens_per_second=100, output_tokens=20), slept.append)
+
+    first = provider.complete(REQUEST, None)
+    first_sleeps = list(slept)
+    slept.clear()
+    assert provider.complete(REQUEST, None) == first
+    assert slept == first_sleeps
+    assert first.usage["output_tokens"] == 20
+    assert first.usage["input_tokens"] > 0
+    # Time to first token plus 20 tokens at 100 tokens/s, all before the reply.
+    ttft = provider.first_token_seconds(provider._rng(REQUEST))
+    assert first_sleeps == [pytest.approx(ttft + 0.2)]
+
+
+def test_timeout_behaves_like_a_read_timeout():
+    slept: list[float] = []
+    options = LocalOptions(latency_p50_seconds=0.5, latency_p95_seconds=0.5, output_tokens=40)
+    provider = LocalProvider(options, slept.append)
+    with pytest.raises(TimeoutError):
+        provider.complete(REQUEST._replace(timeout=0.8), None)
+    assert slept == [0.8]
+    # Streaming: only the first token and each 8-token gap (0.1s) must fit.
+    assert provider.complete(REQUEST._replace(timeout=0.8), lambda _t: None).text
+    # ...while the stream as a whole (0.5s + 5 x 0.1s) is capped by total_timeout.
+    slept.clear()
+    with pytest.raises(TimeoutError):
+        provider.complete(REQUEST._replace(timeout=0.8, total_timeout=0.75), lambda _t: None)
+    assert sum(slept) == pytest.approx(0.75)
+
+
+def test_streaming_reports_growing_text():
+    seen: list[str] = []
+    provider = LocalProvider(LocalOptions(output_tokens=20), lambda _s: None)
+    out = provider.complete(REQUEST, seen.append)
+    assert len(seen) == 3
+    assert seen[-1] == out.text
+    assert all(b.startswith(a) for a, b in zip(seen, seen[1:], strict=False))
+
+
+def test_latency_distribution_matches_percentiles():
+    import random
+
+    provider = LocalProvider(LocalOptions(latency_p50_seconds=1.0, latency_p95_seconds=3.0))
+    rng = random.Random(0)
+    samples = sorted(provider.first_token_seconds(rng) for _ in range(4000))
+    assert samples[2000] == pytest.approx(1.0, rel=0.1)
+    assert samples[3800] == pytest.approx(3.0, rel=0.15)
+
+
+def test_error_rate_raises_throttling():
+    provider = LocalProvider(LocalOptions(error_rate=1.0), lambda _s: None)
+    with pytest.raises(RuntimeError, match="ThrottlingException"):
+        provider.complete(REQUEST, None)
+
+
+def test_handler_runs_offline_with_local_provider(monkeypatch):
+    monkeypatch.setenv("BACKLOG_SPACE", "space")
+    monkeypatch.setenv("BOT_USER_ID", "123")
+    monkeypatch.setenv("BACKLOG_API_KEY", "x")
+    monkeypatch.setenv("LLM_PROVIDER", "local")
+    monkeypatch.setenv("LLM_LOCAL_LATENCY_P50_SECONDS", "0")
+    monkeypatch.setenv("LLM_LOCAL_TOKENS_PER_SECOND", "0")
+
+    posted = []
+
+    class Backlog:
+        def __init__(self, *_a, **_k):
+            pass
+
+        def get_issue(self, key):
+            return {"summary": "S", "description": "D"}
+
+        def list_comments(self, key, count=30):
+            return [{"content": "c1"}]
+
+        def post_comment(self, key, content):
+            posted.append(content)
+            return {"id": 1}
+
+    monkeypatch.setitem(h.__dict__, "BacklogClient", Backlog)
+    body = {
+        "type": 3,
+        "project": {"projectKey": "PROJ"},
+        "content": {
+            "comment": {
+                "id": 5,
+                "content": "@bot /ask 期限は？",
+                "notifications": [{"user": {"id": 123}}],
+            },
+            "key_id": 1,
+        },
+    }
+    res = h.lambda_handler({"body": json.dumps(body)}, None)
+    assert res["statusCode"] == 200
+    assert posted and "ローカル応答" in posted[0]
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+
+from backlog_bot import llm, map_reduce
+from backlog_bot.prompt_pack import estimate_tokens
+
+
+class CountingBedrock:
+    def __init__(self, delay=0.0):
+        self.prompts = []
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke_model(self, **kw):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        body = json.loads(kw["body"])
+        text = body["messages"][0]["content"][0]["text"]
+        with self._lock:
+            self.active -= 1
+            self.prompts.append(text)
+        data = {"content": [{"text": f"sum({len(text)})"}]}
+        return {"body": type("R", (), {"read": lambda self=None: json.dumps(data).encode()})()}
+
+
+def _patch(monkeypatch, br):
+    monkeypatch.setitem(llm.__dict__, "boto3", type("B", (), {"client": lambda self, n: br})())
+
+
+def test_chunks_are_bounded_and_earlier_windows_stay_stable():
+    items = [f"[2024-01-{i:02d}] user: comment number {i} " * 5 for i in range(1, 29)]
+    chunks = map_reduce.chunk_texts(items, 200)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 200 for c in chunks)
+    assert "\n".join(chunks) == "\n".join(items)
+    # New comments are appended at the end; only the last window changes.
+    grown = map_reduce.chunk_texts([*items, "[2024-02-01] user: new"], 200)
+    assert grown[: len(chunks) - 1] == chunks[:-1]
+
+
+def test_oversized_item_is_split_across_windows():
+    chunks = map_reduce.chunk_texts(["short", "あ" * 500, "tail"], 100)
+
+    assert chunks[0] == "short"
+    assert all(estimate_tokens(c) <= 100 for c in chunks)
+    assert "".join(chunks[1:-1]) + chunks[-1].split("\n")[0] == "あ" * 500
+
+
+def test_chunk_summaries_run_in_parallel_and_are_cached(monkeypatch):
+    br = CountingBedrock(delay=0.05)
+    _patch(monkeypatch, br)
+    chunks = [f"chunk {i}" for i in range(6)]
+
+    first = map_reduce.summarize_chunks("m", chunks, concurrency=2, cache_ttl_seconds=60)
+    assert first.summaries == [f"sum({len(c)})" for c in chunks]
+    assert (first.chunks, first.cached) == (6, 0)
+    assert br.peak == 2
+
+    again = map_reduce.summarize_chunks(
+        "m", [*chunks, "chunk 6"], concurrency=2, cache_ttl_seconds=60
+    )
+    assert (again.chunks, again.cached) == (7, 6)
+    assert br.prompts[-1] == "chunk 6"
+    assert len(br.prompts) == 7
+
+
+def test_history_is_resummarized_until_it_fits(monkeypatch):
+    br = CountingBedrock()
+    _patch(monkeypatch, br)
+    items = ["x" * 300 for _ in range(40)]
+
+    out = map_reduce.summarize_history("m", items, chunk_tokens=100, max_tokens=5, concurrency=4)
+
+    # 40 windows, then their summaries folded into one.
+    assert out.chunks > 40
+    assert len(out.summaries) == 1
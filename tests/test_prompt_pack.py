@@ -0,0 +1,40 @@
+from backlog_bot import prompt_pack as pp
+
+
+def test_cjk_costs_more_per_character_than_ascii():
+    ja = "進捗を共有します。" * 10
+    en = "sharing progress. " * 10
+    assert pp.estimate_tokens(ja) > pp.estimate_tokens(en)
+    assert pp.estimate_tokens("") == 0
+
+
+def test_truncate_stays_within_budget():
+    text = "長い説明文です。" * 200
+    cut = pp.truncate_to_tokens(text, 100)
+    assert cut.endswith("…")
+    assert pp.estimate_tokens(cut) <= 100
+    assert pp.truncate_to_tokens("short", 100) == "short"
+
+
+def test_unused_share_flows_to_other_sections_by_priority():
+    comments = [f"コメント{i}: " + "あ" * 100 for i in range(50)]
+    packed = pp.pack(
+        [
+            pp.Section("description", ["短い説明"], share=0.5, priority=0),
+            pp.Section("comments", comments, share=0.2, priority=1),
+        ],
+        1000,
+    )
+    assert packed["description"] == ["短い説明"]
+    kept = packed["comments"]
+    # Newest-first order is kept and the description's unused share is reused.
+    assert kept[0] == comments[0]
+    assert len(kept) > 2
+    total = sum(pp.estimate_tokens(x) + 2 for x in kept) + pp.estimate_tokens("短い説明")
+    assert total <= 1000
+
+
+def test_oversized_single_item_is_truncated_not_dropped():
+    packed = pp.pack([pp.Section("description", ["説明" * 5000], share=1.0)], 500)
+    assert len(packed["description"]) == 1
+    assert pp.estimate_tokens(packed["description"][0]) <= 500
@@ -0,0 +1,50 @@
+from backlog_bot import ratelimit
+
+
+def test_unknown_quota_is_not_throttled():
+    rl = ratelimit.RateLimiter()
+    assert all(rl.reserve() == 0.0 for _ in range(50))
+
+
+def test_low_quota_paces_requests_until_reset():
+    rl = ratelimit.RateLimiter()
+    now = 1000.0
+    rl.observe(
+        {"X-RateLimit-Limit": "150", "X-RateLimit-Remaining": "2", "X-RateLimit-Reset": "1060"},
+        now=now,
+    )
+    assert rl.reserve(now) == 0.0
+    assert rl.reserve(now) == 0.0
+    # Bucket drained: next call waits for ~30s of refill at 2 tokens/60s
+    assert 25 < rl.reserve(now) < 32
+
+
+def test_exhausted_quota_waits_for_reset_and_rolls_over():
+    rl = ratelimit.RateLimiter()
+    rl.observe(
+        {"X-RateLimit-Limit": "150", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1010"},
+        now=1000.0,
+    )
+    assert 10 <= rl.reserve(1000.0) <= 11
+    assert rl.reserve(1011.0) == 0.0
+
+
+def test_cancelled_reservations_do_not_drain_the_bucket():
+    rl = ratelimit.RateLimiter()
+    rl.observe(
+        {"X-RateLimit-Limit": "150", "X-RateLimit-Remaining": "1", "X-RateLimit-Reset": "1060"},
+        now=1000.0,
+    )
+    assert rl.reserve(1000.0) == 0.0
+    wait = rl.reserve(1000.0)
+    for _ in range(5):
+        assert rl.reserve(1000.0) > wait
+        rl.cancel()
+    # Rejected callers gave their tokens back: the next wait is unchanged.
+    rl.cancel()
+    assert abs(rl.reserve(1000.0) - wait) < 1.5
+
+
+def test_limiter_is_shared_per_api_key():
+    assert ratelimit.for_key("a") is ratelimit.for_key("a")
+    assert ratelimit.for_key("a") is not ratelimit.for_key("b")
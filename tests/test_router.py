@@ -0,0 +1,59 @@
+import pytest
+
+from backlog_bot import router
+from backlog_bot.config import load_settings
+from backlog_bot.deadline import Deadline
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    monkeypatch.setenv("LLM_FAST_MODEL", "haiku")
+    monkeypatch.setenv("LLM_STRONG_MODEL", "sonnet")
+    monkeypatch.setenv("LLM_ROUTES", "summary>4000=strong,update=strong")
+    monkeypatch.setenv("LLM_TIMEOUT_SECONDS", "10")
+    return load_settings()
+
+
+def test_parse_routes():
+    assert router.parse_routes("summary>4000=strong, ask=FAST,") == (
+        router.Route("summary", 4000, "strong"),
+        router.Route("ask", 0, "fast"),
+    )
+    with pytest.raises(ValueError):
+        router.parse_routes("ask=medium")
+
+
+def test_routes_by_command_and_prompt_size(settings):
+    unbounded = Deadline(None)
+    assert router.choose(settings, "ask", 50_000, unbounded) == "haiku"
+    assert router.choose(settings, "summary", 1000, unbounded) == "haiku"
+    assert router.choose(settings, "summary", 5000, unbounded) == "sonnet"
+    assert router.choose(settings, "update", 10, unbounded) == "sonnet"
+
+
+def test_tight_deadline_falls_back_to_fast_model(settings):
+    # No observations yet: the strong model is assumed to need the full timeout.
+    assert router.choose(settings, "update", 10, Deadline(8.0)) == "haiku"
+    for s in (2.0, 2.5, 3.0, 3.5, 4.0):
+        router.observe("sonnet", s)
+    assert router.p95("sonnet") == 4.0
+    assert router.choose(settings, "update", 10, Deadline(8.0)) == "sonnet"
+    assert router.choose(settings, "update", 10, Deadline(3.0)) == "haiku"
+
+
+def test_strong_model_slower_than_timeout_is_avoided(settings):
+    for _ in range(10):
+        router.observe("sonnet", 12.0)
+    assert router.choose(settings, "update", 10, Deadline(None)) == "haiku"
+
+
+def test_p95_uses_a_rolling_window():
+    tracker = router.LatencyTracker(window=5)
+    for s in (1, 1, 1, 1):
+        tracker.observe("m", s)
+    assert tracker.p95("m") is None
+    for s in (9, 2, 2, 2, 2):
+        tracker.observe("m", s)
+    assert tracker.p95("m") == 9
+    tracker.observe("m", 2)
+    assert tracker.p95("m") == 2